@@ -0,0 +1,357 @@
+"""
+aggregate_store.py
+Persistent daily aggregates, updated incrementally from delta files of new rows.
+
+The store (SQLite) keeps every accepted (location, date) row of the raw data and
+the daily totals of every country, WHO region and the global series. A delta file
+of new rows is validated, de-duplicated against the stored rows and added to the
+totals of the series it touches, so a daily update costs time in proportion to
+the delta, not to the history. Each ingest records the series it changed, so
+downstream steps (e.g. `python -m project.pipeline --delta <file>`) can refit
+only those. Once seeded, the store is the pipeline's source of the daily series.
+
+Like stream_series_cube, a (location, date) already stored is a duplicate and the
+first row wins; with replace=True a differing row corrects the stored one instead.
+
+Example:
+    python -m project.aggregate_store ingest Data_original/covid.csv   # initial load
+    python -m project.aggregate_store ingest new_days.csv
+"""
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from .config import AGGREGATE_DB_PATH, AGGREGATE_CHUNK_ROWS
+from .data_preprocessing import COUNTRY_COL, REGION_COL, NON_METRIC_COLUMNS
+from .logging_config import logger
+
+PROVINCE_COL = 'Province/State'
+LEVELS = ['global', 'region', 'country']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS countries (
+    country TEXT PRIMARY KEY,
+    region TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    source TEXT,
+    rows INTEGER,
+    accepted INTEGER,
+    replaced INTEGER,
+    duplicates INTEGER,
+    invalid INTEGER,
+    changed TEXT
+);
+"""
+
+def _metric_schema(metrics):
+    columns = ', '.join(f'"{m}" NUMERIC NOT NULL' for m in metrics)
+    return f"""
+CREATE TABLE IF NOT EXISTS observations (
+    country TEXT NOT NULL,
+    province TEXT NOT NULL,
+    date TEXT NOT NULL,
+    {columns},
+    PRIMARY KEY (country, province, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily (
+    level TEXT NOT NULL,
+    series TEXT NOT NULL,
+    date TEXT NOT NULL,
+    {columns},
+    PRIMARY KEY (level, series, date)
+) WITHOUT ROWID;
+"""
+
+def connect(db_path: str = AGGREGATE_DB_PATH) -> sqlite3.Connection:
+    """Open the aggregate store, creating its schema if needed."""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    metrics = stored_metrics(conn)
+    if metrics:
+        conn.executescript(_metric_schema(metrics))
+    return conn
+
+def stored_metrics(conn) -> list:
+    """Return the metric columns of the store, or None before the first ingest."""
+    row = conn.execute("SELECT value FROM meta WHERE name = 'metrics'").fetchone()
+    return json.loads(row[0]) if row else None
+
+def _validate(df: pd.DataFrame, metrics: list):
+    """
+    Normalize a raw delta and split off the rows that cannot be ingested.
+
+    Returns:
+        tuple: (rows, invalid) where rows has 'country', 'province', 'region' (None when
+            missing), 'date' (YYYY-MM-DD) and the metrics, and invalid counts rows without
+            a country or a valid date or with a non-numeric metric.
+    """
+    missing = [c for c in [COUNTRY_COL, 'Date', *metrics] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Delta is missing columns {missing}.")
+    rows = pd.DataFrame({
+        'country': df[COUNTRY_COL].astype('string'),
+        'province': df[PROVINCE_COL].astype('string').fillna('') if PROVINCE_COL in df.columns else '',
+        'region': df[REGION_COL].astype('string') if REGION_COL in df.columns else pd.NA,
+        'date': pd.to_datetime(df['Date'], errors='coerce').dt.strftime('%Y-%m-%d'),
+    })
+    for m in metrics:
+        rows[m] = pd.to_numeric(df[m], errors='coerce')
+    valid = rows['country'].notna() & rows['date'].notna() & rows[metrics].notna().all(axis=1)
+    return rows[valid].reset_index(drop=True), int((~valid).sum())
+
+def _lookup(conn, table, key_columns, keys: pd.DataFrame, columns):
+    """Return the rows of a table matching the given keys, via a temporary key table."""
+    conn.execute("DROP TABLE IF EXISTS temp.lookup_keys")
+    conn.execute(f"CREATE TEMP TABLE lookup_keys ({', '.join(key_columns)})")
+    conn.executemany(f"INSERT INTO temp.lookup_keys VALUES ({', '.join('?' * len(key_columns))})",
+                     keys[key_columns].itertuples(index=False, name=None))
+    join = ' AND '.join(f't.{c} = k.{c}' for c in key_columns)
+    selected = ', '.join(f't."{c}"' for c in columns)
+    found = pd.read_sql_query(f"SELECT {selected} FROM {table} t JOIN temp.lookup_keys k ON {join}", conn)
+    conn.execute("DROP TABLE temp.lookup_keys")
+    return found
+
+def ingest_frame(conn, df: pd.DataFrame, replace: bool = False) -> dict:
+    """
+    Validate, de-duplicate and add the rows of a raw delta to the store, in one transaction.
+
+    Args:
+        conn (sqlite3.Connection): Open store connection.
+        df (pd.DataFrame): Raw rows with the columns of covid.csv ('Province/State',
+            'WHO Region', 'Lat' and 'Long' optional).
+        replace (bool): Let a row for a stored (location, date) with different values
+            correct it instead of being dropped as a duplicate.
+
+    Returns:
+        dict: Counts of 'rows', 'accepted' (new), 'replaced', 'duplicates' and 'invalid'
+            rows, and 'changed': the changed series per level ('global', 'region', 'country').
+    """
+    metrics = stored_metrics(conn)
+    if metrics is None:
+        # A location column with no values at all reads as numeric; it is never a metric
+        metrics = [c for c in df.select_dtypes(include='number').columns
+                   if c not in (*NON_METRIC_COLUMNS, COUNTRY_COL, PROVINCE_COL, REGION_COL)]
+    rows, invalid = _validate(df, metrics)
+    total = len(rows)
+    rows = rows.drop_duplicates(['country', 'province', 'date'], keep='first')
+    duplicates = total - len(rows)
+
+    with conn:
+        if stored_metrics(conn) is None:
+            conn.execute("INSERT INTO meta (name, value) VALUES ('metrics', ?)", (json.dumps(metrics),))
+            conn.executescript(_metric_schema(metrics))
+
+        # A country belongs to one region: fill it in where missing, reject conflicting rows.
+        # A country stored without a region ('') gets the first one a later delta gives it.
+        countries = rows[['country']].drop_duplicates()
+        stored_regions = dict(_lookup(conn, 'countries', ['country'], countries, ['country', 'region']).to_numpy())
+        known = {country: region for country, region in stored_regions.items() if region}
+        first_region = rows.dropna(subset=['region']).drop_duplicates('country').set_index('country')['region']
+        regions = {**first_region.to_dict(), **known}
+        conflict = rows['region'].notna() & (rows['region'] != rows['country'].map(regions))
+        invalid += int(conflict.sum())
+        rows = rows[~conflict].assign(region=rows['country'].map(regions).fillna(''))
+        new_countries = [(c, regions.get(c, '')) for c in rows['country'].unique() if c not in stored_regions]
+        conn.executemany("INSERT INTO countries (country, region) VALUES (?, ?)", new_countries)
+        resolved = [c for c in rows['country'].unique() if stored_regions.get(c) == '' and c in regions]
+        conn.executemany("UPDATE countries SET region = ? WHERE country = ?", [(regions[c], c) for c in resolved])
+
+        # The stored totals of a country whose region was unknown now roll into that region
+        changed_regions = set()
+        if resolved:
+            history = _lookup(conn, 'daily', ['series'], pd.DataFrame({'series': resolved}),
+                              ['level', 'series', 'date', *metrics])
+            history = history[history['level'] == 'country']
+            totals = history.assign(series=history['series'].map(regions)).groupby(
+                ['series', 'date'], sort=True)[metrics].sum()
+            _add_totals(conn, 'region', totals, metrics)
+            changed_regions.update(totals.index.get_level_values('series'))
+
+        # De-duplicate against the stored rows; with replace, corrections contribute their difference
+        stored = _lookup(conn, 'observations', ['country', 'province', 'date'], rows,
+                         ['country', 'province', 'date', *metrics])
+        merged = rows.merge(stored, on=['country', 'province', 'date'], how='left', suffixes=('', '_old'),
+                            indicator=True)
+        exists = (merged['_merge'] == 'both').to_numpy()
+        old = merged[[f'{m}_old' for m in metrics]].to_numpy(dtype=float)
+        new = merged[metrics].to_numpy(dtype=float)
+        differs = exists & (old != new).any(axis=1)
+        write = ~exists | (differs if replace else False)
+        contribution = np.where(exists[:, None], new - np.nan_to_num(old), new)[write]
+        changed_rows = merged[write]
+        duplicates += int((exists & ~write).sum())
+
+        columns = ', '.join(f'"{m}"' for m in metrics)
+        updates = ', '.join(f'"{m}" = excluded."{m}"' for m in metrics)
+        conn.executemany(
+            f"INSERT INTO observations (country, province, date, {columns}) "
+            f"VALUES (?, ?, ?, {', '.join('?' * len(metrics))}) "
+            f"ON CONFLICT (country, province, date) DO UPDATE SET {updates}",
+            [(*key, *values) for key, values in zip(
+                changed_rows[['country', 'province', 'date']].itertuples(index=False, name=None),
+                changed_rows[metrics].astype(object).itertuples(index=False, name=None))])
+
+        # Add the contributions to the daily totals of every level they roll up into; rows
+        # of a country without a known region are left out of the region totals
+        contribution = pd.DataFrame(contribution, columns=metrics)
+        contribution['date'] = changed_rows['date'].to_numpy()
+        everything = np.ones(len(changed_rows), dtype=bool)
+        changed = {}
+        for level, keys, mask in (('country', changed_rows['country'], everything),
+                                  ('region', changed_rows['region'], (changed_rows['region'] != '').to_numpy()),
+                                  ('global', pd.Series('global', index=changed_rows.index), everything)):
+            totals = contribution[mask].assign(series=keys.to_numpy()[mask]).groupby(
+                ['series', 'date'], sort=True)[metrics].sum()
+            _add_totals(conn, level, totals, metrics)
+            changed[level] = sorted(set(totals.index.get_level_values('series')) |
+                                    (changed_regions if level == 'region' else set()))
+    return {'rows': len(df), 'accepted': int((~exists).sum()), 'replaced': int((exists & write).sum()),
+            'duplicates': duplicates, 'invalid': invalid, 'changed': changed}
+
+def _add_totals(conn, level: str, totals: pd.DataFrame, metrics: list):
+    """Add daily totals indexed by (series, date) to the stored totals of a level."""
+    columns = ', '.join(f'"{m}"' for m in metrics)
+    increments = ', '.join(f'"{m}" = "{m}" + excluded."{m}"' for m in metrics)
+    conn.executemany(
+        f"INSERT INTO daily (level, series, date, {columns}) "
+        f"VALUES ('{level}', ?, ?, {', '.join('?' * len(metrics))}) "
+        f"ON CONFLICT (level, series, date) DO UPDATE SET {increments}",
+        [(*key, *(_number(v) for v in values)) for key, values in zip(totals.index, totals.to_numpy())])
+
+def _number(value):
+    """Store whole numbers as SQLite integers."""
+    return int(value) if float(value).is_integer() else float(value)
+
+def ingest_file(path: str, db_path: str = AGGREGATE_DB_PATH, replace: bool = False,
+                chunk_rows: int = AGGREGATE_CHUNK_ROWS) -> dict:
+    """
+    Ingest a delta CSV into the store, in chunks, and record it as one batch.
+
+    Each chunk is applied in its own transaction; re-ingesting a file after an
+    interruption is safe, as rows already stored are duplicates.
+
+    Args:
+        path (str): CSV of new rows, with the columns of covid.csv.
+        db_path (str): Path of the aggregate store.
+        replace (bool): Let differing rows correct stored ones (see ingest_frame).
+        chunk_rows (int): Rows read and applied at a time.
+
+    Returns:
+        dict: Totals over the chunks as returned by ingest_frame, plus the 'batch_id'.
+    """
+    conn = connect(db_path)
+    try:
+        result = {'rows': 0, 'accepted': 0, 'replaced': 0, 'duplicates': 0, 'invalid': 0,
+                  'changed': {level: set() for level in LEVELS}}
+        with pd.read_csv(path, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                part = ingest_frame(conn, chunk, replace)
+                for name in ('rows', 'accepted', 'replaced', 'duplicates', 'invalid'):
+                    result[name] += part[name]
+                for level, names in part['changed'].items():
+                    result['changed'][level].update(names)
+        result['changed'] = {level: sorted(names) for level, names in result['changed'].items()}
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO batches (created_at, source, rows, accepted, replaced, duplicates, invalid, changed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (datetime.now(timezone.utc).isoformat(timespec='seconds'), os.path.abspath(path), result['rows'],
+                 result['accepted'], result['replaced'], result['duplicates'], result['invalid'],
+                 json.dumps(result['changed'])))
+        result['batch_id'] = cursor.lastrowid
+    finally:
+        conn.close()
+    logger.info(f"Ingested {path}: {result['accepted']} new, {result['replaced']} replaced, "
+                f"{result['duplicates']} duplicate and {result['invalid']} invalid rows; "
+                f"{sum(map(len, result['changed'].values()))} series changed.")
+    return result
+
+def changed_since(batch_id: int = 0, db_path: str = AGGREGATE_DB_PATH) -> dict:
+    """Return the series changed by the batches after batch_id, per level."""
+    conn = connect(db_path)
+    try:
+        changed = {level: set() for level in LEVELS}
+        for (names,) in conn.execute("SELECT changed FROM batches WHERE batch_id > ?", (batch_id,)):
+            for level, series in json.loads(names).items():
+                changed[level].update(series)
+        return {level: sorted(names) for level, names in changed.items()}
+    finally:
+        conn.close()
+
+def latest_batch(db_path: str = AGGREGATE_DB_PATH) -> int:
+    """Return the id of the last ingested batch, or 0 while the store is empty."""
+    conn = connect(db_path)
+    try:
+        return conn.execute("SELECT COALESCE(MAX(batch_id), 0) FROM batches").fetchone()[0]
+    finally:
+        conn.close()
+
+def read_parent_of(db_path: str = AGGREGATE_DB_PATH) -> dict:
+    """Return the region of every stored country whose region is known."""
+    conn = connect(db_path)
+    try:
+        return dict(conn.execute("SELECT country, region FROM countries WHERE region != ''").fetchall())
+    finally:
+        conn.close()
+
+def read_series(names=None, db_path: str = AGGREGATE_DB_PATH) -> dict:
+    """
+    Read daily series from the store as the frames the pipeline fits.
+
+    Args:
+        names (list, optional): Series to read (countries, regions or 'global'); all by default.
+        db_path (str): Path of the aggregate store.
+
+    Returns:
+        dict: DataFrames keyed by series name, indexed by a daily 'Date' from the series'
+            first to last stored day (days without data are 0), as SeriesCube.frame.
+    """
+    conn = connect(db_path)
+    try:
+        metrics = stored_metrics(conn)
+        if metrics is None:
+            return {}
+        columns = ', '.join(f'"{m}"' for m in metrics)
+        if names is None:
+            data = pd.read_sql_query(f"SELECT level, series, date, {columns} FROM daily ORDER BY level, series, date",
+                                     conn)
+        else:
+            keys = pd.DataFrame({'series': list(names)})
+            data = _lookup(conn, 'daily', ['series'], keys, ['level', 'series', 'date', *metrics])
+            data = data.sort_values(['level', 'series', 'date'])
+    finally:
+        conn.close()
+    frames = {}
+    for (_, series), group in data.groupby(['level', 'series'], sort=False):
+        dates = pd.to_datetime(group['date'])
+        index = pd.date_range(dates.iloc[0], dates.iloc[-1], freq='D', name='Date')
+        frame = group[metrics].set_axis(dates.to_numpy(), axis=0).reindex(index, fill_value=0)
+        frames[series] = frame.astype(np.int64) if all(
+            pd.api.types.is_integer_dtype(frame[m]) for m in metrics) else frame
+    return frames
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the incremental daily aggregate store.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest = sub.add_parser('ingest', help="Ingest a CSV of new (location, date) rows.")
+    ingest.add_argument('path')
+    ingest.add_argument('--replace', action='store_true', help="Let differing rows correct stored ones.")
+    changes = sub.add_parser('changes', help="List the series changed after a batch.")
+    changes.add_argument('--since', type=int, default=0)
+    args = parser.parse_args()
+    if args.command == 'ingest':
+        result = ingest_file(args.path, replace=args.replace)
+    else:
+        result = changed_since(args.since)
+    print(json.dumps(result, indent=2))
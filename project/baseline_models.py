@@ -0,0 +1,212 @@
+"""
+baseline_models.py
+Fast statistical forecasts fitted to every series at once, with Prophet as escalation.
+
+Each baseline is a batch function taking a (series, day) array whose rows are
+right-aligned on their last observation (NaN before their first one) and returning
+a (series, horizon) array of forecasts. Baselines are registered in BASELINES by
+name; config.BASELINE_MODELS selects the ones competing in fit_baselines.
+
+fit_baselines holds out the last days of every series, scores each baseline on
+them and keeps the best one per series when its holdout error is within
+BASELINE_MAX_ERROR. The other series are left for Prophet.
+
+A baseline keeps no fitted state beyond its input, so a series' forecast of any
+horizon is recomputed from what save_baseline writes: the chosen baseline, the
+series' history and the spread of its intervals (see predict_baseline).
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+from .config import BASELINE_MODELS, BASELINE_MAX_ERROR, BASELINE_MIN_HISTORY, FORECAST_PERIODS
+
+# Holt's damped trend: (alpha, beta, phi) candidates, the best one chosen per series
+DAMPED_TREND_GRID = [(alpha, beta, phi) for alpha in (0.2, 0.5, 0.8, 1.0)
+                     for beta in (0.05, 0.2, 0.5) for phi in (0.8, 0.9, 0.98)]
+# Days of history the log-linear growth is fitted on
+LOG_LINEAR_WINDOW = 14
+# Normal quantile of the 80% intervals Prophet reports by default
+INTERVAL_Z = 1.2816
+
+def damped_trend(values: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Holt's linear exponential smoothing with a damped trend, for every series at once.
+
+    Every (alpha, beta, phi) in DAMPED_TREND_GRID is run on every series in one
+    pass over the days; each series keeps the candidate with the smallest
+    one-step-ahead squared error. Missing days leave the state unchanged.
+
+    Args:
+        values (np.ndarray): Right-aligned (series, day) history.
+        horizon (int): Days to forecast.
+
+    Returns:
+        np.ndarray: (series, horizon) forecasts.
+    """
+    alpha, beta, phi = (np.array(p)[:, None] for p in zip(*DAMPED_TREND_GRID))
+    shape = (len(DAMPED_TREND_GRID), len(values))
+    level, trend, sse = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    started = np.zeros(len(values), dtype=bool)
+    for y in values.T:
+        valid = ~np.isnan(y)
+        update = valid & started
+        predicted = level + phi * trend
+        error = np.where(update, y - predicted, 0.0)
+        sse += error ** 2
+        new_level = predicted + alpha * error
+        trend = np.where(update, phi * trend + beta * (new_level - level - phi * trend), trend)
+        level = np.where(update, new_level, level)
+        # A series starts at its first observation with a flat trend
+        first = valid & ~started
+        level = np.where(first, y, level)
+        started |= valid
+    best = np.argmin(sse, axis=0)
+    columns = np.arange(len(values))
+    level, trend, phi = level[best, columns], trend[best, columns], phi[best, 0]
+    damping = np.cumsum(phi[:, None] ** np.arange(1, horizon + 1), axis=1)
+    return level[:, None] + trend[:, None] * damping
+
+def log_linear(values: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Exponential growth: a line fitted to log1p of the last LOG_LINEAR_WINDOW days.
+
+    Args:
+        values (np.ndarray): Right-aligned (series, day) history.
+        horizon (int): Days to forecast.
+
+    Returns:
+        np.ndarray: (series, horizon) forecasts; NaN for series with missing days in the window.
+    """
+    window = np.log1p(np.clip(values[:, -LOG_LINEAR_WINDOW:], 0, None))
+    t = np.arange(window.shape[1]) - (window.shape[1] - 1) / 2
+    slope = (window * t).sum(axis=1) / (t ** 2).sum()
+    intercept = window.mean(axis=1)
+    future = t[-1] + np.arange(1, horizon + 1)
+    return np.expm1(intercept[:, None] + slope[:, None] * future)
+
+BASELINES = {
+    'damped_trend': damped_trend,
+    'log_linear': log_linear,
+}
+
+def _right_aligned(frames):
+    """Stack the 'y' columns of frames into a (series, day) array aligned on their last row."""
+    length = max((len(f) for f in frames), default=0)
+    values = np.full((len(frames), length), np.nan)
+    for i, frame in enumerate(frames):
+        if len(frame):
+            values[i, length - len(frame):] = frame['y'].to_numpy(dtype=float)
+    return values
+
+def _forecast_frame(last_ds, yhat: np.ndarray, sigma: float) -> pd.DataFrame:
+    """Frame of a baseline forecast starting the day after last_ds, with intervals widening like a random walk's."""
+    spread = INTERVAL_Z * sigma * np.sqrt(np.arange(1, len(yhat) + 1))
+    return pd.DataFrame({
+        'ds': pd.date_range(pd.Timestamp(last_ds) + pd.Timedelta(days=1), periods=len(yhat), freq='D'),
+        'trend': yhat,
+        'yhat': yhat,
+        'yhat_lower': yhat - spread,
+        'yhat_upper': yhat + spread,
+    })
+
+def holdout_error(actual: np.ndarray, forecast: np.ndarray) -> np.ndarray:
+    """Weighted absolute percentage error per series: sum |error| / sum |actual| (NaN-safe)."""
+    absolute = np.abs(actual).sum(axis=1)
+    return np.abs(actual - forecast).sum(axis=1) / np.maximum(absolute, 1.0)
+
+def fit_baselines(frames: dict, horizon: int = FORECAST_PERIODS, models=BASELINE_MODELS,
+                  max_error: float = BASELINE_MAX_ERROR, holdout: int = FORECAST_PERIODS,
+                  min_history: int = BASELINE_MIN_HISTORY):
+    """
+    Forecast every series with the best baseline, or leave it for Prophet.
+
+    The last `holdout` days of each series are held out; each baseline forecasts
+    them from the rest and is scored with holdout_error. Series whose best error is
+    within max_error are refitted on their full history with that baseline. Series
+    shorter than holdout + min_history are always left for Prophet.
+
+    Args:
+        frames (dict): Frames with columns 'ds' and 'y', keyed by series key.
+        horizon (int): Days to forecast.
+        models (list): Names of the competing baselines in BASELINES.
+        max_error (float): Largest holdout error a baseline may have.
+        holdout (int): Days held out to score the baselines.
+        min_history (int): Days a baseline needs besides the holdout.
+
+    Returns:
+        tuple: (forecasts, choices, escalated) where forecasts maps keys to frames with
+            'ds', 'trend', 'yhat', 'yhat_lower' and 'yhat_upper' over the horizon, choices
+            maps the same keys to (model name, holdout error, interval sigma), and escalated
+            lists the keys left for Prophet.
+    """
+    keys = list(frames)
+    eligible = [k for k in keys if len(frames[k]) >= holdout + min_history and frames[k]['y'].notna().all()]
+    forecasts, choices = {}, {}
+    if eligible and models:
+        values = _right_aligned([frames[k] for k in eligible])
+        actual = values[:, -holdout:]
+        errors, predictions = [], []
+        for name in models:
+            fit = BASELINES[name]
+            predicted = fit(values[:, :-holdout], holdout)
+            errors.append(np.nan_to_num(holdout_error(actual, predicted), nan=np.inf))
+            predictions.append(predicted)
+        errors, predictions = np.array(errors), np.array(predictions)
+        best = np.argmin(errors, axis=0)
+        rows = np.arange(len(eligible))
+        best_error = errors[best, rows]
+        # Holdout errors of the chosen model, assumed to grow like a random walk's
+        residuals = actual - predictions[best, rows]
+        sigma = np.sqrt(np.mean(residuals ** 2 / np.arange(1, holdout + 1), axis=1))
+
+        accepted = best_error <= max_error
+        for m, name in enumerate(models):
+            selected = np.flatnonzero(accepted & (best == m))
+            if not len(selected):
+                continue
+            yhat = BASELINES[name](values[selected], horizon)
+            for i, row in enumerate(selected):
+                key = eligible[row]
+                forecasts[key] = _forecast_frame(frames[key]['ds'].iloc[-1], yhat[i], sigma[row])
+                choices[key] = (name, float(best_error[row]), float(sigma[row]))
+    escalated = [k for k in keys if k not in forecasts]
+    return forecasts, choices, escalated
+
+def save_baseline(path: str, model: str, frame: pd.DataFrame, sigma: float):
+    """
+    Atomically save what a baseline forecast is recomputed from.
+
+    Args:
+        path (str): JSON file to write (see model_registry.baseline_path_for).
+        model (str): Name of the chosen baseline in BASELINES.
+        frame (pd.DataFrame): History the baseline was fitted on, with columns 'ds' and 'y'.
+        sigma (float): Interval sigma, as in the choices of fit_baselines.
+    """
+    state = {'model': model, 'last_ds': str(pd.Timestamp(frame['ds'].iloc[-1]).date()),
+             'y': frame['y'].astype(float).tolist(), 'sigma': sigma}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def load_baseline(path: str) -> dict:
+    """Load a baseline state written by save_baseline."""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def predict_baseline(state: dict, horizon: int) -> pd.DataFrame:
+    """
+    Forecast a series from its saved baseline state over any horizon.
+
+    The first days equal the forecast fit_baselines made when the state was saved.
+
+    Args:
+        state (dict): Baseline state as returned by load_baseline.
+        horizon (int): Days to forecast.
+
+    Returns:
+        pd.DataFrame: Forecast with the columns of the frames of fit_baselines.
+    """
+    yhat = BASELINES[state['model']](np.array([state['y']], dtype=float), horizon)[0]
+    return _forecast_frame(state['last_ds'], yhat, state['sigma'])
@@ -0,0 +1,237 @@
+"""
+benchmark.py
+Time and memory benchmarks of every pipeline stage on synthetic data.
+
+Each run generates a covid.csv-shaped dataset at the requested scale (see
+synthetic_data.py), then records wall time, CPU time, peak Python memory
+(tracemalloc) and row counts for each stage. Results are written as one JSON
+file per run under Benchmarks/ and can be compared between commits.
+
+Examples:
+    python -m project.benchmark --scale 1 10 100
+    python -m project.benchmark --compare Benchmarks/old.json Benchmarks/new.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from .config import BENCHMARK_DIR, TARGETS, FORECAST_PERIODS
+
+class StageRecorder:
+    """
+    Collects one measurement per benchmarked stage.
+
+    Args:
+        trace_memory (bool): Record peak Python allocations with tracemalloc (slower).
+    """
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name: str, rows: int = None):
+        """Measure the enclosed block. The yielded dict may be updated with 'rows' or extra fields."""
+        record = {'stage': name, 'rows': rows}
+        if self.trace_memory:
+            tracemalloc.start()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - wall
+            record['cpu_seconds'] = time.process_time() - cpu
+            if self.trace_memory:
+                record['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+            self.stages.append(record)
+
+def git_commit():
+    """Return the current git commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(scale: float = 1, n_days: int = 188, fit_series: int = 3,
+                  trace_memory: bool = True, seed: int = 0) -> dict:
+    """
+    Benchmark every pipeline stage on a synthetic dataset.
+
+    Prophet fitting and prediction are timed on `fit_series` series only, since they
+    dominate and scale linearly; fast_predict and the store stages cover every series.
+
+    Args:
+        scale (float): Multiplier on today's number of countries.
+        n_days (int): Days per location.
+        fit_series (int): Number of series fitted with Prophet.
+        trace_memory (bool): Record peak memory with tracemalloc.
+        seed (int): Seed of the synthetic data.
+
+    Returns:
+        dict: Run metadata and a list of stage records.
+    """
+    # Imported here so that --compare does not pay for Prophet
+    from .synthetic_data import write_covid_csv
+    from .data_acquisition import load_covid_data, load_clean_covid_data, stream_series_cube
+    from .data_preprocessing import clean_data, preprocess_grouped_data, preprocess_all_levels
+    from .feature_engineering import long_frame, build_features
+    from .modeling import train_prophet_model, make_future_dataframe, predict
+    from .fast_predict import extract_params, predict_batch
+    from .baseline_models import fit_baselines
+    from .forecast_store import write_forecasts
+    from .dashboard_data import load_forecast_index
+
+    recorder = StageRecorder(trace_memory)
+    work_dir = tempfile.mkdtemp(prefix='covid-benchmark-')
+    try:
+        csv_path = os.path.join(work_dir, 'covid.csv')
+        raw = write_covid_csv(csv_path, scale, n_days=n_days, seed=seed)
+        del raw
+
+        with recorder.stage('load_covid_data') as record:
+            df = load_covid_data(csv_path)
+            record['rows'] = len(df)
+        with recorder.stage('clean_data', rows=len(df)):
+            df = clean_data(df)
+        with recorder.stage('preprocess_grouped_data', rows=len(df)) as record:
+            countries = preprocess_grouped_data(df, 'Country/Region')
+            record['series'] = len(countries)
+        with recorder.stage('preprocess_all_levels', rows=len(df)) as record:
+            global_data, region_data, country_data = preprocess_all_levels(df)
+            datasets = {'global': global_data, **region_data, **country_data}
+            record['series'] = len(datasets)
+        with recorder.stage('stream_series_cube', rows=len(df)):
+            stream_series_cube(csv_path)
+        with recorder.stage('feature_engineering', rows=sum(len(d) for d in datasets.values())) as record:
+            record['columns'] = build_features(long_frame(datasets, horizon=FORECAST_PERIODS), TARGETS).shape[1]
+
+        cache_dir = os.path.join(work_dir, 'cache')
+        with recorder.stage('load_clean_covid_data_cold', rows=len(df)):
+            load_clean_covid_data(csv_path, cache_dir)
+        with recorder.stage('load_clean_covid_data_cached', rows=len(df)):
+            load_clean_covid_data(csv_path, cache_dir)
+
+        names = list(datasets)[:fit_series]
+        frames = [datasets[name].reset_index()[['Date', TARGETS[0]]].rename(
+            columns={'Date': 'ds', TARGETS[0]: 'y'}) for name in names]
+        with recorder.stage('train_prophet_model', rows=sum(len(f) for f in frames)) as record:
+            models = [train_prophet_model(frame) for frame in frames]
+            record['series'] = len(models)
+        with recorder.stage('predict', rows=sum(len(f) + FORECAST_PERIODS for f in frames)) as record:
+            for model in models:
+                predict(model, make_future_dataframe(model, periods=FORECAST_PERIODS))
+            record['series'] = len(models)
+
+        baseline_frames = {f'{name}_{target}': datasets[name].reset_index()[['Date', target]].rename(
+            columns={'Date': 'ds', target: 'y'}) for name in datasets for target in TARGETS}
+        with recorder.stage('baseline_tier', rows=sum(len(f) for f in baseline_frames.values())) as record:
+            baseline_forecasts, _, escalated = fit_baselines(baseline_frames, FORECAST_PERIODS)
+            record['series'] = len(baseline_frames)
+            record['escalated'] = len(escalated)
+
+        # Every (series, target) key is served by one of the fitted models' parameters
+        params = [extract_params(model) for model in models]
+        keys = [(name, target) for name in datasets for target in TARGETS]
+        params_by_key = {key: params[i % len(params)] for i, key in enumerate(keys)}
+        with recorder.stage('fast_predict', rows=len(keys) * FORECAST_PERIODS) as record:
+            forecasts = predict_batch(params_by_key, FORECAST_PERIODS, seed=0)
+            record['series'] = len(keys)
+
+        db_path = os.path.join(work_dir, 'forecasts.sqlite')
+        with recorder.stage('write_forecasts', rows=len(keys) * FORECAST_PERIODS):
+            write_forecasts(forecasts, note='benchmark', db_path=db_path)
+        with recorder.stage('load_forecast_index', rows=len(keys) * FORECAST_PERIODS):
+            load_forecast_index(db_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'scale': scale,
+        'n_days': n_days,
+        'trace_memory': trace_memory,
+        'stages': recorder.stages,
+    }
+
+def save_result(result: dict, out_dir: str = BENCHMARK_DIR) -> str:
+    """Write a benchmark result as JSON and return its path."""
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    commit = (result.get('commit') or 'nocommit')[:8]
+    path = os.path.join(out_dir, f"benchmark-{stamp}-{commit}-x{result['scale']:g}.json")
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+    return path
+
+def compare_results(baseline: dict, current: dict, tolerance: float = 0.2) -> list:
+    """
+    Compare the wall time of every stage between two benchmark results.
+
+    Args:
+        baseline (dict): Earlier result.
+        current (dict): Later result.
+        tolerance (float): Relative slowdown above which a stage counts as a regression.
+
+    Returns:
+        list: Dicts with 'stage', 'baseline', 'current', 'ratio' and 'regression' for
+            stages present in both results.
+    """
+    before = {s['stage']: s['seconds'] for s in baseline['stages']}
+    rows = []
+    for stage in current['stages']:
+        if stage['stage'] not in before:
+            continue
+        ratio = stage['seconds'] / before[stage['stage']] if before[stage['stage']] else float('inf')
+        rows.append({'stage': stage['stage'], 'baseline': before[stage['stage']], 'current': stage['seconds'],
+                     'ratio': ratio, 'regression': ratio > 1 + tolerance})
+    return rows
+
+def format_stages(result: dict) -> str:
+    """Render a result's stages as a text table."""
+    lines = [f"scale x{result['scale']:g} ({result.get('commit') or 'no commit'})",
+             f"{'stage':32} {'seconds':>10} {'cpu':>10} {'peak MB':>9} {'rows':>10}"]
+    for s in result['stages']:
+        peak = f"{s['peak_mb']:.1f}" if 'peak_mb' in s else '-'
+        lines.append(f"{s['stage']:32} {s['seconds']:10.4f} {s['cpu_seconds']:10.4f} {peak:>9} {s['rows'] or 0:>10}")
+    return '\n'.join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument('--scale', type=float, nargs='+', default=[1],
+                        help="Multipliers on today's number of countries, e.g. 1 10 100.")
+    parser.add_argument('--days', type=int, default=188)
+    parser.add_argument('--fit-series', type=int, default=3, help="Series fitted with Prophet.")
+    parser.add_argument('--no-memory', action='store_true', help="Skip tracemalloc (faster, no peak_mb).")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help="Compare two saved results instead of running.")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        rows = compare_results(baseline, current, args.tolerance)
+        for row in rows:
+            flag = '  REGRESSION' if row['regression'] else ''
+            print(f"{row['stage']:32} {row['baseline']:10.4f} -> {row['current']:10.4f}  x{row['ratio']:.2f}{flag}")
+        sys.exit(1 if any(row['regression'] for row in rows) else 0)
+
+    for scale in args.scale:
+        result = run_benchmark(scale, args.days, args.fit_series, not args.no_memory)
+        print(format_stages(result))
+        print(f"Saved {save_result(result)}\n")
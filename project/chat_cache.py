@@ -0,0 +1,395 @@
+"""
+chat_cache.py
+Answer and web-search caching for the project chatbot.
+
+CachedChatbot answers questions through pluggable backends:
+- llm(system_prompt, question) -> str
+- search(query) -> str
+
+Answers are cached under both the exact question and a normalized form (case,
+punctuation and whitespace folded), with TTL and LRU eviction. The answer cache
+can be persisted to disk. Web-search results have their own TTL cache, so a
+repeated question costs no API call. Numeric questions can be answered from local
+data through a local_answer hook, bypassing the LLM or sending it only the
+computed facts. ask_stream and ask_async stream the LLM answer, optionally with a
+speculative web search running alongside it, with per-call timeouts. Web results
+are appended to an answer in one format, so a cached answer reads exactly as it
+was streamed. The module has no LLM
+dependencies, which lets tests plug in local stubs.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+FALLBACK_PHRASES = [
+    "I don't know", "I'm not sure", "cannot answer", "don't have information", "no information", "Sorry",
+    "as an AI language model"
+]
+
+LOCAL_PROMPT = (
+    "You are a COVID-19 data assistant. Answer the user's question in one or two sentences "
+    "using only these facts computed from the project's data:\n"
+)
+
+def normalize_question(question: str) -> str:
+    """Fold case, punctuation and whitespace so trivially different phrasings share a cache entry."""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', question.casefold()).split())
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after `ttl` seconds.
+
+    Args:
+        max_size (int): Maximum number of entries kept.
+        ttl (float): Lifetime of an entry in seconds.
+        path (str, optional): JSON file the cache is loaded from and saved to on every write.
+        clock (callable): Returns the current time in seconds (wall time, so it survives restarts).
+    """
+
+    def __init__(self, max_size: int, ttl: float, path: str = None, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = self.clock()
+        for key, (stored_at, value) in entries:
+            if now - stored_at < self.ttl:
+                self._entries[key] = (stored_at, value)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump([[key, list(entry)] for key, entry in self._entries.items()], f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key):
+        """Return the cached value, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self.clock() - entry[0] >= self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, save: bool = True):
+        """
+        Store a value, evicting the least recently used entries beyond max_size.
+
+        With save=False a persistent cache is not rewritten; the next saving write includes the entry.
+        """
+        with self._lock:
+            self._entries[key] = (self.clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            if self.path and save:
+                self._save()
+
+    def clear(self):
+        """Drop every entry, on disk too."""
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._save()
+
+    def __len__(self):
+        return len(self._entries)
+
+class CachedChatbot:
+    """
+    Chatbot answering from a cache first, then from the LLM, with web search as fallback.
+
+    Args:
+        llm (callable): llm(system_prompt, question) returning the answer text.
+        search (callable): search(query) returning web results; may raise on failure.
+        system_prompt (str or callable): Static context, or a function building it (called once).
+        answer_cache (TTLCache): Cache of final answers.
+        search_cache (TTLCache): Cache of web-search results.
+        fallback_phrases (list): Phrases marking an answer the LLM could not give.
+        local_answer (callable, optional): local_answer(question) returning a dict with 'answer'
+            and 'snippet' for questions answerable from local data, else None (see data_query.py).
+        phrase_local (bool): Have the LLM phrase local answers from their snippet only,
+            instead of returning them as computed.
+        llm_stream (callable, optional): llm_stream(system_prompt, question) yielding answer
+            chunks; ask_stream falls back to a single llm call without it.
+    """
+
+    def __init__(self, llm, search, system_prompt, answer_cache: TTLCache, search_cache: TTLCache,
+                 fallback_phrases=FALLBACK_PHRASES, local_answer=None,
+                 phrase_local: bool = False, llm_stream=None):
+        self.llm = llm
+        self.search = search
+        self._system_prompt = system_prompt
+        self.answer_cache = answer_cache
+        self.search_cache = search_cache
+        self.fallback_phrases = [phrase.lower() for phrase in fallback_phrases]
+        self.local_answer = local_answer
+        self.phrase_local = phrase_local
+        self.llm_stream = llm_stream
+        # Runs speculative searches and the backends of ask_async
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='chatbot')
+
+    @property
+    def system_prompt(self) -> str:
+        """The static context, built on first use."""
+        if callable(self._system_prompt):
+            self._system_prompt = self._system_prompt()
+        return self._system_prompt
+
+    @staticmethod
+    def _keys(question, context):
+        scope = hashlib.sha1(context.encode()).hexdigest()[:12] if context else ''
+        return f'{scope}:exact:{question.strip()}', f'{scope}:norm:{normalize_question(question)}'
+
+    def needs_fallback(self, answer: str) -> bool:
+        """Return True if the LLM answer is too short or admits it does not know."""
+        lowered = answer.lower()
+        return any(phrase in lowered for phrase in self.fallback_phrases) or len(answer.strip()) < 10
+
+    def web_search(self, query: str) -> str:
+        """Return cached web results for a query, searching on a miss. Search errors propagate."""
+        key = normalize_question(query)
+        result = self.search_cache.get(key)
+        if result is None:
+            result = self.search(query) or "No relevant web search results found."
+            self.search_cache.set(key, result)
+        return result
+
+    def _cached(self, question, context, use_cache):
+        """Return (keys, cached answer or None)."""
+        keys = self._keys(question, context)
+        if use_cache:
+            for key in keys:
+                answer = self.answer_cache.get(key)
+                if answer is not None:
+                    return keys, answer
+        return keys, None
+
+    def _store(self, keys, answer):
+        exact_key, norm_key = keys
+        self.answer_cache.set(exact_key, answer, save=False)
+        self.answer_cache.set(norm_key, answer)
+
+    def _local(self, question, timeout: float = None):
+        """
+        Return the local answer to a question, or None if it needs the LLM.
+
+        When phrase_local is set and the LLM does not phrase the answer within `timeout`
+        seconds (or fails), the computed answer is returned instead.
+        """
+        local = self.local_answer(question) if self.local_answer else None
+        if local is None:
+            return None
+        if self.phrase_local:
+            try:
+                return ''.join(self._stream_llm(LOCAL_PROMPT + local['snippet'], question, timeout))
+            except Exception:
+                return local['answer']
+        return local['answer']
+
+    @staticmethod
+    def _web_section(web_result):
+        return f"\n\n[Web Search]: {web_result}"
+
+    def _combine(self, answer, web_result):
+        """Append web results to an answer, exactly as ask_stream streams them."""
+        return answer + self._web_section(web_result)
+
+    def ask(self, question: str, context: str = None, use_cache: bool = True) -> str:
+        """
+        Answer a question, serving repeated (or trivially rephrased) questions from the cache.
+
+        Args:
+            question (str): The user's question.
+            context (str, optional): Extra context prepended to the system prompt; part of the cache key.
+            use_cache (bool): Set to False to force a fresh answer (which is still cached).
+
+        Returns:
+            str: The answer, combined with web results when the LLM could not answer.
+        """
+        keys, answer = self._cached(question, context, use_cache)
+        if answer is not None:
+            return answer
+        answer = self._local(question)
+        if answer is None:
+            answer = self.llm((context or "") + self.system_prompt, question)
+            if self.needs_fallback(answer):
+                try:
+                    web_result = self.web_search(question)
+                except Exception as e:
+                    # Not cached, so the search is retried on the next ask
+                    return self._combine(answer, f"Web search error: {e}")
+                answer = self._combine(answer, web_result)
+        self._store(keys, answer)
+        return answer
+
+    def _stream_llm(self, system_prompt, question, timeout):
+        """
+        Yield LLM chunks from a producer thread, raising TimeoutError once `timeout` seconds pass.
+
+        On timeout the producer is told to stop and abandons the stream after its current chunk.
+        """
+        chunks = queue.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                stream = self.llm_stream(system_prompt, question) if self.llm_stream else \
+                    iter([self.llm(system_prompt, question)])
+                for chunk in stream:
+                    if stop.is_set():
+                        break
+                    chunks.put(chunk)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(done)
+
+        threading.Thread(target=produce, daemon=True, name='llm-stream').start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                item = chunks.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                stop.set()
+                raise TimeoutError(f"no complete answer within {timeout}s")
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def ask_stream(self, question: str, context: str = None, use_cache: bool = True,
+                   speculative_search: bool = False, llm_timeout: float = None, search_timeout: float = None):
+        """
+        Answer a question as a stream of text chunks (e.g. for st.write_stream).
+
+        The web search starts alongside the LLM when speculative_search is set, so a
+        fallback answer does not wait for two calls back to back; it is dropped when
+        the LLM answers on its own. Cached and local answers never search. An LLM call running past llm_timeout is abandoned
+        and the web results are used instead.
+
+        Args:
+            question (str): The user's question.
+            context (str, optional): Extra context prepended to the system prompt.
+            use_cache (bool): Set to False to force a fresh answer (which is still cached).
+            speculative_search (bool): Start the web search before the LLM has answered.
+            llm_timeout (float, optional): Seconds allowed for the whole LLM answer.
+            search_timeout (float, optional): Seconds allowed for the web search.
+
+        Yields:
+            str: Chunks of the answer.
+        """
+        keys, answer = self._cached(question, context, use_cache)
+        if answer is None:
+            answer = self._local(question, llm_timeout)
+            if answer is not None:
+                self._store(keys, answer)
+        if answer is not None:
+            yield answer
+            return
+
+        search_future = self._executor.submit(self.web_search, question) if speculative_search else None
+        chunks, timed_out = [], False
+        try:
+            for chunk in self._stream_llm((context or "") + self.system_prompt, question, llm_timeout):
+                chunks.append(chunk)
+                yield chunk
+        except TimeoutError:
+            timed_out = True
+        answer = ''.join(chunks)
+        if not timed_out and not self.needs_fallback(answer):
+            if search_future is not None:
+                search_future.cancel()
+            self._store(keys, answer)
+            return
+
+        if search_future is None:
+            search_future = self._executor.submit(self.web_search, question)
+        try:
+            web_result = search_future.result(timeout=search_timeout)
+        except FutureTimeoutError:
+            web_result, timed_out = "Web search timed out.", True
+        except Exception as e:
+            web_result, timed_out = f"Web search error: {e}", True
+        yield self._web_section(web_result)
+        # Answers cut short by a timeout or error are not cached, so they are retried
+        if not timed_out:
+            self._store(keys, self._combine(answer, web_result))
+
+    async def ask_async(self, question: str, context: str = None, use_cache: bool = True,
+                        speculative_search: bool = False, llm_timeout: float = None,
+                        search_timeout: float = None) -> str:
+        """
+        Asyncio variant of ask with a speculative web search and per-call timeouts.
+
+        Arguments are as for ask_stream. Backends run on the chatbot's thread pool; a call
+        that times out is cancelled on the event loop and its result discarded.
+
+        Returns:
+            str: The answer, combined with web results when the LLM could not answer or timed out.
+        """
+        keys, answer = self._cached(question, context, use_cache)
+        if answer is not None:
+            return answer
+        loop = asyncio.get_running_loop()
+        answer = await loop.run_in_executor(self._executor, self._local, question, llm_timeout)
+        if answer is not None:
+            self._store(keys, answer)
+            return answer
+
+        search_task = loop.run_in_executor(self._executor, self.web_search, question) \
+            if speculative_search else None
+        timed_out = False
+        try:
+            answer = await asyncio.wait_for(
+                loop.run_in_executor(self._executor, self.llm, (context or "") + self.system_prompt, question),
+                llm_timeout)
+        except asyncio.TimeoutError:
+            answer, timed_out = '', True
+        if not timed_out and not self.needs_fallback(answer):
+            if search_task is not None:
+                search_task.cancel()
+            self._store(keys, answer)
+            return answer
+
+        if search_task is None:
+            search_task = loop.run_in_executor(self._executor, self.web_search, question)
+        try:
+            web_result = await asyncio.wait_for(search_task, search_timeout)
+        except asyncio.TimeoutError:
+            web_result, timed_out = "Web search timed out.", True
+        except Exception as e:
+            web_result, timed_out = f"Web search error: {e}", True
+        answer = self._combine(answer, web_result)
+        if not timed_out:
+            self._store(keys, answer)
+        return answer
@@ -2,15 +2,23 @@
 chatbot_gemini.py
 A Streamlit-compatible chatbot script using Google Gemini LLM via LangChain.
 This script provides a function to get answers from Gemini and can be integrated into your Streamlit app.
+Answers and web-search results are cached (see chat_cache.py), so repeated questions cost no API calls.
+ask_gemini_stream yields the answer as Gemini produces it, for st.write_stream.
+The LangChain and Google GenAI packages are imported on the first question, not on import.
 """
 import os
 import streamlit as st
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.prompts import ChatPromptTemplate
 
 # Import the DuckDuckGo web search agent
-from project.web_search_agent import web_search
+from project.web_search_agent import search_web
+from project.chat_cache import CachedChatbot, TTLCache
+from project.data_query import DataQueryEngine
+from project.data_acquisition import load_clean_covid_data
+from project.logging_config import logger
+from project.config import (RAW_DATA_PATH, CHAT_CACHE_PATH, CHAT_CACHE_SIZE, CHAT_CACHE_TTL,
+                            SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL, CHAT_LOCAL_QUERIES,
+                            CHAT_PHRASE_LOCAL_ANSWERS, CHAT_LLM_TIMEOUT, CHAT_SEARCH_TIMEOUT,
+                            CHAT_SPECULATIVE_SEARCH)
 
 # Set your Gemini API key (ensure this is set in your environment for security)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -20,6 +28,7 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 def get_gemini_llm():
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY environment variable not set.")
+    from langchain_google_genai import ChatGoogleGenerativeAI
     return ChatGoogleGenerativeAI(
         model="gemini-2.0-flash",
         google_api_key=GEMINI_API_KEY,
@@ -27,16 +36,12 @@ def get_gemini_llm():
         max_output_tokens=2048,
     )
 
-def ask_gemini(question, context=None):
+def build_system_prompt():
     """
-    Query Gemini LLM with a user question and optional context. If Gemini cannot answer, fallback to DuckDuckGo web search.
-    Args:
-        question (str): The user's question.
-        context (str, optional): Additional context or data to provide to the LLM.
+    Build the static system prompt with project and data context.
     Returns:
-        str: The LLM's answer or web search result.
+        str: System prompt, including a small sample of the data when it can be read.
     """
-    # System prompt with project and data context
     system_prompt = (
         "You are a helpful COVID-19 data assistant for a time series forecasting and visualization dashboard. "
         "You have access to global COVID-19 data with the following columns: Province/State, Country/Region, Lat, Long, Date, Confirmed, Deaths, Recovered, Active, WHO Region. "
@@ -48,34 +53,121 @@ def ask_gemini(question, context=None):
     data_sample = ""
     try:
         import pandas as pd
-        df = pd.read_csv("../Data_original/covid.csv", nrows=3)
+        df = pd.read_csv(RAW_DATA_PATH, nrows=3)
         data_sample = f"\nHere is a sample of the data (first 3 rows):\n{df.to_markdown(index=False)}\n"
     except Exception:
         pass
-    full_context = (context or "") + system_prompt + data_sample
-    llm = get_gemini_llm()
+    return system_prompt + data_sample
+
+def gemini_answer(system_prompt, question):
+    """
+    Ask Gemini a single question.
+    Args:
+        system_prompt (str): System message sent with the question.
+        question (str): The user's question.
+    Returns:
+        str: The LLM's answer.
+    """
+    from langchain_core.messages import HumanMessage, SystemMessage
     messages = [
-        SystemMessage(content=full_context),
+        SystemMessage(content=system_prompt),
         HumanMessage(content=question)
     ]
-    response = llm.invoke(messages)
-    answer = response.content if hasattr(response, 'content') else str(response)
-    fallback_phrases = [
-        "I don't know", "I'm not sure", "cannot answer", "don't have information", "no information", "Sorry", "as an AI language model"
+    response = get_gemini_llm().invoke(messages)
+    return response.content if hasattr(response, 'content') else str(response)
+
+def gemini_stream(system_prompt, question):
+    """
+    Ask Gemini a single question, yielding the answer in chunks as they arrive.
+    Args:
+        system_prompt (str): System message sent with the question.
+        question (str): The user's question.
+    Yields:
+        str: Chunks of the LLM's answer.
+    """
+    from langchain_core.messages import HumanMessage, SystemMessage
+    messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=question)
     ]
-    if any(phrase.lower() in answer.lower() for phrase in fallback_phrases) or len(answer.strip()) < 10:
-        web_result = web_search(question)
-        return f"[Gemini]: {answer}\n\n[Web Search]: {web_result}"
-    return answer
+    for chunk in get_gemini_llm().stream(messages):
+        content = chunk.content if hasattr(chunk, 'content') else str(chunk)
+        if content:
+            yield content
+
+@st.cache_resource
+def get_query_engine():
+    """Return the local data query engine, or None if the data cannot be loaded."""
+    try:
+        return DataQueryEngine.from_frame(load_clean_covid_data())
+    except Exception as e:
+        logger.error(f"Local data queries disabled: {e}")
+        return None
+
+@st.cache_resource
+def get_chatbot():
+    """Return the process-wide cached chatbot backed by Gemini, DuckDuckGo and the local query engine."""
+    engine = get_query_engine() if CHAT_LOCAL_QUERIES else None
+    return CachedChatbot(
+        llm=gemini_answer,
+        llm_stream=gemini_stream,
+        search=search_web,
+        system_prompt=build_system_prompt,
+        answer_cache=TTLCache(CHAT_CACHE_SIZE, CHAT_CACHE_TTL, path=CHAT_CACHE_PATH),
+        search_cache=TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL),
+        local_answer=engine.answer if engine else None,
+        phrase_local=CHAT_PHRASE_LOCAL_ANSWERS,
+    )
+
+def ask_gemini(question, context=None, use_cache=True):
+    """
+    Query Gemini LLM with a user question and optional context. If Gemini cannot answer, fallback to DuckDuckGo web search.
+    Repeated or trivially rephrased questions are answered from the cache.
+    Args:
+        question (str): The user's question.
+        context (str, optional): Additional context or data to provide to the LLM.
+        use_cache (bool): Set to False to bypass cached answers.
+    Returns:
+        str: The LLM's answer or web search result.
+    """
+    return get_chatbot().ask(question, context=context, use_cache=use_cache)
+
+def ask_gemini_stream(question, context=None, use_cache=True):
+    """
+    Like ask_gemini, but yield the answer in chunks as Gemini produces it (for st.write_stream).
+    The web search is only shown if Gemini cannot answer in time (with CHAT_SPECULATIVE_SEARCH
+    it starts alongside Gemini).
+    Args:
+        question (str): The user's question.
+        context (str, optional): Additional context or data to provide to the LLM.
+        use_cache (bool): Set to False to bypass cached answers.
+    Yields:
+        str: Chunks of the answer.
+    """
+    return get_chatbot().ask_stream(question, context=context, use_cache=use_cache,
+                                    speculative_search=CHAT_SPECULATIVE_SEARCH,
+                                    llm_timeout=CHAT_LLM_TIMEOUT, search_timeout=CHAT_SEARCH_TIMEOUT)
+
+async def ask_gemini_async(question, context=None, use_cache=True):
+    """
+    Asyncio variant of ask_gemini with the configured timeouts and speculative web search.
+    Args:
+        question (str): The user's question.
+        context (str, optional): Additional context or data to provide to the LLM.
+        use_cache (bool): Set to False to bypass cached answers.
+    Returns:
+        str: The LLM's answer or web search result.
+    """
+    return await get_chatbot().ask_async(question, context=context, use_cache=use_cache,
+                                         speculative_search=CHAT_SPECULATIVE_SEARCH,
+                                         llm_timeout=CHAT_LLM_TIMEOUT, search_timeout=CHAT_SEARCH_TIMEOUT)
 
 # Example Streamlit UI usage:
 if __name__ == "__main__":
     st.title("Gemini Chatbot Demo")
     user_q = st.text_input("Ask a question:")
     if user_q:
-        with st.spinner("Gemini is thinking..."):
-            try:
-                answer = ask_gemini(user_q)
-                st.success(answer)
-            except Exception as e:
-                st.error(f"Error: {e}")
+        try:
+            st.write_stream(ask_gemini_stream(user_q))
+        except Exception as e:
+            st.error(f"Error: {e}")
@@ -6,6 +6,14 @@ RAW_DATA_PATH = os.path.join(DATA_DIR, 'covid.csv')
 MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'Models')
 PARAMS_DIR = os.path.join(os.path.dirname(__file__), '..', 'Model_parameters')
 FORECAST_DIR = os.path.join(os.path.dirname(__file__), '..', 'Data_modified')
+FORECAST_DB_PATH = os.path.join(FORECAST_DIR, 'forecasts.sqlite')
+MANIFEST_PATH = os.path.join(MODEL_DIR, 'training_manifest.json')
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'Cache')
+CV_CACHE_DIR = os.path.join(CACHE_DIR, 'cv_folds')
+BENCHMARK_DIR = os.path.join(os.path.dirname(__file__), '..', 'Benchmarks')
+LOGS_DIR = os.path.join(os.path.dirname(__file__), '..', 'logs')
+METRICS_PATH = os.path.join(LOGS_DIR, 'metrics.jsonl')
+METRICS_SNAPSHOT_PATH = os.path.join(LOGS_DIR, 'metrics.prom')
 
 # Prophet hyperparameter grid
 PROPHET_PARAM_GRID = {
@@ -14,3 +22,108 @@ PROPHET_PARAM_GRID = {
     "seasonality_mode": ['additive', 'multiplicative'],
     "changepoint_range": [0.5, 0.6125, 0.725, 0.8375, 0.95],
 }
+
+# Model registry: models are saved as Prophet JSON; at most MODEL_CACHE_SIZE stay loaded
+MODEL_SUFFIX = '_prophet_model.json'
+LEGACY_MODEL_SUFFIX = '_prophet_model.joblib'
+# Series forecast by the baseline tier save the chosen baseline and its input instead
+BASELINE_SUFFIX = '_baseline.json'
+MODEL_CACHE_SIZE = 64
+
+# Pipeline execution
+TARGETS = ['Confirmed', 'Deaths', 'Recovered', 'Active']
+FORECAST_PERIODS = 7
+# Number of worker processes used to fit series; 1 runs in-process, -1 uses every core
+N_JOBS = 1
+# Evaluate forecasts with the NumPy engine in fast_predict instead of Prophet.predict
+FAST_PREDICT = True
+# Stream the raw CSV in chunks straight into daily series totals instead of loading
+# it whole; a chunk and its working arrays stay within INGEST_MEMORY_BUDGET_MB
+INGEST_CHUNKED = False
+INGEST_MEMORY_BUDGET_MB = 256
+
+# Incremental ingestion (aggregate_store.py): accepted raw rows and the daily totals of
+# every country, WHO region and global, updated from delta files AGGREGATE_CHUNK_ROWS at a time
+AGGREGATE_DB_PATH = os.path.join(FORECAST_DIR, 'aggregates.sqlite')
+AGGREGATE_CHUNK_ROWS = 100_000
+
+# Baseline tier (baseline_models.py): series whose best baseline is within
+# BASELINE_MAX_ERROR (weighted absolute percentage error over the last
+# FORECAST_PERIODS days) skip Prophet; the others are escalated to it
+BASELINE_TIER = True
+BASELINE_MODELS = ['damped_trend', 'log_linear']
+BASELINE_MAX_ERROR = 0.05
+BASELINE_MIN_HISTORY = 14
+
+# Hierarchical mode (hierarchy.py): fit only HIERARCHY_LEVEL ('country', 'region' or
+# 'global') and derive the other levels bottom-up by summing, top-down by each
+# series' share of its parent over the last HIERARCHY_SHARE_DAYS days. None fits
+# every level independently; HIERARCHY_RECONCILE fits every level and reconciles them.
+HIERARCHY_LEVEL = None
+HIERARCHY_RECONCILE = False
+HIERARCHY_SHARE_DAYS = 7
+
+# Sharded runs (sharding.py): the fitting jobs are split into SHARD_COUNT shards that
+# any number of workers claim through a SQLite job table in SHARD_DIR (put it on a
+# filesystem shared by every node). A shard whose worker has not checkpointed a series
+# for SHARD_LEASE_SECONDS is handed to another worker.
+SHARD_DIR = os.path.join(os.path.dirname(__file__), '..', 'Shards')
+SHARD_COUNT = 16
+SHARD_LEASE_SECONDS = 900
+
+# Accuracy leaderboard (evaluation.py): backtest every fitted series on its last
+# EVALUATION_HOLDOUT days after each pipeline run; costs roughly one more fit per series
+EVALUATE = False
+EVALUATION_HOLDOUT = FORECAST_PERIODS
+
+# Feature engineering (feature_engineering.py): lags and rolling windows in days.
+# FEATURE_REGRESSORS names features passed to Prophet as extra regressors; '{target}'
+# is replaced by the modeled column, e.g. ['{target}_lag_7', 'is_weekend']. Only
+# features known over the forecast window (lags >= FORECAST_PERIODS, calendar) qualify.
+FEATURE_LAGS = [1, 7, 14]
+FEATURE_WINDOWS = [7, 14]
+FEATURE_REGRESSORS = []
+
+# Hyperparameter search (successive halving). Every grid candidate is scored on the
+# first rung; only the best TUNING_KEEP_FRACTION of them is promoted to the next one.
+# Each rung backtests 'folds' cutoffs spaced 'period' days apart over a 'horizon'-day window.
+TUNING_RUNGS = [
+    {'folds': 1, 'horizon': 7, 'period': 7},
+    {'folds': 4, 'horizon': 14, 'period': 14},
+]
+TUNING_KEEP_FRACTION = 0.1
+TUNING_MIN_TRAIN_DAYS = 30
+
+# Forecast-serving API (forecast_service.py). Responses are cached per
+# (series, target, model version, horizon); at most SERVICE_CACHE_SIZE are kept.
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8600
+SERVICE_WORKERS = 4
+SERVICE_CACHE_SIZE = 1024
+SERVICE_MAX_HORIZON = 365
+
+# Dashboard "Project Graphs" page: forecasts of one case type are drawn as small
+# multiples, DASHBOARD_PAGE_SIZE series per page in DASHBOARD_GRID_COLUMNS columns
+DASHBOARD_PAGE_SIZE = 24
+DASHBOARD_GRID_COLUMNS = 4
+
+# Dashboard startup: after the first page is sent, load the forecast index and the
+# models of DASHBOARD_PREWARM_SERIES on a background thread (startup.py)
+DASHBOARD_PREWARM = True
+DASHBOARD_PREWARM_SERIES = ['global']
+
+# Chatbot caches: answers (persisted to CHAT_CACHE_PATH) and web-search results; TTLs in seconds
+CHAT_CACHE_PATH = os.path.join(CACHE_DIR, 'chat_answers.json')
+CHAT_CACHE_SIZE = 512
+CHAT_CACHE_TTL = 24 * 60 * 60
+SEARCH_CACHE_SIZE = 256
+SEARCH_CACHE_TTL = 6 * 60 * 60
+# Answer numeric data questions locally (data_query.py); optionally let the LLM phrase them
+CHAT_LOCAL_QUERIES = True
+CHAT_PHRASE_LOCAL_ANSWERS = False
+# Streaming answers: per-call timeouts in seconds (the LLM timeout also bounds phrasing
+# local answers). CHAT_SPECULATIVE_SEARCH starts the web search alongside the LLM for every
+# question the cache and local data cannot answer, trading a search call for latency
+CHAT_LLM_TIMEOUT = 30
+CHAT_SEARCH_TIMEOUT = 10
+CHAT_SPECULATIVE_SEARCH = False
@@ -0,0 +1,98 @@
+"""
+dashboard_data.py
+In-memory index of every forecast for the Streamlit dashboard.
+
+The index is loaded from the forecast store in one query and then serves all page
+lookups from memory. store_version gives a cheap stamp that changes whenever the
+pipeline writes to the store, so callers can cache the index and rebuild it only
+when the stamp changes.
+
+For the small-multiples graphs page, ForecastIndex.frame returns the forecasts of
+many series as one long frame, split into pages with paginate.
+"""
+import math
+import os
+from .config import FORECAST_DB_PATH, DASHBOARD_PAGE_SIZE
+from .forecast_store import read_forecasts, FORECAST_COLUMNS
+
+def path_version(path: str):
+    """Return (mtime_ns, size) of a file or directory, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def store_version(db_path: str = FORECAST_DB_PATH) -> tuple:
+    """Return a stamp of the forecast store that changes on every write, WAL included."""
+    return path_version(db_path), path_version(f'{db_path}-wal')
+
+class ForecastIndex:
+    """
+    All latest forecasts held in memory, grouped by series and target.
+
+    Attributes:
+        data (pd.DataFrame): Long frame with columns 'series', 'target', 'run_id' and FORECAST_COLUMNS.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._frames = {
+            key: group[FORECAST_COLUMNS].reset_index(drop=True)
+            for key, group in data.groupby(['series', 'target'], sort=True)
+        }
+        self._targets = {}
+        for series, target in self._frames:
+            self._targets.setdefault(series, []).append(target)
+
+    def series(self) -> list:
+        """Return the sorted names of every series with a forecast."""
+        return sorted(self._targets)
+
+    def targets(self, series: str) -> list:
+        """Return the sorted targets available for a series."""
+        return sorted(self._targets.get(series, []))
+
+    def forecast(self, series: str, target: str):
+        """Return the forecast of one (series, target) key, or None."""
+        return self._frames.get((series, target))
+
+    def frame(self, target: str, series=None):
+        """
+        Return the forecasts of a target for many series as one long frame.
+
+        Args:
+            target (str): Target of the forecasts.
+            series (list, optional): Series to include, in this order; all by default.
+
+        Returns:
+            pd.DataFrame: Columns 'series' and FORECAST_COLUMNS, sorted by series then date.
+        """
+        data = self.data[self.data['target'] == target]
+        if series is not None:
+            order = {name: i for i, name in enumerate(series)}
+            data = data[data['series'].isin(order)]
+            data = data.assign(_order=data['series'].map(order)).sort_values(['_order', 'ds'], kind='stable')
+        else:
+            data = data.sort_values(['series', 'ds'], kind='stable')
+        return data[['series', *FORECAST_COLUMNS]].reset_index(drop=True)
+
+def paginate(items: list, page: int, page_size: int = DASHBOARD_PAGE_SIZE):
+    """
+    Return one page of items.
+
+    Args:
+        items (list): Items to split into pages.
+        page (int): 1-based page number; clamped to the valid range.
+        page_size (int): Items per page.
+
+    Returns:
+        tuple: (items of the page, number of pages).
+    """
+    pages = max(1, math.ceil(len(items) / page_size))
+    page = min(max(page, 1), pages)
+    return items[(page - 1) * page_size:page * page_size], pages
+
+def load_forecast_index(db_path: str = FORECAST_DB_PATH) -> ForecastIndex:
+    """Read every latest forecast from the store into a ForecastIndex."""
+    return ForecastIndex(read_forecasts(db_path=db_path))
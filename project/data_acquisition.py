@@ -1,7 +1,303 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
 import pandas as pd
-from .config import RAW_DATA_PATH
+from .config import RAW_DATA_PATH, CACHE_DIR, INGEST_MEMORY_BUDGET_MB
+from .data_preprocessing import (clean_data, assemble_cube, SeriesCube, COUNTRY_COL, REGION_COL,
+                                 NON_METRIC_COLUMNS)
+from .logging_config import logger
+
+# Bump when the on-disk layout of the cleaned-data cache changes
+CACHE_VERSION = 1
+# Columns that together identify a reporting location in the raw data
+LOCATION_COLUMNS = ['Province/State', 'Country/Region']
+# Working memory of a parsed chunk relative to its DataFrame (parser buffers, keys, masks)
+CHUNK_OVERHEAD = 4
 
 def load_covid_data(path: str = RAW_DATA_PATH) -> pd.DataFrame:
     """Load COVID-19 data from CSV."""
     df = pd.read_csv(path)
     return df
+
+def file_sha1(path: str, block_size: int = 1 << 20) -> str:
+    """Return the SHA-1 hex digest of a file, read in blocks."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_cache(df: pd.DataFrame, entry_dir: str) -> dict:
+    """Write each column of df as a .npy file and return the column schema."""
+    os.makedirs(entry_dir, exist_ok=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        spec = {'name': col, 'file': f'col_{i}.npy'}
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            spec['categories'] = values.cat.categories.tolist()
+            array = values.cat.codes.to_numpy()
+        else:
+            array = values.to_numpy()
+            if array.dtype == object:
+                raise TypeError(f"Column {col!r} has object dtype and cannot be cached.")
+        np.save(os.path.join(entry_dir, spec['file']), array, allow_pickle=False)
+        columns.append(spec)
+    np.save(os.path.join(entry_dir, 'index.npy'), df.index.to_numpy(), allow_pickle=False)
+    return {'columns': columns}
+
+def _read_cache(entry_dir: str, schema: dict) -> pd.DataFrame:
+    """
+    Memory-map the cached columns back into a DataFrame.
+
+    Columns are mapped copy-on-write, so the frame is writable like a freshly
+    cleaned one; writes stay in memory and never reach the cache files.
+    """
+    data = {}
+    for spec in schema['columns']:
+        array = np.load(os.path.join(entry_dir, spec['file']), mmap_mode='c').view(np.ndarray)
+        if 'categories' in spec:
+            data[spec['name']] = pd.Categorical.from_codes(array, spec['categories'])
+        else:
+            data[spec['name']] = array
+    index = np.load(os.path.join(entry_dir, 'index.npy'), mmap_mode='c').view(np.ndarray)
+    return pd.DataFrame(data, index=index, copy=False)
+
+def _write_pointer(pointer: dict, pointer_path: str):
+    tmp_path = f"{pointer_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(pointer, f)
+    os.replace(tmp_path, pointer_path)
+
+def load_clean_covid_data(path: str = RAW_DATA_PATH, cache_dir: str = CACHE_DIR, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Load COVID-19 data with clean_data applied, using an on-disk columnar cache.
+
+    The cleaned frame is stored as one memory-mappable .npy file per column, with
+    categorical columns kept as codes plus categories, and mapped back copy-on-write:
+    a cache hit is as writable as a cold load. The cache is keyed on the
+    source file's size and mtime, falling back to its SHA-1 when those differ, and
+    is rebuilt automatically whenever the CSV content changes.
+
+    Args:
+        path (str): Path to the raw CSV file.
+        cache_dir (str): Directory holding cache entries.
+        use_cache (bool): If False, always parse and clean the CSV.
+
+    Returns:
+        pd.DataFrame: Cleaned COVID-19 data.
+    """
+    if not use_cache:
+        return clean_data(load_covid_data(path))
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    pointer_path = os.path.join(cache_dir, f'{stem}.json')
+    stat = os.stat(path)
+    pointer = None
+    if os.path.exists(pointer_path):
+        with open(pointer_path, 'r') as f:
+            pointer = json.load(f)
+        if pointer.get('version') != CACHE_VERSION:
+            pointer = None
+
+    sha1 = None
+    if pointer:
+        source = pointer['source']
+        fresh = source['size'] == stat.st_size and source['mtime_ns'] == stat.st_mtime_ns
+        if not fresh:
+            sha1 = file_sha1(path)
+            fresh = source['sha1'] == sha1
+        if fresh:
+            try:
+                df = _read_cache(os.path.join(cache_dir, pointer['dir']), pointer['schema'])
+                if source['mtime_ns'] != stat.st_mtime_ns:
+                    pointer['source'].update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                    _write_pointer(pointer, pointer_path)
+                logger.info(f"Loaded cleaned data from cache: {pointer['dir']}")
+                return df
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Cleaned-data cache is unreadable, rebuilding: {e}")
+
+    df = clean_data(load_covid_data(path))
+    sha1 = sha1 or file_sha1(path)
+    entry = f'{stem}-{sha1[:12]}'
+    try:
+        schema = _write_cache(df, os.path.join(cache_dir, entry))
+    except (OSError, TypeError) as e:
+        logger.warning(f"Could not cache cleaned data: {e}")
+        return df
+    _write_pointer({
+        'version': CACHE_VERSION,
+        'source': {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': sha1},
+        'dir': entry,
+        'schema': schema,
+    }, pointer_path)
+    # Older entries of the same source are no longer referenced
+    for name in os.listdir(cache_dir):
+        if name.startswith(f'{stem}-') and name != entry:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+    logger.info(f"Cached cleaned data: {entry}")
+    return df
+
+class _CubeAccumulator:
+    """
+    Growable (series x day x metric) totals fed one chunk at a time.
+
+    Rows are de-duplicated on (location, date) with a (location x day) bitmap, so
+    the state grows with the number of locations and days, never with the rows read.
+    """
+
+    def __init__(self, metrics, series_col, parent_col, location_cols):
+        self.metrics = metrics
+        self.series_col = series_col
+        self.parent_col = parent_col
+        self.location_cols = location_cols
+        self.locations, self.series, self.parents, self.labels = {}, {}, {}, {}
+        self.location_series = np.zeros(0, dtype=np.int64)
+        self.series_parent = np.zeros(0, dtype=np.int64)
+        self.first_day = self.last_day = None
+        self.seen = np.zeros((0, 0), dtype=bool)
+        self.values = np.zeros((0, 0, len(metrics)))
+        self.observed = np.zeros((0, 0), dtype=bool)
+        self.integer = True
+        self.date_dtype = None
+        self.rows = self.duplicates = 0
+
+    @staticmethod
+    def _intern(mapping, values):
+        """Map labels to stable integer ids, assigning new ids in order of appearance."""
+        codes, uniques = pd.factorize(values)
+        ids = np.array([mapping.setdefault(u, len(mapping)) for u in uniques], dtype=np.int64)
+        return ids[codes]
+
+    def _reserve(self, first, last):
+        """Grow the arrays (doubling) to hold every interned key and days first..last."""
+        front = 0 if self.first_day is None else max(0, self.first_day - first)
+        self.first_day = first if self.first_day is None else min(self.first_day, first)
+        self.last_day = last if self.last_day is None else max(self.last_day, last)
+        old_locs, old_days = self.seen.shape
+        old_series = self.values.shape[0]
+        day_cap = old_days + front
+        if self.last_day - self.first_day + 1 > day_cap:
+            day_cap = max(self.last_day - self.first_day + 1, 2 * day_cap)
+        loc_cap = old_locs if len(self.locations) <= old_locs else max(len(self.locations), 2 * old_locs)
+        series_cap = old_series if len(self.series) <= old_series else max(len(self.series), 2 * old_series)
+        if (loc_cap, series_cap, day_cap) == (old_locs, old_series, old_days):
+            return
+        days = slice(front, front + old_days)
+        seen = np.zeros((loc_cap, day_cap), dtype=bool)
+        seen[:old_locs, days] = self.seen
+        values = np.zeros((series_cap, day_cap, len(self.metrics)))
+        values[:old_series, days] = self.values
+        observed = np.zeros((series_cap, day_cap), dtype=bool)
+        observed[:old_series, days] = self.observed
+        self.seen, self.values, self.observed = seen, values, observed
+        self.location_series = np.resize(self.location_series, loc_cap)
+        self.series_parent = np.resize(self.series_parent, series_cap)
+
+    def add(self, chunk: pd.DataFrame):
+        """Apply clean_data's dtype rules to a raw chunk and add its new (location, date) rows."""
+        self.rows += len(chunk)
+        chunk = chunk.dropna(subset=[self.series_col, 'Date'])
+        if chunk.empty:
+            return
+        timestamps = pd.to_datetime(chunk['Date'])
+        self.date_dtype = self.date_dtype or timestamps.dtype
+        days = timestamps.to_numpy().astype('datetime64[D]').astype(np.int64)
+        series = self._intern(self.series, chunk[self.series_col].to_numpy())
+        # A location is interned from the ids of its columns, packed into one integer
+        location_ids = series
+        for col in self.location_cols[:-1]:
+            ids = self._intern(self.labels.setdefault(col, {}), chunk[col].fillna('').to_numpy())
+            location_ids = ids << 32 | location_ids
+        locations = self._intern(self.locations, location_ids)
+        parents = None
+        if self.parent_col:
+            parents = self._intern(self.parents, chunk[self.parent_col].fillna('').to_numpy())
+        self._reserve(int(days.min()), int(days.max()))
+        self.location_series[locations] = series
+        if parents is not None:
+            self.series_parent[series] = parents
+
+        # Keep the first row of every (location, date) key not seen in earlier chunks
+        day_index = days - self.first_day
+        keys = locations * self.seen.shape[1] + day_index
+        unique_keys, first_rows = np.unique(keys, return_index=True)
+        new = ~self.seen.ravel()[unique_keys]
+        self.seen.ravel()[unique_keys[new]] = True
+        rows = first_rows[new]
+        self.duplicates += len(chunk) - len(rows)
+
+        self.integer &= all(pd.api.types.is_integer_dtype(chunk[m]) for m in self.metrics)
+        raw = chunk[self.metrics].to_numpy(dtype=float)[rows]
+        cells, inverse = np.unique(series[rows] * self.values.shape[1] + day_index[rows], return_inverse=True)
+        flat = self.values.reshape(-1, len(self.metrics))
+        for j in range(len(self.metrics)):
+            flat[cells, j] += np.bincount(inverse, weights=raw[:, j], minlength=len(cells))
+        self.observed.ravel()[cells] = True
+
+    def cube(self) -> SeriesCube:
+        """Return the accumulated totals as a SeriesCube with sorted keys."""
+        n_days = 0 if self.first_day is None else self.last_day - self.first_day + 1
+        series_keys = list(self.series)
+        order = sorted(range(len(series_keys)), key=series_keys.__getitem__)
+        values = self.values[order, :n_days]
+        if self.integer:
+            values = values.astype(np.int64)
+        series_parent = parent_keys = None
+        if self.parent_col:
+            parent_keys = sorted(self.parents)
+            rank = np.empty(len(parent_keys), dtype=np.int64)
+            rank[[self.parents[k] for k in parent_keys]] = np.arange(len(parent_keys))
+            series_parent = rank[self.series_parent[order]]
+        first = pd.Timestamp(np.datetime64(self.first_day or 0, 'D'))
+        dates = pd.date_range(first, periods=n_days, freq='D').astype(self.date_dtype or 'datetime64[ns]')
+        return assemble_cube(self.series_col, self.parent_col, dates, self.metrics,
+                             [series_keys[i] for i in order], values, self.observed[order, :n_days],
+                             series_parent, parent_keys)
+
+def stream_series_cube(path: str = RAW_DATA_PATH, memory_budget_mb: float = INGEST_MEMORY_BUDGET_MB,
+                       series_col: str = COUNTRY_COL, parent_col: str = REGION_COL,
+                       chunk_rows: int = None) -> SeriesCube:
+    """
+    Build the SeriesCube of a CSV too large to load, reading it in chunks.
+
+    Each chunk gets clean_data's dtype rules and is de-duplicated on (location, date),
+    keeping the first row of a key across the whole file, then added to the daily
+    totals. Unlike clean_data, which drops identical rows only, two different rows
+    for the same location and date count once. The chunk size is derived from the
+    memory budget and the size of a parsed sample; the totals themselves take
+    series x days x metrics values however large the input is.
+
+    Args:
+        path (str): Path to the raw CSV file.
+        memory_budget_mb (float): Memory allowed for a parsed chunk and its working arrays.
+        series_col (str): Column identifying the leaf series.
+        parent_col (str, optional): Column the leaf series roll up into; skipped if None or missing.
+        chunk_rows (int, optional): Rows per chunk, overriding the budget.
+
+    Returns:
+        SeriesCube: Same daily totals as build_series_cube(clean_data(load_covid_data(path))).
+    """
+    sample = pd.read_csv(path, nrows=1000)
+    metrics = [c for c in sample.select_dtypes(include='number').columns if c not in NON_METRIC_COLUMNS]
+    # The series column comes last, see _CubeAccumulator.add
+    location_cols = [c for c in LOCATION_COLUMNS if c in sample.columns and c != series_col] + [series_col]
+    if parent_col not in sample.columns:
+        parent_col = None
+    usecols = list(dict.fromkeys([*location_cols, *([parent_col] if parent_col else []), 'Date', *metrics]))
+    if chunk_rows is None:
+        row_bytes = sample[usecols].memory_usage(deep=True, index=False).sum() / max(len(sample), 1)
+        chunk_rows = max(1000, int(memory_budget_mb * 2 ** 20 / (row_bytes * CHUNK_OVERHEAD)))
+
+    accumulator = _CubeAccumulator(metrics, series_col, parent_col, location_cols)
+    n_chunks = 0
+    with pd.read_csv(path, usecols=usecols, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            accumulator.add(chunk)
+            n_chunks += 1
+    logger.info(f"Streamed {accumulator.rows} rows in {n_chunks} chunks of up to {chunk_rows} rows; "
+                f"dropped {accumulator.duplicates} duplicate (location, date) rows.")
+    return accumulator.cube()
@@ -1,5 +1,10 @@
+import numpy as np
 import pandas as pd
 
+COUNTRY_COL = 'Country/Region'
+REGION_COL = 'WHO Region'
+NON_METRIC_COLUMNS = ('Lat', 'Long')
+
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     Clean and preprocess the COVID-19 data.
@@ -25,33 +30,171 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     df = df.drop_duplicates()
     return df
 
+def _codes(values):
+    """Return integer codes and sorted unique labels for a column."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.cat.remove_unused_categories()
+        return values.cat.codes.to_numpy(), list(values.cat.categories)
+    codes, labels = pd.factorize(values, sort=True)
+    return codes, list(labels)
+
+class SeriesCube:
+    """
+    Dense (series x day x metric) array of daily totals for every aggregation level.
+
+    Leaf series (e.g. countries) are summed from the raw rows once; parent series
+    (e.g. WHO regions) and the global series are derived by summing leaf rows, so
+    every level is built in a single pass over the data.
+
+    Attributes:
+        series_col (str): Column the leaf series are keyed on.
+        parent_col (str or None): Column the leaf series roll up into.
+        dates (pd.DatetimeIndex): Daily index shared by every series.
+        metrics (list): Metric names along the last axis.
+        levels (dict): Maps a level (None for global, parent_col, series_col) to a
+            tuple of (keys, values, observed) where values has shape
+            (len(keys), len(dates), len(metrics)) and observed flags days with data.
+        parent_of (dict): Maps each leaf series to the parent series it rolls up into
+            (empty without a parent level).
+    """
+
+    def __init__(self, series_col, parent_col, dates, metrics, levels, parent_of=None):
+        self.series_col = series_col
+        self.parent_col = parent_col
+        self.dates = dates
+        self.metrics = metrics
+        self.levels = levels
+        self.parent_of = parent_of or {}
+
+    def keys(self, level=None):
+        """Return the series keys available at a level (None for global)."""
+        return self.levels[level][0]
+
+    def frame(self, key, level=None) -> pd.DataFrame:
+        """
+        Return one series as a daily DataFrame indexed by 'Date'.
+
+        The frame spans the series' first to last observed day, matching what
+        resampling the raw rows of that group would produce.
+        """
+        return self._frame_at(self.keys(level).index(key), level)
+
+    def _frame_at(self, i, level):
+        _, values, observed = self.levels[level]
+        days = np.flatnonzero(observed[i])
+        start, end = (days[0], days[-1] + 1) if len(days) else (0, 0)
+        index = pd.DatetimeIndex(self.dates[start:end], name='Date', freq='D')
+        return pd.DataFrame(values[i, start:end], index=index, columns=self.metrics)
+
+    def to_frames(self, level=None) -> dict:
+        """Return every series of a level as a dict of DataFrames keyed by series name."""
+        return {key: self._frame_at(i, level) for i, key in enumerate(self.keys(level))}
+
+def build_series_cube(df: pd.DataFrame, series_col: str = COUNTRY_COL, parent_col: str = REGION_COL) -> SeriesCube:
+    """
+    Aggregate cleaned COVID-19 rows into a SeriesCube in one vectorized pass.
+
+    Rows are binned by (series, day) with np.bincount; provinces of the same
+    country are summed together. Numeric columns other than 'Lat' and 'Long' are
+    treated as metrics.
+
+    Args:
+        df (pd.DataFrame): Cleaned COVID-19 data
+        series_col (str): Column identifying the leaf series (e.g. 'Country/Region').
+        parent_col (str, optional): Column the leaf series roll up into (e.g. 'WHO Region').
+            Skipped if None or missing from df.
+    Returns:
+        SeriesCube: Daily totals for the global, parent and leaf levels
+    """
+    metrics = [c for c in df.select_dtypes(include='number').columns if c not in NON_METRIC_COLUMNS]
+    series_codes, series_keys = _codes(df[series_col])
+    timestamps = pd.to_datetime(df['Date'])
+    days = timestamps.to_numpy().astype('datetime64[D]')
+    first_day = days.min()
+    day_codes = (days - first_day).astype(np.int64)
+    n_series, n_days = len(series_keys), int(day_codes.max()) + 1
+    flat = series_codes.astype(np.int64) * n_days + day_codes
+
+    raw = df[metrics].to_numpy()
+    dtype = np.int64 if all(pd.api.types.is_integer_dtype(df[m]) for m in metrics) else np.float64
+    values = np.empty((n_series * n_days, len(metrics)), dtype=dtype)
+    for j in range(len(metrics)):
+        values[:, j] = np.bincount(flat, weights=raw[:, j], minlength=n_series * n_days)
+    values = values.reshape(n_series, n_days, len(metrics))
+    observed = np.zeros(n_series * n_days, dtype=bool)
+    observed[flat] = True
+    observed = observed.reshape(n_series, n_days)
+
+    series_parent = parent_keys = None
+    if parent_col and parent_col in df.columns:
+        parent_codes, parent_keys = _codes(df[parent_col])
+        series_parent = np.zeros(n_series, dtype=np.int64)
+        series_parent[series_codes] = parent_codes
+    dates = pd.date_range(pd.Timestamp(first_day), periods=n_days, freq='D').astype(timestamps.dtype)
+    return assemble_cube(series_col, parent_col, dates, metrics, series_keys, values, observed,
+                         series_parent, parent_keys)
+
+def assemble_cube(series_col, parent_col, dates, metrics, series_keys, values, observed,
+                  series_parent=None, parent_keys=None) -> SeriesCube:
+    """
+    Build a SeriesCube from leaf series totals, deriving the parent and global levels.
+
+    Args:
+        series_col (str): Column the leaf series are keyed on.
+        parent_col (str or None): Column the leaf series roll up into.
+        dates (pd.DatetimeIndex): Daily index shared by every series.
+        metrics (list): Metric names.
+        series_keys (list): Leaf series keys.
+        values (np.ndarray): Leaf totals of shape (series, day, metric).
+        observed (np.ndarray): Boolean (series, day) flags of days with data.
+        series_parent (np.ndarray, optional): Index into parent_keys of each leaf series.
+        parent_keys (list, optional): Parent series keys; the parent level is skipped if None.
+
+    Returns:
+        SeriesCube: Daily totals for the global, parent and leaf levels
+    """
+    levels = {series_col: (series_keys, values, observed)}
+    parent_of = {}
+    if parent_keys is not None:
+        parent_of = {key: parent_keys[p] for key, p in zip(series_keys, series_parent)}
+        parent_values = np.zeros((len(parent_keys), *values.shape[1:]), dtype=values.dtype)
+        np.add.at(parent_values, series_parent, values)
+        parent_observed = np.zeros((len(parent_keys), values.shape[1]), dtype=bool)
+        np.logical_or.at(parent_observed, series_parent, observed)
+        levels[parent_col] = (parent_keys, parent_values, parent_observed)
+    levels[None] = (['global'], values.sum(axis=0, keepdims=True), observed.any(axis=0, keepdims=True))
+    return SeriesCube(series_col, parent_col, dates, metrics, levels, parent_of)
+
+def split_levels(cube: SeriesCube):
+    """Return (global_data, region_data, country_data) frames of a country/WHO-region cube."""
+    return cube.frame('global'), cube.to_frames(REGION_COL), cube.to_frames(COUNTRY_COL)
+
+def preprocess_all_levels(df: pd.DataFrame):
+    """
+    Build the global, WHO region and country datasets from a single aggregation pass.
+
+    Args:
+        df (pd.DataFrame): Cleaned COVID-19 data
+    Returns:
+        tuple: (global_data, region_data, country_data) where global_data is a DataFrame
+            and the others are dicts of DataFrames keyed by region/country name
+    """
+    return split_levels(build_series_cube(df))
+
 def preprocess_grouped_data(df: pd.DataFrame, group_col: str = None) -> dict:
     """
     Group data by a column (e.g., region or country) and preprocess each group.
     For each group:
-        - Convert 'Date' to datetime
-        - Set 'Date' as index and resample daily, summing values
-        - Drop 'Lat' and 'Long' columns if present
+        - Sum rows per day, filling days without rows with zeros
+        - Keep only metric columns ('Lat', 'Long' and non-numeric columns are dropped)
     Args:
         df (pd.DataFrame): Cleaned COVID-19 data
         group_col (str, optional): Column to group by (e.g., 'Country/Region'). If None, process as global.
     Returns:
         dict: Dictionary of preprocessed DataFrames, keyed by group name (or 'global')
     """
-    datasets = {}
     if group_col:
-        for key, group in df.groupby(group_col):
-            data = group.copy()
-            data['Date'] = pd.to_datetime(data['Date'])
-            data = data.set_index('Date').resample('D').sum()
-            if 'Lat' in data.columns and 'Long' in data.columns:
-                data = data.drop(['Lat', 'Long'], axis=1)
-            datasets[key] = data
-    else:
-        data = df.copy()
-        data['Date'] = pd.to_datetime(data['Date'])
-        data = data.set_index('Date').resample('D').sum()
-        if 'Lat' in data.columns and 'Long' in data.columns:
-            data = data.drop(['Lat', 'Long'], axis=1)
-        datasets['global'] = data
-    return datasets
+        return build_series_cube(df, series_col=group_col, parent_col=None).to_frames(group_col)
+    if COUNTRY_COL not in df.columns:
+        df = df.assign(**{COUNTRY_COL: 'global'})
+    return build_series_cube(df, parent_col=None).to_frames(None)
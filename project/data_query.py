@@ -0,0 +1,283 @@
+"""
+data_query.py
+Local query engine answering numeric questions about the COVID-19 data.
+
+Questions such as "how many deaths in Brazil on 2020-06-01", "new cases in India
+on June 1" or "which WHO region had the most active cases in July" are parsed
+into an intent with a regex parser. Questions that are not lookups (why, rates,
+forecasts, comparisons, several places) are left to the LLM. The intent is answered from per-series
+aggregates precomputed for every country, WHO region and the global total:
+cumulative values, daily changes and 7-day averages. Answers take milliseconds
+and need no LLM call. Each result carries a short snippet of the computed facts,
+which is all an LLM needs if the answer should be rephrased.
+"""
+import calendar
+import re
+import numpy as np
+import pandas as pd
+from .data_preprocessing import build_series_cube, COUNTRY_COL, REGION_COL
+
+METRIC_WORDS = {
+    'confirmed': 'Confirmed', 'cases': 'Confirmed', 'case': 'Confirmed', 'infections': 'Confirmed',
+    'deaths': 'Deaths', 'death': 'Deaths', 'died': 'Deaths', 'fatalities': 'Deaths',
+    'recovered': 'Recovered', 'recoveries': 'Recovered', 'recovery': 'Recovered',
+    'active': 'Active',
+}
+# Running totals; Active is a stock, so its period statistic is an average rather than a sum
+CUMULATIVE_METRICS = ('Confirmed', 'Deaths', 'Recovered')
+NOUNS = {'Confirmed': 'confirmed cases', 'Deaths': 'deaths', 'Recovered': 'recoveries', 'Active': 'active cases'}
+PLACE_ALIASES = {
+    'usa': 'US', 'united states': 'US', 'uk': 'United Kingdom', 'south korea': 'Korea, South',
+    'world': 'global', 'worldwide': 'global', 'globally': 'global', 'global': 'global',
+}
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+MONTH_PATTERN = '|'.join(sorted(MONTHS, key=len, reverse=True))
+# Questions about causes, rates, forecasts or comparisons are not lookups and go to the LLM
+NON_LOOKUP_PATTERN = re.compile(r'\b(why|how come|forecast\w*|predict\w*|projected|rates?|ratio|compar\w*|'
+                                r'trends?|vs|versus)\b')
+
+def _rolling_mean(values, window=7):
+    """Trailing mean along the day axis; the first days average over the days available."""
+    csum = np.cumsum(values, axis=1)
+    shifted = np.zeros_like(csum)
+    shifted[:, window:] = csum[:, :-window]
+    counts = np.minimum(np.arange(1, values.shape[1] + 1), window)
+    return (csum - shifted) / counts[None, :, None]
+
+class DataQueryEngine:
+    """
+    Precomputed aggregates and an intent parser over them.
+
+    Attributes:
+        dates (pd.DatetimeIndex): Daily index shared by every series.
+        metrics (list): Metric names.
+        levels (dict): Maps 'country', 'region' and 'global' to (names, stats) where stats
+            maps 'total', 'new' and 'avg7' to (series, day, metric) arrays.
+    """
+
+    def __init__(self, cube):
+        self.dates = pd.DatetimeIndex(cube.dates).normalize()
+        self.metrics = list(cube.metrics)
+        self.levels = {}
+        for label, level in (('global', None), ('region', cube.parent_col), ('country', cube.series_col)):
+            if level not in cube.levels:
+                continue
+            names, values, _ = cube.levels[level]
+            total = values.astype(float)
+            new = np.diff(total, axis=1, prepend=0.0)
+            self.levels[label] = (list(names), {'total': total, 'new': new, 'avg7': _rolling_mean(new)})
+
+        self.places = {}
+        for label, (names, _) in self.levels.items():
+            for i, name in enumerate(names):
+                self.places[name.casefold()] = (label, i, name)
+        for alias, name in PLACE_ALIASES.items():
+            if name.casefold() in self.places:
+                self.places.setdefault(alias, self.places[name.casefold()])
+        # Short upper-case names such as 'US' only match as written, so "tell us" is not a place
+        long_names = sorted((p for p in self.places if len(p) > 3), key=len, reverse=True)
+        short_names = sorted((p.upper() for p in self.places if len(p) <= 3), key=len, reverse=True)
+        self._long_pattern = re.compile(r'(?<!\w)(' + '|'.join(map(re.escape, long_names)) + r')(?!\w)', re.I)
+        self._short_pattern = (re.compile(r'(?<!\w)(' + '|'.join(map(re.escape, short_names)) + r')(?!\w)')
+                               if short_names else None)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'DataQueryEngine':
+        """Build the engine from cleaned COVID-19 data."""
+        return cls(build_series_cube(df, series_col=COUNTRY_COL, parent_col=REGION_COL))
+
+    def _day(self, date) -> int:
+        day = (pd.Timestamp(date).normalize() - self.dates[0]).days
+        if not 0 <= day < len(self.dates):
+            raise KeyError(f"no data for {pd.Timestamp(date):%Y-%m-%d} (data covers "
+                           f"{self.dates[0]:%Y-%m-%d} to {self.dates[-1]:%Y-%m-%d})")
+        return day
+
+    def value(self, place: str, metric: str, date=None, kind: str = 'total') -> float:
+        """
+        Return one statistic of a place on a day.
+
+        Args:
+            place (str): Country, WHO region or 'global' (aliases accepted).
+            metric (str): Metric name (e.g. 'Deaths').
+            date (optional): Day to read; defaults to the last day of the data.
+            kind (str): 'total' (running total), 'new' (daily change) or 'avg7' (7-day average of 'new').
+        """
+        label, i, _ = self.places[place.casefold()]
+        day = len(self.dates) - 1 if date is None else self._day(date)
+        return float(self.levels[label][1][kind][i, day, self.metrics.index(metric)])
+
+    def rank(self, level: str, metric: str, start=None, end=None, ascending: bool = False, top: int = 1) -> list:
+        """
+        Rank the series of a level by a metric over a day or period.
+
+        Over a period, cumulative metrics are ranked by their increase and Active by its
+        daily average; on a single day (start == end or both None) by the day's value.
+
+        Returns:
+            list: (name, value) pairs, best first.
+        """
+        names, stats = self.levels[level]
+        first = len(self.dates) - 1 if start is None else self._day(start)
+        last = first if end is None else self._day(end)
+        m = self.metrics.index(metric)
+        if first == last:
+            values = stats['total'][:, first, m]
+        elif metric in CUMULATIVE_METRICS:
+            values = stats['new'][:, first:last + 1, m].sum(axis=1)
+        else:
+            values = stats['total'][:, first:last + 1, m].mean(axis=1)
+        order = np.argsort(values, kind='stable')
+        if not ascending:
+            order = order[::-1]
+        return [(names[i], float(values[i])) for i in order[:top]]
+
+    def peak(self, place: str, metric: str):
+        """Return (date, value) of the highest 7-day average of daily changes of a place."""
+        label, i, _ = self.places[place.casefold()]
+        series = self.levels[label][1]['avg7'][i, :, self.metrics.index(metric)]
+        day = int(np.argmax(series))
+        return self.dates[day], float(series[day])
+
+    def _place_matches(self, question: str) -> list:
+        """Return the regex matches of every place named in a question."""
+        matches = list(self._long_pattern.finditer(question))
+        if self._short_pattern is not None:
+            matches += list(self._short_pattern.finditer(question))
+        return matches
+
+    def find_place(self, question: str):
+        """Return (level, index, name) of the longest place named in a question, or None."""
+        matches = self._place_matches(question)
+        if not matches:
+            return None
+        best = max(matches, key=lambda m: len(m.group(1)))
+        return self.places[best.group(1).casefold()]
+
+    def _parse_dates(self, text: str):
+        """Return (start, end, label) of the day or month a question refers to, or None."""
+        iso = re.search(r'\b(\d{4}-\d{1,2}-\d{1,2})\b', text)
+        if iso:
+            day = pd.Timestamp(iso.group(1))
+            return day, day, f'{day:%Y-%m-%d}'
+        day_month = re.search(rf'\b(?:({MONTH_PATTERN})\.? (\d{{1,2}})(?:st|nd|rd|th)?|(\d{{1,2}})(?:st|nd|rd|th)? '
+                              rf'(?:of )?({MONTH_PATTERN})\.?)(?:,? (\d{{4}}))?\b', text)
+        if day_month:
+            month = MONTHS[day_month.group(1) or day_month.group(4)]
+            day_of_month = int(day_month.group(2) or day_month.group(3))
+            year = int(day_month.group(5)) if day_month.group(5) else self._year_of(month)
+            day = pd.Timestamp(year=year, month=month, day=day_of_month)
+            return day, day, f'{day:%Y-%m-%d}'
+        month = re.search(rf'\b(?:in|during|for|of) ({MONTH_PATTERN})\.?(?: (\d{{4}}))?\b', text)
+        if month:
+            number = MONTHS[month.group(1)]
+            year = int(month.group(2)) if month.group(2) else self._year_of(number)
+            start = pd.Timestamp(year=year, month=number, day=1)
+            end = start + pd.offsets.MonthEnd(0)
+            # Clip to the data so a month that is only partly covered still answers
+            start, end = max(start, self.dates[0]), min(end, self.dates[-1])
+            return start, end, f'{calendar.month_name[number]} {year}'
+        return None
+
+    def _year_of(self, month: int) -> int:
+        """Return the year of the data's first occurrence of a month (or of its last day)."""
+        years = self.dates.year[self.dates.month == month]
+        return int(years[0]) if len(years) else int(self.dates[-1].year)
+
+    def answer(self, question: str):
+        """
+        Answer a numeric question from the aggregates.
+
+        Args:
+            question (str): Free-text question.
+
+        Returns:
+            dict or None: {'intent', 'answer', 'snippet'} where 'answer' is the full reply and
+                'snippet' the computed facts, or None if the question is not a recognized query
+                (including questions about causes, rates, forecasts or comparisons, and
+                questions naming more than one place).
+        """
+        question = ' '.join(question.split())
+        matches = self._place_matches(question)
+        places = {self.places[m.group(1).casefold()][2] for m in matches}
+        if len(places) > 1:
+            return None
+        place = self.find_place(question)
+        # Parse the rest without the place names, so 'New Zealand' does not ask for new cases
+        for m in sorted(matches, key=lambda m: m.start(), reverse=True):
+            question = question[:m.start()] + ' ' + question[m.end():]
+        text = ' '.join(question.casefold().split())
+        if NON_LOOKUP_PATTERN.search(text):
+            return None
+        metric_match = re.search(r'\b(' + '|'.join(METRIC_WORDS) + r')\b', text)
+        if not metric_match:
+            return None
+        metric = METRIC_WORDS[metric_match.group(1)]
+        kind = 'avg7' if re.search(r'7[- ]day|seven[- ]day|rolling|weekly average', text) else (
+            'new' if re.search(r'\b(new|daily)\b', text) else 'total')
+        try:
+            dates = self._parse_dates(text)
+        except ValueError:
+            return None
+        try:
+            rank = re.search(r'\b(which|what|top(?: (\d+))?)\s+(?:\w+ )?(countr(?:y|ies)|(?:who )?regions?)\b', text)
+            if rank and re.search(r'\b(most|highest|largest|biggest|fewest|least|lowest|smallest|top)\b', text):
+                return self._rank_answer(text, rank, metric, dates)
+            if place and re.search(r'\b(peak(?:ed)?|worst day|highest day)\b', text):
+                return self._peak_answer(place, metric)
+            if place:
+                return self._value_answer(place, metric, kind, dates)
+        except KeyError as e:
+            message = f"There is no data for that question: {e.args[0]}."
+            return {'intent': 'out_of_range', 'answer': message, 'snippet': message}
+        return None
+
+    def _value_answer(self, place, metric, kind, dates):
+        label, _, name = place
+        date = None if dates is None else dates[0]
+        if dates is not None and dates[0] != dates[1]:
+            date = dates[1]
+        value = self.value(name, metric, date, kind)
+        day = self.dates[-1] if date is None else pd.Timestamp(date)
+        where = 'The world' if label == 'global' else name
+        noun = NOUNS.get(metric, metric.lower())
+        if kind == 'total':
+            statement = f"{where} had {value:,.0f} {noun} on {day:%Y-%m-%d}"
+            statement += " (cumulative)." if metric in CUMULATIVE_METRICS else "."
+        elif kind == 'new':
+            statement = f"{where} reported {value:,.0f} new {noun} on {day:%Y-%m-%d}."
+        else:
+            statement = f"The 7-day average of new {noun} in {where} was {value:,.1f} per day on {day:%Y-%m-%d}."
+        return {'intent': 'value', 'answer': statement, 'snippet': statement}
+
+    def _rank_answer(self, text, rank, metric, dates):
+        level = 'region' if 'region' in rank.group(3) else 'country'
+        ascending = bool(re.search(r'\b(fewest|least|lowest|smallest)\b', text))
+        top = int(rank.group(2)) if rank.group(2) else (5 if rank.group(3).endswith(('ies', 'ons')) else 1)
+        start, end, period = dates if dates else (None, None, f'{self.dates[-1]:%Y-%m-%d}')
+        ranking = self.rank(level, metric, start, end, ascending, top)
+        noun = NOUNS.get(metric, metric.lower())
+        if start is not None and start != end:
+            measure = (f'new {noun} in {period}' if metric in CUMULATIVE_METRICS
+                       else f'average daily {noun} in {period}')
+        else:
+            measure = f'{noun} on {period}'
+        kind = 'WHO region' if level == 'region' else 'country'
+        extreme = 'fewest' if ascending else 'most'
+        lines = [f'{name}: {value:,.0f}' for name, value in ranking]
+        if len(ranking) == 1:
+            statement = f"The {kind} with the {extreme} {measure} was {ranking[0][0]} ({ranking[0][1]:,.0f})."
+        else:
+            plural = 'WHO regions' if level == 'region' else 'Countries'
+            statement = f"{plural} with the {extreme} {measure}: " + '; '.join(lines) + '.'
+        return {'intent': 'rank', 'answer': statement, 'snippet': statement}
+
+    def _peak_answer(self, place, metric):
+        label, _, name = place
+        date, value = self.peak(name, metric)
+        where = 'worldwide' if label == 'global' else f'in {name}'
+        noun = NOUNS.get(metric, metric.lower())
+        statement = (f"New {noun} {where} peaked around {date:%Y-%m-%d}, "
+                     f"at a 7-day average of {value:,.1f} per day.")
+        return {'intent': 'peak', 'answer': statement, 'snippet': statement}
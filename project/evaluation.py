@@ -1,6 +1,182 @@
-from sklearn.metrics import mean_squared_error, mean_absolute_percentage_error
+"""
+evaluation.py
+Forecast accuracy metrics, computed for every series at once, and a leaderboard per run.
+
+evaluate_batch scores aligned (series x horizon) matrices of actuals and forecasts
+in one NumPy pass; rows may be padded with NaN. The resulting leaderboard is kept
+in the forecast store under a run id, so the accuracy of two pipeline runs (e.g.
+before and after a faster model tier) can be compared.
+
+Example: python -m project.evaluation --compare <baseline run> <current run>
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from .config import FORECAST_DB_PATH
+from .forecast_store import connect
+
+METRICS = ['rmse', 'mae', 'mape', 'smape', 'mase', 'coverage']
+
+LEADERBOARD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leaderboard (
+    run_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    series TEXT NOT NULL,
+    target TEXT NOT NULL,
+    model TEXT,
+    n INTEGER,
+    rmse REAL,
+    mae REAL,
+    mape REAL,
+    smape REAL,
+    mase REAL,
+    coverage REAL,
+    PRIMARY KEY (run_id, series, target)
+) WITHOUT ROWID;
+"""
 
 def evaluate_forecast(y_true, y_pred):
-    rmse = mean_squared_error(y_true, y_pred, squared=False)
+    from sklearn.metrics import mean_squared_error, mean_absolute_percentage_error
+    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
     mape = mean_absolute_percentage_error(y_true, y_pred)
     return {"rmse": rmse, "mape": mape, "accuracy_range": (100 - mape, 100 + mape)}
+
+def _nanmean(values, axis=1):
+    """Mean over the non-NaN entries of each row; NaN for rows without any."""
+    counts = np.sum(~np.isnan(values), axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, np.nansum(values, axis=axis) / counts, np.nan)
+
+def evaluate_batch(actual, forecast, lower=None, upper=None, history=None, season: int = 1) -> dict:
+    """
+    Score every series' forecast against its actuals in one pass.
+
+    Entries where the actual or the forecast is NaN are ignored, so rows of
+    different lengths can be padded with NaN. Zero counts are handled per metric:
+    MAPE skips zero actuals (NaN if all are zero), sMAPE counts 0 when actual and
+    forecast are both zero, and MASE is 0 for a perfect forecast of a constant
+    history and NaN for any other forecast of one.
+
+    Args:
+        actual (np.ndarray): (series, horizon) actual values.
+        forecast (np.ndarray): (series, horizon) point forecasts.
+        lower (np.ndarray, optional): Lower interval bounds, for coverage.
+        upper (np.ndarray, optional): Upper interval bounds, for coverage.
+        history (np.ndarray, optional): (series, days) in-sample values, NaN-padded, for MASE.
+        season (int): Lag of the naive forecast MASE is scaled by.
+
+    Returns:
+        dict: Arrays of length n_series for 'n' and each name in METRICS (MAPE and sMAPE
+            in percent, coverage as a fraction); metrics without their inputs are NaN.
+    """
+    actual = np.asarray(actual, dtype=float)
+    forecast = np.asarray(forecast, dtype=float)
+    error = forecast - actual
+    valid = ~np.isnan(error)
+    error = np.where(valid, error, np.nan)
+    absolute = np.abs(error)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ape = np.where(actual != 0, absolute / np.abs(actual), np.nan)
+        denominator = np.abs(actual) + np.abs(forecast)
+        sape = np.where(denominator > 0, 2 * absolute / denominator, np.where(valid, 0.0, np.nan))
+    metrics = {
+        'n': valid.sum(axis=1),
+        'rmse': np.sqrt(_nanmean(error ** 2)),
+        'mae': _nanmean(absolute),
+        'mape': 100 * _nanmean(ape),
+        'smape': 100 * _nanmean(sape),
+        'mase': np.full(len(actual), np.nan),
+        'coverage': np.full(len(actual), np.nan),
+    }
+    if history is not None:
+        history = np.asarray(history, dtype=float)
+        scale = _nanmean(np.abs(history[:, season:] - history[:, :-season]))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            metrics['mase'] = np.where(scale > 0, metrics['mae'] / scale,
+                                       np.where(metrics['mae'] == 0, 0.0, np.nan))
+    if lower is not None and upper is not None:
+        inside = (actual >= np.asarray(lower, dtype=float)) & (actual <= np.asarray(upper, dtype=float))
+        metrics['coverage'] = _nanmean(np.where(valid, inside.astype(float), np.nan))
+    return metrics
+
+def leaderboard(keys, metrics: dict, models=None) -> pd.DataFrame:
+    """
+    Build a leaderboard frame from evaluate_batch output.
+
+    Args:
+        keys (list): (series, target) of each row.
+        metrics (dict): Output of evaluate_batch.
+        models (list, optional): Model type of each row.
+
+    Returns:
+        pd.DataFrame: One row per series, best MASE first (then best sMAPE).
+    """
+    frame = pd.DataFrame(list(keys), columns=['series', 'target'])
+    frame['model'] = list(models) if models is not None else None
+    frame['n'] = metrics['n']
+    for name in METRICS:
+        frame[name] = metrics[name]
+    return frame.sort_values(['mase', 'smape'], na_position='last').reset_index(drop=True)
+
+def write_leaderboard(frame: pd.DataFrame, run_id: str, db_path: str = FORECAST_DB_PATH):
+    """Store a leaderboard under a run id, replacing any earlier one of that run."""
+    conn = connect(db_path)
+    try:
+        conn.executescript(LEADERBOARD_SCHEMA)
+        created_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        rows = frame[['series', 'target', 'model', 'n', *METRICS]].astype(object)
+        rows = rows.where(rows.notna(), None)
+        with conn:
+            conn.execute("DELETE FROM leaderboard WHERE run_id = ?", (run_id,))
+            conn.executemany("INSERT INTO leaderboard VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             [(run_id, created_at, *row) for row in rows.itertuples(index=False)])
+    finally:
+        conn.close()
+
+def read_leaderboard(run_id: str = None, db_path: str = FORECAST_DB_PATH) -> pd.DataFrame:
+    """Return the leaderboard of a run, by default the most recent one."""
+    conn = connect(db_path)
+    try:
+        conn.executescript(LEADERBOARD_SCHEMA)
+        if run_id is None:
+            row = conn.execute("SELECT run_id FROM leaderboard ORDER BY created_at DESC, run_id DESC LIMIT 1").fetchone()
+            if row is None:
+                return pd.DataFrame(columns=['run_id', 'series', 'target', 'model', 'n', *METRICS])
+            run_id = row[0]
+        return pd.read_sql_query("SELECT run_id, series, target, model, n, rmse, mae, mape, smape, mase, coverage "
+                                 "FROM leaderboard WHERE run_id = ? ORDER BY mase IS NULL, mase, smape",
+                                 conn, params=[run_id])
+    finally:
+        conn.close()
+
+def compare_leaderboards(baseline: pd.DataFrame, current: pd.DataFrame, metric: str = 'smape') -> pd.DataFrame:
+    """
+    Compare a metric per series between two leaderboards.
+
+    Returns:
+        pd.DataFrame: 'series', 'target', the metric of both runs and their 'change',
+            worst regression first.
+    """
+    merged = baseline[['series', 'target', metric]].merge(
+        current[['series', 'target', metric]], on=['series', 'target'], suffixes=('_baseline', '_current'))
+    merged['change'] = merged[f'{metric}_current'] - merged[f'{metric}_baseline']
+    return merged.sort_values('change', ascending=False, na_position='last').reset_index(drop=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or compare pipeline accuracy leaderboards.")
+    parser.add_argument('--run', help="Run id to show (default: the latest).")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="Compare two runs.")
+    parser.add_argument('--metric', default='smape', choices=METRICS)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+    pd.set_option('display.width', 160)
+    if args.compare:
+        changes = compare_leaderboards(read_leaderboard(args.compare[0]), read_leaderboard(args.compare[1]),
+                                       args.metric)
+        print(f"Mean {args.metric} change: {changes['change'].mean():+.3f} over {len(changes)} series")
+        print(changes.head(args.top).to_string(index=False))
+    else:
+        board = read_leaderboard(args.run)
+        print(board[['series', 'target', 'model', *METRICS]].describe().loc[['mean', '50%']].to_string())
+        print(board.head(args.top).to_string(index=False))
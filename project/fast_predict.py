@@ -0,0 +1,206 @@
+"""
+fast_predict.py
+Stan-free NumPy prediction engine for fitted Prophet models.
+
+Fitted models are reduced to a small dict of arrays (extract_params) holding only
+what prediction needs. Forecasts are then evaluated directly: piecewise-linear
+trend, Fourier seasonalities and the additive/multiplicative combination, with
+uncertainty simulated the same way as Prophet's vectorized sampler. Many series
+are evaluated together as (series x sample x date) arrays.
+
+Supported models: MAP fits with 'linear' or 'flat' growth, daily data, plain
+seasonalities, and no holidays, extra regressors or conditional seasonalities,
+which covers every model the pipeline trains. Other models raise ValueError.
+"""
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 24 * 60 * 60 * 10 ** 9
+# Upper bound on the number of simulated values held at once by predict_batch
+MAX_SIMULATION_SIZE = 8_000_000
+
+def extract_params(model) -> dict:
+    """
+    Reduce a fitted Prophet model to the parameters prediction needs.
+
+    Args:
+        model (Prophet): Fitted Prophet model.
+
+    Returns:
+        dict: JSON-serializable parameters (scalars, lists and strings only).
+
+    Raises:
+        ValueError: If the model uses a feature this engine does not implement.
+    """
+    if model.history is None:
+        raise ValueError("Model has not been fit.")
+    if model.growth not in ('linear', 'flat'):
+        raise ValueError(f"Growth '{model.growth}' is not supported by fast_predict.")
+    if model.mcmc_samples:
+        raise ValueError("MCMC-fitted models are not supported by fast_predict.")
+    if model.holidays is not None or model.country_holidays is not None or model.extra_regressors:
+        raise ValueError("Holidays and extra regressors are not supported by fast_predict.")
+    if any(props['condition_name'] is not None for props in model.seasonalities.values()):
+        raise ValueError("Conditional seasonalities are not supported by fast_predict.")
+    return {
+        'growth': model.growth,
+        'start': int(pd.Timestamp(model.start).as_unit('ns').value),
+        't_scale': int(pd.Timedelta(model.t_scale).as_unit('ns').value),
+        'y_scale': float(model.y_scale),
+        'floor': float(model.y_min) if model.scaling == 'minmax' else 0.0,
+        'last_ds': int(pd.Timestamp(model.history['ds'].max()).as_unit('ns').value),
+        'changepoints_t': np.asarray(model.changepoints_t, dtype=float).tolist(),
+        'k': float(np.nanmean(model.params['k'])),
+        'm': float(np.nanmean(model.params['m'])),
+        'delta': np.nanmean(model.params['delta'], axis=0).tolist(),
+        'beta': np.nanmean(model.params['beta'], axis=0).tolist(),
+        'sigma_obs': float(np.nanmean(model.params['sigma_obs'])),
+        'seasonalities': [
+            {'period': float(props['period']), 'fourier_order': int(props['fourier_order']), 'mode': props['mode']}
+            for props in model.seasonalities.values()
+        ],
+        'interval_width': float(model.interval_width),
+        'uncertainty_samples': int(model.uncertainty_samples or 0),
+    }
+
+def _fourier_features(ds_ns, seasonalities):
+    """Return (series, date, feature) Fourier features and per-feature multiplicative flags."""
+    days = ds_ns / NS_PER_DAY
+    features, multiplicative = [], []
+    for props in seasonalities:
+        x = 2 * np.pi * days / props['period']
+        for i in range(props['fourier_order']):
+            features += [np.sin((i + 1) * x), np.cos((i + 1) * x)]
+            multiplicative += [props['mode'] == 'multiplicative'] * 2
+    if not features:
+        # Prophet fits a single all-zero feature when there is no seasonality
+        return np.zeros(ds_ns.shape + (1,)), np.zeros(1, dtype=bool)
+    return np.stack(features, axis=-1), np.array(multiplicative)
+
+def _predict_arrays(group, ds_ns, n_samples, rng):
+    """
+    Evaluate a group of series that share a seasonality layout.
+
+    Args:
+        group (list): Parameter dicts from extract_params.
+        ds_ns (np.ndarray): (series, date) int64 nanosecond timestamps.
+        n_samples (int): Number of simulated paths; 0 for point forecasts only.
+        rng (np.random.Generator): Random source for the simulation.
+
+    Returns:
+        dict: (series, date) arrays 'trend', 'yhat' and, if n_samples > 0, 'yhat_lower'/'yhat_upper'.
+    """
+    n_series = len(group)
+    col = lambda name: np.array([p[name] for p in group], dtype=float)[:, None]
+    k, m, y_scale, floor = col('k'), col('m'), col('y_scale'), col('floor')
+    t = (ds_ns - col('start')) / col('t_scale')
+
+    # Piecewise-linear trend with changepoints padded to a common length
+    n_cp = max(len(p['changepoints_t']) for p in group)
+    cps = np.full((n_series, max(n_cp, 1)), np.finfo(float).max)
+    deltas = np.zeros_like(cps)
+    for i, p in enumerate(group):
+        cps[i, :len(p['changepoints_t'])] = p['changepoints_t']
+        deltas[i, :len(p['delta'])] = p['delta']
+    flat = np.array([p['growth'] == 'flat' for p in group])[:, None]
+    active = cps[:, None, :] <= t[:, :, None]
+    k_t = k + np.where(active, deltas[:, None, :], 0).sum(axis=2)
+    m_t = m + np.where(active, -cps[:, None, :] * deltas[:, None, :], 0).sum(axis=2)
+    trend_scaled = np.where(flat, m, k_t * t + m_t)
+    trend = trend_scaled * y_scale + floor
+
+    features, multiplicative = _fourier_features(ds_ns, group[0]['seasonalities'])
+    beta = np.array([p['beta'] for p in group])
+    additive = np.einsum('sdf,sf->sd', features, beta * ~multiplicative) * y_scale
+    mult = np.einsum('sdf,sf->sd', features, beta * multiplicative)
+    result = {'trend': trend, 'yhat': trend * (1 + mult) + additive}
+    if not n_samples:
+        return result
+
+    # Future trend changes: shifts of size Laplace(mean |delta|) arrive with the
+    # historical changepoint rate, then are integrated twice (slope -> level).
+    future = t > 1
+    n_dates = t.shape[1]
+    single_diff = NS_PER_DAY / col('t_scale')
+    likelihood = np.array([len(p['changepoints_t']) for p in group])[:, None, None] * single_diff[:, :, None]
+    mean_delta = np.array([np.mean(np.abs(p['delta'])) if p['delta'] else 0.0 for p in group]) + 1e-8
+    shifts = rng.laplace(0, 1, size=(n_series, n_samples, n_dates)) * mean_delta[:, None, None]
+    shifts *= rng.uniform(size=shifts.shape) < likelihood
+    shifts *= future[:, None, :]
+    shifts = (shifts + np.concatenate([np.zeros(shifts.shape[:2] + (1,)), shifts[:, :, :-1]], axis=2)) / 2
+    uncertainty = shifts.cumsum(axis=2).cumsum(axis=2) * single_diff[:, :, None]
+    uncertainty = np.where(flat[:, :, None], 0, uncertainty)
+
+    sim_trend = (trend_scaled[:, None, :] + uncertainty) * y_scale[:, :, None] + floor[:, :, None]
+    noise = rng.normal(size=sim_trend.shape) * (col('sigma_obs') * y_scale)[:, :, None]
+    sims = sim_trend * (1 + mult[:, None, :]) + additive[:, None, :] + noise
+    widths = np.array([p['interval_width'] for p in group])
+    for width in np.unique(widths):
+        rows = widths == width
+        lower, upper = np.percentile(sims[rows], [100 * (1 - width) / 2, 100 * (1 + width) / 2], axis=1)
+        result.setdefault('yhat_lower', np.empty_like(trend))[rows] = lower
+        result.setdefault('yhat_upper', np.empty_like(trend))[rows] = upper
+    return result
+
+def _to_frame(ds_ns, arrays, i):
+    frame = pd.DataFrame({'ds': pd.to_datetime(ds_ns)})
+    for name in ('trend', 'yhat_lower', 'yhat_upper', 'yhat'):
+        if name in arrays:
+            frame[name] = arrays[name][i]
+    return frame
+
+def predict_frame(params: dict, ds, n_samples: int = None, seed: int = None) -> pd.DataFrame:
+    """
+    Forecast one series on arbitrary dates.
+
+    Args:
+        params (dict): Parameters from extract_params.
+        ds (array-like): Dates to predict, history and/or future.
+        n_samples (int, optional): Simulated paths for the intervals; 0 gives point
+            forecasts only. Defaults to the model's uncertainty_samples.
+        seed (int, optional): Seed for the simulation.
+
+    Returns:
+        pd.DataFrame: Columns 'ds', 'trend', 'yhat_lower', 'yhat_upper', 'yhat'.
+    """
+    ds_ns = pd.to_datetime(pd.Series(ds)).dt.as_unit('ns').to_numpy().astype(np.int64)[None, :]
+    n_samples = params['uncertainty_samples'] if n_samples is None else n_samples
+    arrays = _predict_arrays([params], ds_ns, n_samples, np.random.default_rng(seed))
+    return _to_frame(ds_ns[0], arrays, 0)
+
+def predict_batch(params_by_key: dict, horizon: int, n_samples: int = None, seed: int = None) -> dict:
+    """
+    Forecast the next `horizon` days of many series in batched NumPy calls.
+
+    Series are grouped by seasonality layout and evaluated in chunks sized so that
+    at most MAX_SIMULATION_SIZE simulated values are held at once.
+
+    Args:
+        params_by_key (dict): Maps any key (e.g. (series, target)) to extract_params output.
+        horizon (int): Number of days after each series' last training date.
+        n_samples (int, optional): Simulated paths per series; 0 for point forecasts only.
+            Defaults to each group's uncertainty_samples.
+        seed (int, optional): Seed for the simulation.
+
+    Returns:
+        dict: Maps each key to a DataFrame as returned by predict_frame.
+    """
+    rng = np.random.default_rng(seed)
+    steps = np.arange(1, horizon + 1, dtype=np.int64) * NS_PER_DAY
+    groups = {}
+    for key, params in params_by_key.items():
+        layout = tuple((s['period'], s['fourier_order'], s['mode']) for s in params['seasonalities'])
+        groups.setdefault(layout, []).append(key)
+
+    forecasts = {}
+    for keys in groups.values():
+        group_samples = params_by_key[keys[0]]['uncertainty_samples'] if n_samples is None else n_samples
+        chunk = max(1, MAX_SIMULATION_SIZE // max(1, group_samples * horizon))
+        for offset in range(0, len(keys), chunk):
+            chunk_keys = keys[offset:offset + chunk]
+            group = [params_by_key[key] for key in chunk_keys]
+            ds_ns = np.array([p['last_ds'] for p in group], dtype=np.int64)[:, None] + steps
+            arrays = _predict_arrays(group, ds_ns, group_samples, rng)
+            for i, key in enumerate(chunk_keys):
+                forecasts[key] = _to_frame(ds_ns[i], arrays, i)
+    return forecasts
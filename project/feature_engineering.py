@@ -1,3 +1,20 @@
+"""
+feature_engineering.py
+Features of the daily series, computed for every series in one vectorized pass.
+
+The series are stacked into a long (series, Date) frame (see long_frame) sorted by
+series then date. Each kernel works on the whole column at once: a lag is a shift
+of the column masked at series boundaries, and a rolling sum is a difference of
+cumulative sums, so adding series never adds Python-level work. Series are assumed
+to be daily and gap-free, as produced by preprocess_all_levels.
+"""
+import numpy as np
+import pandas as pd
+from .config import FEATURE_LAGS, FEATURE_WINDOWS
+
+SERIES_COL = 'series'
+DATE_COL = 'Date'
+
 def add_lag_features(df, columns, lag=1):
     for col in columns:
         df[f"{col}_lag_{lag}"] = df[col].shift(lag)
@@ -7,3 +24,131 @@ def add_date_features(df):
     df['day_of_week'] = df.index.dayofweek
     df['month'] = df.index.month
     return df
+
+def long_frame(datasets: dict, horizon: int = 0) -> pd.DataFrame:
+    """
+    Stack per-series daily frames into one long frame.
+
+    Args:
+        datasets (dict): DataFrames indexed by 'Date', keyed by series name.
+        horizon (int): Days appended after the end of each series with missing
+            values, so that features known in advance (lags of at least `horizon`
+            days, calendar) can be computed for the forecast window.
+
+    Returns:
+        pd.DataFrame: Columns 'series', 'Date' and the metric columns, sorted by series then date.
+    """
+    names = list(datasets)
+    frames = list(datasets.values())
+    columns = list(frames[0].columns) if frames else []
+    lengths = np.array([len(f) + horizon for f in frames], dtype=np.int64)
+    padding = np.full((horizon, len(columns)), np.nan)
+    # Selecting columns is only needed (and costly) when a frame's columns differ
+    blocks = [block for f in frames for block in (
+        (f if list(f.columns) == columns else f[columns]).to_numpy(dtype=float), padding)]
+    values = np.concatenate(blocks) if blocks else np.empty((0, len(columns)))
+    starts = np.array([f.index.values[0] if len(f) else np.datetime64(0, 'ns') for f in frames],
+                      dtype='datetime64[ns]')
+    dates = np.repeat(starts, lengths) + _positions(np.repeat(np.arange(len(frames)), lengths)) * np.timedelta64(1, 'D')
+    out = pd.DataFrame(values, columns=columns)
+    out.insert(0, DATE_COL, dates)
+    out.insert(0, SERIES_COL, pd.Categorical.from_codes(np.repeat(np.arange(len(names)), lengths), names))
+    return out
+
+def _positions(codes):
+    """Return each row's position within its series (rows sorted by series)."""
+    starts = np.r_[0, np.flatnonzero(codes[1:] != codes[:-1]) + 1]
+    lengths = np.diff(np.r_[starts, len(codes)])
+    return np.arange(len(codes)) - np.repeat(starts, lengths)
+
+def _shift(values, positions, lag):
+    """Shift a column down by `lag` rows within each series."""
+    out = np.full_like(values, np.nan)
+    if lag < len(values):
+        out[lag:] = values[:len(values) - lag]
+    out[positions < lag] = np.nan
+    return out
+
+def _rolling_sum(values, positions, window):
+    """Sum of the last `window` rows of each series; NaN unless all of them are present."""
+    valid = ~np.isnan(values)
+    sums = np.r_[0.0, np.cumsum(np.where(valid, values, 0.0))]
+    counts = np.r_[0, np.cumsum(valid)]
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    out = sums[end] - sums[start]
+    out[(positions < window - 1) | (counts[end] - counts[start] < window)] = np.nan
+    return out
+
+def build_features(long_df: pd.DataFrame, columns, lags=FEATURE_LAGS, windows=FEATURE_WINDOWS,
+                   cumulative: bool = True) -> pd.DataFrame:
+    """
+    Compute lag, rolling, delta, growth and calendar features for every series at once.
+
+    For each column, with cumulative=True (the COVID-19 counts are running totals):
+        - '{col}_lag_{n}': value n days earlier, for each n in lags
+        - '{col}_new': daily delta of the running total
+        - '{col}_new_roll_mean_{w}' / '{col}_new_roll_sum_{w}': mean and sum of the
+          daily deltas over the last w days, for each w in windows
+        - '{col}_growth': daily delta relative to the previous day's total (NaN when it is 0)
+    With cumulative=False the rolling windows apply to the column itself and no
+    delta or growth features are added. Calendar features 'day_of_week', 'month'
+    and 'is_weekend' are always added.
+
+    Args:
+        long_df (pd.DataFrame): Long frame as built by long_frame.
+        columns (list): Metric columns to derive features from.
+        lags (list): Lags in days.
+        windows (list): Rolling window lengths in days.
+        cumulative (bool): Whether the columns are running totals.
+
+    Returns:
+        pd.DataFrame: long_df (sorted by series and date) with the feature columns added.
+    """
+    df = long_df
+    codes = df[SERIES_COL].cat.codes.to_numpy() if isinstance(df[SERIES_COL].dtype, pd.CategoricalDtype) \
+        else pd.factorize(df[SERIES_COL])[0]
+    dates = df[DATE_COL].to_numpy()
+    order = np.lexsort((dates, codes))
+    if (order != np.arange(len(order))).any():
+        df, codes, dates = df.iloc[order].reset_index(drop=True), codes[order], dates[order]
+    positions = _positions(codes)
+
+    features = {}
+    for col in columns:
+        values = df[col].to_numpy(dtype=float)
+        for lag in lags:
+            features[f'{col}_lag_{lag}'] = _shift(values, positions, lag)
+        rolled, name = values, col
+        if cumulative:
+            name = f'{col}_new'
+            previous = _shift(values, positions, 1)
+            rolled = values - previous
+            features[name] = rolled
+            with np.errstate(divide='ignore', invalid='ignore'):
+                features[f'{col}_growth'] = np.where(previous > 0, rolled / previous, np.nan)
+        for window in windows:
+            sums = _rolling_sum(rolled, positions, window)
+            features[f'{name}_roll_sum_{window}'] = sums
+            features[f'{name}_roll_mean_{window}'] = sums / window
+
+    index = pd.DatetimeIndex(dates)
+    features['day_of_week'] = index.dayofweek.to_numpy()
+    features['month'] = index.month.to_numpy()
+    features['is_weekend'] = (features['day_of_week'] >= 5).astype(np.int8)
+    return pd.concat([df, pd.DataFrame(features, index=df.index)], axis=1)
+
+def regressor_frames(features: pd.DataFrame, names) -> dict:
+    """
+    Split selected feature columns into per-series frames for Prophet regressors.
+
+    Args:
+        features (pd.DataFrame): Output of build_features.
+        names (list): Feature columns to keep.
+
+    Returns:
+        dict: DataFrames with 'ds' and the selected columns, keyed by series name.
+    """
+    columns = features[[SERIES_COL, DATE_COL, *names]].rename(columns={DATE_COL: 'ds'})
+    return {name: frame.drop(columns=SERIES_COL).reset_index(drop=True)
+            for name, frame in columns.groupby(SERIES_COL, observed=True, sort=False)}
@@ -0,0 +1,335 @@
+"""
+forecast_service.py
+Local asyncio HTTP API serving forecasts of any horizon from the saved models.
+
+    GET /forecast?series=Italy&target=Confirmed&horizon=30
+    GET /forecast?series=Italy&series=Spain&target=Deaths   (every series x target pair)
+    GET /series                                             (keys with a model or stored forecast)
+    GET /health                                             (cache statistics)
+
+Version lookups, model loading and prediction run on a thread pool, never on the event loop. Models
+come from the ModelRegistry's LRU cache, and each key of a request missing from the
+response cache is predicted in one fast_predict batch. Baseline-tier series are
+recomputed over any horizon from their saved baseline state; series with neither
+(hierarchy-derived forecasts) are served from the forecast store, up to the horizon
+stored there. Responses are memoized in an LRU cache keyed on (series, target,
+version, horizon), where the version is the model's or baseline state's mtime or
+the stored forecast's run id, so rewriting either invalidates its entries.
+Concurrent requests for the same entry share a single computation.
+
+Run with: python -m project.forecast_service --port 8600
+"""
+import argparse
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from urllib.parse import urlsplit, parse_qs
+from .config import (TARGETS, FORECAST_PERIODS, MODEL_DIR, FORECAST_DB_PATH, BASELINE_SUFFIX, SERVICE_HOST,
+                     SERVICE_PORT, SERVICE_WORKERS, SERVICE_CACHE_SIZE, SERVICE_MAX_HORIZON)
+from .baseline_models import load_baseline, predict_baseline
+from .fast_predict import extract_params, predict_batch
+from .forecast_store import read_forecasts, key_run_ids, list_keys, FORECAST_COLUMNS
+from .model_registry import ModelRegistry, baseline_path_for
+from .logging_config import logger
+
+REQUEST_TIMEOUT = 30
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+def forecast_records(forecast) -> list:
+    """Convert a forecast frame into JSON-ready rows with ISO dates."""
+    columns = [c for c in ('yhat', 'yhat_lower', 'yhat_upper') if c in forecast]
+    records = forecast[columns].astype(float).to_dict('records')
+    for record, ds in zip(records, forecast['ds'].dt.strftime('%Y-%m-%d')):
+        record['ds'] = ds
+    return records
+
+class ForecastService:
+    """
+    Forecast computation and caching behind the HTTP handler.
+
+    Args:
+        registry (ModelRegistry, optional): Where models are found. Defaults to one over MODEL_DIR.
+        db_path (str): Forecast store serving the series that have no saved model.
+        workers (int): Threads used for model loading and prediction.
+        cache_size (int): Maximum number of cached (key, version, horizon) responses.
+        n_samples (int, optional): Simulated paths for the intervals; 0 returns point
+            forecasts only. Defaults to each model's uncertainty_samples.
+    """
+
+    def __init__(self, registry: ModelRegistry = None, workers: int = SERVICE_WORKERS,
+                 cache_size: int = SERVICE_CACHE_SIZE, n_samples: int = None, db_path: str = FORECAST_DB_PATH):
+        self.registry = registry or ModelRegistry(MODEL_DIR)
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.n_samples = n_samples
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='forecast')
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        """Return cache statistics."""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache),
+                'max_size': self.cache_size}
+
+    def close(self):
+        """Shut the worker pool down."""
+        self._executor.shutdown(wait=False)
+
+    def versions(self, keys) -> dict:
+        """
+        Return (version, source) for every key: its model's mtime ('model'), else its baseline
+        state's mtime ('baseline'), else its stored run id ('store'), else (None, None).
+
+        The keys left for the store are looked up in one connection. Runs on the pool.
+        """
+        versions, unsaved = {}, []
+        for series, target in keys:
+            version = self.registry.version(series, target)
+            if version is not None:
+                versions[(series, target)] = (version, 'model')
+                continue
+            try:
+                state = os.stat(baseline_path_for(series, target, self.registry.model_dir))
+                versions[(series, target)] = (state.st_mtime_ns, 'baseline')
+            except OSError:
+                unsaved.append((series, target))
+        run_ids = key_run_ids(unsaved, self.db_path)
+        for key in unsaved:
+            versions[key] = (run_ids.get(key), 'store' if key in run_ids else None)
+        return versions
+
+    def _compute(self, keys, horizon, stored=(), baselines=()) -> dict:
+        """
+        Predict several (series, target) keys; failures are returned as exceptions. Runs on the pool.
+
+        Keys in `baselines` are recomputed from their baseline state; keys in `stored`
+        have no saved model and are read from the forecast store instead.
+        """
+        results, params_by_key = {}, {}
+        for key in keys:
+            if key in stored:
+                continue
+            if key in baselines:
+                try:
+                    state = load_baseline(baseline_path_for(*key, self.registry.model_dir))
+                    results[key] = forecast_records(predict_baseline(state, horizon))
+                except Exception as e:
+                    logger.error(f"Forecast of {key[0]} - {key[1]} failed: {e}")
+                    results[key] = e
+                continue
+            try:
+                model = self.registry.get(*key)
+                try:
+                    params_by_key[key] = extract_params(model)
+                except ValueError:
+                    future = model.make_future_dataframe(periods=horizon).tail(horizon)
+                    results[key] = forecast_records(model.predict(future))
+            except Exception as e:
+                logger.error(f"Forecast of {key[0]} - {key[1]} failed: {e}")
+                results[key] = e
+        forecasts = predict_batch(params_by_key, horizon, n_samples=self.n_samples, seed=0)
+        for key, forecast in forecasts.items():
+            results[key] = forecast_records(forecast)
+        if stored:
+            frames = dict(tuple(read_forecasts(stored, db_path=self.db_path).groupby(['series', 'target'])))
+            for key in stored:
+                frame = frames.get(key)
+                if frame is None:
+                    results[key] = LookupError('no saved model or stored forecast')
+                elif len(frame) < horizon:
+                    results[key] = ValueError(f'no saved model; only {len(frame)} forecast days are stored')
+                else:
+                    results[key] = forecast_records(frame[FORECAST_COLUMNS].head(horizon))
+        return results
+
+    async def forecast(self, keys, horizon: int):
+        """
+        Forecast (series, target) keys over the next `horizon` days.
+
+        Args:
+            keys (list): (series, target) pairs.
+            horizon (int): Number of days to forecast.
+
+        Returns:
+            tuple: (forecasts, errors) lists of JSON-ready dicts.
+        """
+        loop = asyncio.get_running_loop()
+        forecasts, errors, waiting, computing = [], [], [], []
+        stored, baselines = set(), set()
+        # Resolving versions stats files and reads the store: keep it off the event loop
+        versions = await loop.run_in_executor(self._executor, self.versions, keys)
+        for series, target in keys:
+            version, source = versions[(series, target)]
+            if version is None:
+                errors.append({'series': series, 'target': target, 'error': 'no saved model or stored forecast'})
+                continue
+            cache_key = (series, target, version, horizon)
+            if cache_key in self._cache:
+                self._cache.move_to_end(cache_key)
+                self.hits += 1
+                forecasts.append({'series': series, 'target': target, 'version': version,
+                                  'forecast': self._cache[cache_key]})
+                continue
+            self.misses += 1
+            if cache_key not in self._inflight:
+                self._inflight[cache_key] = loop.create_future()
+                computing.append(cache_key)
+                if source == 'store':
+                    stored.add((series, target))
+                elif source == 'baseline':
+                    baselines.add((series, target))
+            waiting.append((cache_key, self._inflight[cache_key]))
+
+        if computing:
+            try:
+                computed = await loop.run_in_executor(
+                    self._executor, self._compute, [k[:2] for k in computing], horizon, stored, baselines)
+            except asyncio.CancelledError:
+                # Release requests sharing these entries instead of leaving them waiting
+                for cache_key in computing:
+                    self._inflight.pop(cache_key).set_exception(RuntimeError('request cancelled'))
+                raise
+            except Exception as e:
+                computed = {k[:2]: e for k in computing}
+            for cache_key in computing:
+                value = computed[cache_key[:2]]
+                future = self._inflight.pop(cache_key)
+                if isinstance(value, Exception):
+                    future.set_exception(value)
+                    continue
+                self._cache[cache_key] = value
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                future.set_result(value)
+
+        for (series, target, version, _), future in waiting:
+            try:
+                records = await future
+            except Exception as e:
+                errors.append({'series': series, 'target': target, 'error': str(e)})
+                continue
+            forecasts.append({'series': series, 'target': target, 'version': version, 'forecast': records})
+        return forecasts, errors
+
+    def keys(self) -> list:
+        """Return every (series, target) pair with a saved model, baseline state or stored forecast."""
+        stored = list_keys(self.db_path)
+        baselines = {tuple(f[:-len(BASELINE_SUFFIX)].rsplit('_', 1)) for f in os.listdir(self.registry.model_dir)
+                     if f.endswith(BASELINE_SUFFIX)}
+        return sorted(set(self.registry.keys()) | baselines | set(zip(stored['series'], stored['target'])))
+
+    async def dispatch(self, method: str, target: str):
+        """Route one request and return (status, JSON body)."""
+        if method != 'GET':
+            return 405, {'error': f'{method} is not supported'}
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        if url.path == '/health':
+            return 200, {'status': 'ok', 'cache': self.stats()}
+        if url.path == '/series':
+            keys = await asyncio.get_running_loop().run_in_executor(self._executor, self.keys)
+            return 200, {'keys': [{'series': s, 'target': t} for s, t in keys]}
+        if url.path != '/forecast':
+            return 404, {'error': f'unknown path {url.path}'}
+
+        series = query.get('series', [])
+        targets = query.get('target', TARGETS)
+        if not series:
+            return 400, {'error': "at least one 'series' parameter is required"}
+        try:
+            horizon = int(query.get('horizon', [FORECAST_PERIODS])[0])
+        except ValueError:
+            return 400, {'error': "'horizon' must be an integer"}
+        if not 1 <= horizon <= SERVICE_MAX_HORIZON:
+            return 400, {'error': f"'horizon' must be between 1 and {SERVICE_MAX_HORIZON}"}
+        keys = list(dict.fromkeys((s, t) for s in series for t in targets))
+        forecasts, errors = await self.forecast(keys, horizon)
+        status = 200 if forecasts else 404
+        return status, {'horizon': horizon, 'forecasts': forecasts, 'errors': errors}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.x requests on one connection, keeping it alive when the client allows."""
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get('content-length'):
+                    await reader.readexactly(int(headers['content-length']))
+
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    status, body, version = 400, {'error': 'malformed request line'}, 'HTTP/1.0'
+                else:
+                    method, target, version = parts
+                    try:
+                        status, body = await self.dispatch(method, target)
+                    except Exception as e:
+                        logger.error(f"Error serving {target}: {e}")
+                        status, body = 500, {'error': str(e)}
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                payload = json.dumps(body).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+async def start_service(service: ForecastService = None, host: str = SERVICE_HOST, port: int = SERVICE_PORT):
+    """Start listening and return the asyncio server (port 0 picks a free port)."""
+    service = service or ForecastService()
+    server = await asyncio.start_server(service.handle, host, port)
+    logger.info(f"Forecast service listening on {', '.join(str(s.getsockname()) for s in server.sockets)}")
+    return server
+
+async def serve(service: ForecastService = None, host: str = SERVICE_HOST, port: int = SERVICE_PORT):
+    """Run the forecast service until cancelled."""
+    server = await start_service(service, host, port)
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve forecasts of the saved models over HTTP.")
+    parser.add_argument('--host', default=SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--workers', type=int, default=SERVICE_WORKERS,
+                        help="Threads used for model loading and prediction.")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--db-path', default=FORECAST_DB_PATH,
+                        help="Forecast store serving series without a saved model.")
+    parser.add_argument('--samples', type=int, default=None,
+                        help="Simulated paths for the intervals (0 for point forecasts only).")
+    args = parser.parse_args()
+    service = ForecastService(ModelRegistry(args.model_dir), workers=args.workers, n_samples=args.samples,
+                              db_path=args.db_path)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,233 @@
+"""
+forecast_store.py
+Single SQLite store for all forecasts, replacing the per-series CSVs in Data_modified/.
+
+Rows are indexed by (series, target, ds) and versioned by pipeline run id. Each
+(series, target) key points at the run that last wrote it, so incremental runs that
+only refit a few series still leave a complete "latest" view.
+"""
+import os
+import sqlite3
+import uuid
+from datetime import datetime, timezone
+import pandas as pd
+from .config import FORECAST_DB_PATH, FORECAST_DIR, TARGETS
+from .logging_config import logger
+
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+LEGACY_SUFFIX = '_weekly_forecast.csv'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    note TEXT
+);
+CREATE TABLE IF NOT EXISTS forecasts (
+    series TEXT NOT NULL,
+    target TEXT NOT NULL,
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    ds TEXT NOT NULL,
+    yhat REAL,
+    yhat_lower REAL,
+    yhat_upper REAL,
+    PRIMARY KEY (series, target, run_id, ds)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series_index (
+    series TEXT NOT NULL,
+    target TEXT NOT NULL,
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    PRIMARY KEY (series, target)
+) WITHOUT ROWID;
+"""
+
+def connect(db_path: str = FORECAST_DB_PATH) -> sqlite3.Connection:
+    """Open the forecast store, creating its schema if needed."""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def start_run(conn: sqlite3.Connection, note: str = None) -> str:
+    """Register a new run and return its id (sortable by creation time)."""
+    now = datetime.now(timezone.utc)
+    run_id = f"{now.strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+    with conn:
+        conn.execute("INSERT INTO runs (run_id, created_at, note) VALUES (?, ?, ?)",
+                     (run_id, now.isoformat(timespec='microseconds'), note))
+    return run_id
+
+def write_forecast(conn: sqlite3.Connection, run_id: str, series: str, target: str, forecast: pd.DataFrame):
+    """
+    Store one forecast under a run and make it the latest version of its key.
+
+    Args:
+        conn (sqlite3.Connection): Open store connection.
+        run_id (str): Run id from start_run.
+        series (str): Series name ('global', a WHO region or a country).
+        target (str): Target name (e.g. 'Confirmed').
+        forecast (pd.DataFrame): Frame with columns 'ds', 'yhat', 'yhat_lower', 'yhat_upper'.
+    """
+    ds = pd.to_datetime(forecast['ds']).dt.strftime('%Y-%m-%d')
+    rows = zip([series] * len(forecast), [target] * len(forecast), [run_id] * len(forecast), ds,
+               forecast['yhat'].astype(float), forecast['yhat_lower'].astype(float),
+               forecast['yhat_upper'].astype(float))
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO forecasts VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.execute("INSERT OR REPLACE INTO series_index (series, target, run_id) VALUES (?, ?, ?)",
+                     (series, target, run_id))
+
+def write_forecasts(frames: dict, note: str = None, db_path: str = FORECAST_DB_PATH, run_id: str = None) -> str:
+    """
+    Store several forecasts as one new run, or add them to an existing one.
+
+    Args:
+        frames (dict): Maps (series, target) to a forecast DataFrame.
+        note (str, optional): Free-text description of the run.
+        db_path (str): Path of the SQLite store.
+        run_id (str, optional): Run id from start_run to write into; a new run is started by default.
+
+    Returns:
+        str: The run id.
+    """
+    conn = connect(db_path)
+    try:
+        run_id = run_id or start_run(conn, note)
+        for (series, target), forecast in frames.items():
+            write_forecast(conn, run_id, series, target, forecast)
+        return run_id
+    finally:
+        conn.close()
+
+def read_forecasts(keys=None, run_id: str = None, db_path: str = FORECAST_DB_PATH) -> pd.DataFrame:
+    """
+    Read many forecasts in a single query.
+
+    Args:
+        keys (list, optional): (series, target) pairs to read; None reads every key.
+        run_id (str, optional): Read this run; by default each key's latest run is used.
+        db_path (str): Path of the SQLite store.
+
+    Returns:
+        pd.DataFrame: Long frame with columns 'series', 'target', 'run_id' and FORECAST_COLUMNS.
+    """
+    columns = ['series', 'target', 'run_id'] + FORECAST_COLUMNS
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=columns)
+    if run_id is None:
+        query = ("SELECT f.series, f.target, f.run_id, f.ds, f.yhat, f.yhat_lower, f.yhat_upper "
+                 "FROM series_index i JOIN forecasts f "
+                 "ON f.series = i.series AND f.target = i.target AND f.run_id = i.run_id")
+        args = []
+    else:
+        query = ("SELECT series, target, run_id, ds, yhat, yhat_lower, yhat_upper "
+                 "FROM forecasts f WHERE f.run_id = ?")
+        args = [run_id]
+    conn = connect(db_path)
+    try:
+        if keys is not None:
+            keys = list(keys)
+            if not keys:
+                return pd.DataFrame(columns=columns)
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (series TEXT, target TEXT)")
+            conn.execute("DELETE FROM wanted")
+            conn.executemany("INSERT INTO wanted VALUES (?, ?)", keys)
+            query += (" AND EXISTS (SELECT 1 FROM wanted w WHERE w.series = f.series AND w.target = f.target)"
+                      if run_id else
+                      " JOIN wanted w ON w.series = f.series AND w.target = f.target")
+        df = pd.read_sql_query(query + " ORDER BY f.series, f.target, f.ds", conn, params=args)
+    finally:
+        conn.close()
+    df['ds'] = pd.to_datetime(df['ds'])
+    return df
+
+def read_forecast(series: str, target: str, run_id: str = None, db_path: str = FORECAST_DB_PATH):
+    """Return the forecast of one (series, target) key, or None if it is not in the store."""
+    df = read_forecasts([(series, target)], run_id=run_id, db_path=db_path)
+    if df.empty:
+        return None
+    return df[FORECAST_COLUMNS].reset_index(drop=True)
+
+def key_run_ids(keys, db_path: str = FORECAST_DB_PATH) -> dict:
+    """Return the run that last wrote each of several (series, target) keys, leaving out keys not in the store."""
+    if not keys or not os.path.exists(db_path):
+        return {}
+    conn = connect(db_path)
+    try:
+        run_ids = {}
+        for series, target in keys:
+            row = conn.execute("SELECT run_id FROM series_index WHERE series = ? AND target = ?",
+                               (series, target)).fetchone()
+            if row:
+                run_ids[(series, target)] = row[0]
+        return run_ids
+    finally:
+        conn.close()
+
+def list_keys(db_path: str = FORECAST_DB_PATH) -> pd.DataFrame:
+    """Return every available (series, target) key with the run that last wrote it."""
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=['series', 'target', 'run_id'])
+    conn = connect(db_path)
+    try:
+        return pd.read_sql_query("SELECT series, target, run_id FROM series_index ORDER BY series, target", conn)
+    finally:
+        conn.close()
+
+def list_series(db_path: str = FORECAST_DB_PATH) -> list:
+    """Return the sorted names of all series in the store."""
+    return sorted(list_keys(db_path)['series'].unique())
+
+def list_targets(series: str, db_path: str = FORECAST_DB_PATH) -> list:
+    """Return the sorted targets available for a series."""
+    keys = list_keys(db_path)
+    return sorted(keys.loc[keys['series'] == series, 'target'])
+
+def latest_run_id(db_path: str = FORECAST_DB_PATH):
+    """Return the id of the most recent run, or None for an empty store."""
+    if not os.path.exists(db_path):
+        return None
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT run_id FROM runs ORDER BY created_at DESC, run_id DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+def parse_legacy_name(filename: str):
+    """
+    Split '{series}_{target}_weekly_forecast.csv' into (series, target).
+
+    The series name may itself contain '_'; files whose target is not one of
+    config.TARGETS are not forecasts of a known key and return None.
+    """
+    if not filename.endswith(LEGACY_SUFFIX):
+        return None
+    stem = filename[:-len(LEGACY_SUFFIX)]
+    if '_' not in stem:
+        return None
+    series, target = stem.rsplit('_', 1)
+    return (series, target) if target in TARGETS else None
+
+def import_forecast_csvs(forecast_dir: str = FORECAST_DIR, db_path: str = FORECAST_DB_PATH):
+    """
+    Load legacy per-series forecast CSVs into the store as one run.
+
+    Returns:
+        str or None: The new run id, or None if there was nothing to import.
+    """
+    frames = {}
+    for filename in sorted(os.listdir(forecast_dir)):
+        key = parse_legacy_name(filename)
+        if key:
+            frames[key] = pd.read_csv(os.path.join(forecast_dir, filename))
+    if not frames:
+        return None
+    run_id = write_forecasts(frames, note=f'import of legacy CSVs from {forecast_dir}', db_path=db_path)
+    logger.info(f"Imported {len(frames)} legacy forecast CSVs into run {run_id}.")
+    return run_id
+
+def ensure_store(db_path: str = FORECAST_DB_PATH, forecast_dir: str = FORECAST_DIR):
+    """Create the store from the legacy CSVs if it does not exist yet."""
+    if not os.path.exists(db_path):
+        import_forecast_csvs(forecast_dir, db_path)
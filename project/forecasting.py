@@ -1,7 +1,131 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from prophet.diagnostics import cross_validation, performance_metrics
+from .config import CV_CACHE_DIR
+from .modeling import train_prophet_model, predict
+from .tuning import load_series_params
+from .utils import hash_series, resolve_n_jobs
+from .logging_config import logger
 
 def cross_validate_prophet(model, initial='120 days', period='30 days', horizon='10 days'):
+    from prophet.diagnostics import cross_validation, performance_metrics
     df_cv = cross_validation(model, initial=initial, period=period, horizon=horizon, parallel='processes')
     df_p = performance_metrics(df_cv, rolling_window=3)
     return df_cv, df_p
+
+def fold_cache_key(series_hash: str, params: dict, cutoff, horizon) -> str:
+    """Return the cache key of one CV fold: series content, params, cutoff and horizon."""
+    payload = json.dumps([series_hash, params or {}, str(cutoff), str(horizon)], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def forecast_fold(df_model: pd.DataFrame, params: dict, cutoff, horizon) -> pd.DataFrame:
+    """
+    Fit on the history up to a cutoff and forecast the following horizon.
+
+    Args:
+        df_model (pd.DataFrame): Series with columns 'ds' and 'y'.
+        params (dict or None): Prophet model parameters.
+        cutoff (pd.Timestamp): Last date used for training.
+        horizon (pd.Timedelta): Length of the forecast window after the cutoff.
+
+    Returns:
+        pd.DataFrame: Columns 'ds', 'yhat', 'yhat_lower', 'yhat_upper', 'y' and 'cutoff'.
+    """
+    history = df_model[df_model['ds'] <= cutoff]
+    holdout = df_model[(df_model['ds'] > cutoff) & (df_model['ds'] <= cutoff + horizon)]
+    model = train_prophet_model(history, params)
+    forecast = predict(model, holdout[['ds']])
+    fold = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].copy()
+    fold['y'] = holdout['y'].to_numpy()
+    fold['cutoff'] = cutoff
+    return fold
+
+def batch_cross_validate(tasks, params: dict = None, initial='120 days', period='30 days', horizon='10 days',
+                         n_jobs=None, cache_dir: str = CV_CACHE_DIR, rolling_window: float = 3):
+    """
+    Cross-validate many series at once on a single shared process pool.
+
+    The (series x cutoff) task grid is built up front and every fold not already in
+    the cache is fitted on one pool. Fold forecasts are cached on disk, keyed on the
+    series content hash, params, cutoff and horizon, so repeated runs only fit folds
+    whose inputs changed. A failing fold is logged and left out.
+
+    Args:
+        tasks (list): Tuples of (name, target, df_model) as built by pipeline.build_tasks.
+        params (dict, optional): Maps '{name}_{target}' to Prophet params. Series without an
+            entry use their tuned params from Model_parameters/, or Prophet defaults.
+        initial, period, horizon (str): Prophet-style durations, as in cross_validate_prophet.
+        n_jobs (int, optional): Worker processes; -1 uses every core. Defaults to config.N_JOBS.
+        cache_dir (str, optional): Fold cache directory; None disables caching.
+        rolling_window (float): Passed to prophet.diagnostics.performance_metrics.
+
+    Returns:
+        tuple: (df_cv, metrics). df_cv holds every fold forecast with 'series' and 'target'
+            columns; metrics is one tidy table of performance_metrics for all series.
+    """
+    from prophet.diagnostics import performance_metrics, generate_cutoffs
+    initial, period, horizon = pd.Timedelta(initial), pd.Timedelta(period), pd.Timedelta(horizon)
+    params = params or {}
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    folds, pending = {}, []
+    for name, target, df_model in tasks:
+        key = f'{name}_{target}'
+        series_params = params[key] if key in params else load_series_params(name, target)
+        try:
+            cutoffs = generate_cutoffs(df_model, horizon, initial, period)
+        except ValueError as e:
+            logger.warning(f"Skipping cross-validation of {key}: {e}")
+            continue
+        series_hash = hash_series(df_model)
+        for cutoff in cutoffs:
+            fold_key = fold_cache_key(series_hash, series_params, cutoff, horizon)
+            cache_path = os.path.join(cache_dir, f'{fold_key}.csv') if cache_dir else None
+            if cache_path and os.path.exists(cache_path):
+                folds[(name, target, cutoff)] = pd.read_csv(cache_path, parse_dates=['ds', 'cutoff'])
+            else:
+                pending.append((name, target, cutoff, df_model, series_params, cache_path))
+    logger.info(f"Cross-validation: {len(folds)} cached folds, {len(pending)} to fit.")
+
+    def store(name, target, cutoff, cache_path, fold):
+        folds[(name, target, cutoff)] = fold
+        if cache_path:
+            # Write then rename, so an interrupted run never leaves a truncated fold behind
+            tmp_path = f"{cache_path}.tmp"
+            fold.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, cache_path)
+
+    n_jobs = resolve_n_jobs(n_jobs)
+    if n_jobs == 1:
+        for name, target, cutoff, df_model, series_params, cache_path in pending:
+            try:
+                store(name, target, cutoff, cache_path, forecast_fold(df_model, series_params, cutoff, horizon))
+            except Exception as e:
+                logger.error(f"Fold {name}_{target} @ {cutoff} failed: {e}")
+    elif pending:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [(job, executor.submit(forecast_fold, job[3], job[4], job[2], horizon)) for job in pending]
+            for (name, target, cutoff, _, _, cache_path), future in futures:
+                try:
+                    store(name, target, cutoff, cache_path, future.result())
+                except Exception as e:
+                    logger.error(f"Fold {name}_{target} @ {cutoff} failed: {e}")
+
+    if not folds:
+        return pd.DataFrame(), pd.DataFrame()
+    df_cv = pd.concat(
+        [fold.assign(series=name, target=target) for (name, target, _), fold in folds.items()],
+        ignore_index=True,
+    )
+    metrics = []
+    for (name, target), group in df_cv.groupby(['series', 'target'], sort=True):
+        df_p = performance_metrics(group, rolling_window=rolling_window)
+        if df_p is not None:
+            metrics.append(df_p.assign(series=name, target=target))
+    metrics = pd.concat(metrics, ignore_index=True) if metrics else pd.DataFrame()
+    if not metrics.empty:
+        metrics = metrics[['series', 'target'] + [c for c in metrics.columns if c not in ('series', 'target')]]
+    return df_cv, metrics
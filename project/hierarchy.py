@@ -0,0 +1,170 @@
+"""
+hierarchy.py
+Coherent forecasts over the country -> WHO region -> global hierarchy.
+
+Instead of fitting every level independently, models are fitted at one level and
+the others are derived from their forecasts: upper levels by summing their
+children (bottom-up), lower levels by splitting their parent's forecast in
+proportion to each child's recent share of it (top-down). Alternatively every
+level is fitted and the forecasts are reconciled (OLS projection onto the
+coherent subspace), so that each region equals the sum of its countries and
+global the sum of all countries.
+
+Prediction intervals of a sum assume independent errors: the half-widths of
+the children are added in quadrature.
+"""
+import numpy as np
+import pandas as pd
+from .config import HIERARCHY_SHARE_DAYS
+
+GLOBAL = 'global'
+LEVELS = ['global', 'region', 'country']
+
+class Hierarchy:
+    """
+    Country -> region -> global structure.
+
+    Args:
+        parent_of (dict): Maps each country to its WHO region (see SeriesCube.parent_of).
+    """
+
+    def __init__(self, parent_of: dict):
+        self.countries = sorted(parent_of)
+        self.regions = sorted(set(parent_of.values()))
+        self.children = {GLOBAL: self.regions}
+        for region in self.regions:
+            self.children[region] = [c for c in self.countries if parent_of[c] == region]
+        self.parent_of = parent_of
+
+    def names(self, level: str) -> list:
+        """Return the series of a level ('global', 'region' or 'country')."""
+        return {'global': [GLOBAL], 'region': self.regions, 'country': self.countries}[level]
+
+    def nodes(self) -> list:
+        """Return every series, top level first."""
+        return [GLOBAL, *self.regions, *self.countries]
+
+    def summing_matrix(self) -> np.ndarray:
+        """Return S of shape (nodes, countries), mapping country values to every node."""
+        region_rows = np.array([[self.parent_of[c] == r for c in self.countries] for r in self.regions], dtype=float)
+        return np.vstack([np.ones((1, len(self.countries))), region_rows.reshape(-1, len(self.countries)),
+                          np.eye(len(self.countries))])
+
+def _half_widths(frame):
+    return frame['yhat'] - frame['yhat_lower'], frame['yhat_upper'] - frame['yhat']
+
+def sum_forecasts(frames: list) -> pd.DataFrame:
+    """
+    Sum forecasts over their common dates.
+
+    Args:
+        frames (list): Frames with 'ds', 'yhat', 'yhat_lower' and 'yhat_upper'.
+
+    Returns:
+        pd.DataFrame: Summed forecast with intervals combined in quadrature.
+    """
+    stacked = pd.concat([f[['ds', 'yhat', 'yhat_lower', 'yhat_upper']] for f in frames], ignore_index=True)
+    lower, upper = _half_widths(stacked)
+    stacked = stacked.assign(lower_sq=lower ** 2, upper_sq=upper ** 2)
+    grouped = stacked.groupby('ds', sort=True)
+    summed = grouped[['yhat', 'lower_sq', 'upper_sq']].sum()
+    summed = summed[grouped.size() == len(frames)]
+    return pd.DataFrame({
+        'ds': summed.index,
+        'yhat': summed['yhat'].to_numpy(),
+        'yhat_lower': (summed['yhat'] - np.sqrt(summed['lower_sq'])).to_numpy(),
+        'yhat_upper': (summed['yhat'] + np.sqrt(summed['upper_sq'])).to_numpy(),
+    })
+
+def recent_shares(history: dict, names: list, target: str, days: int = HIERARCHY_SHARE_DAYS) -> dict:
+    """
+    Return each series' share of the group's total over the last `days` days.
+
+    Args:
+        history (dict): Daily frames indexed by 'Date', keyed by series name.
+        names (list): Series of the group.
+        target (str): Column the shares are computed on.
+        days (int): Days averaged.
+
+    Returns:
+        dict: Share per series; equal shares if the group total is 0.
+    """
+    totals = np.array([history[n][target].tail(days).mean() if n in history and len(history[n]) else 0.0
+                       for n in names])
+    totals = np.clip(np.nan_to_num(totals), 0, None)
+    if totals.sum() <= 0:
+        return {n: 1 / len(names) for n in names}
+    return dict(zip(names, totals / totals.sum()))
+
+def split_forecast(frame: pd.DataFrame, share: float) -> pd.DataFrame:
+    """Return a child's share of a parent forecast."""
+    out = frame[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].copy()
+    out[['yhat', 'yhat_lower', 'yhat_upper']] *= share
+    return out
+
+def reconcile(forecasts: dict, hierarchy: Hierarchy) -> dict:
+    """
+    Make forecasts of every node coherent with an OLS projection.
+
+    The point forecasts of all nodes, for each date they share, are replaced by
+    S (S'S)^-1 S' yhat; each interval is moved with its point forecast.
+
+    Args:
+        forecasts (dict): Forecast frames of every node, keyed by series name.
+        hierarchy (Hierarchy): Structure of the nodes.
+
+    Returns:
+        dict: Reconciled frames keyed by series name.
+    """
+    nodes = hierarchy.nodes()
+    wide = pd.concat({n: forecasts[n].set_index('ds')['yhat'] for n in nodes}, axis=1).dropna()
+    S = hierarchy.summing_matrix()
+    bottom = np.linalg.solve(S.T @ S, S.T @ wide[nodes].to_numpy().T)
+    adjusted = pd.DataFrame((S @ bottom).T, index=wide.index, columns=nodes)
+    out = {}
+    for n in nodes:
+        frame = forecasts[n].set_index('ds').loc[wide.index, ['yhat', 'yhat_lower', 'yhat_upper']]
+        shift = adjusted[n] - frame['yhat']
+        out[n] = frame.add(shift, axis=0).reset_index()
+    return out
+
+def coherent_forecasts(fitted: dict, hierarchy: Hierarchy, level: str, history: dict = None,
+                       target: str = None, reconcile_all: bool = False) -> dict:
+    """
+    Derive the forecasts of every level from those fitted at one level.
+
+    Args:
+        fitted (dict): Forecast frames ('ds', 'yhat', 'yhat_lower', 'yhat_upper') keyed by
+            series name: the series of `level`, or every node when reconcile_all is set.
+        hierarchy (Hierarchy): Structure of the series.
+        level (str): Level the models were fitted at ('country', 'region' or 'global').
+        history (dict, optional): Daily frames keyed by series name, for top-down shares.
+        target (str, optional): Column of `history` the shares are computed on.
+        reconcile_all (bool): Reconcile forecasts fitted at every level instead.
+
+    Returns:
+        dict: Forecast frames of every series that could be derived, keyed by series name.
+            A node whose inputs are incomplete (e.g. a child failed to fit) is left out.
+    """
+    if reconcile_all:
+        if not all(n in fitted for n in hierarchy.nodes()):
+            return {}
+        return reconcile(fitted, hierarchy)
+    out = {n: fitted[n] for n in hierarchy.names(level) if n in fitted}
+    # Bottom-up: sum children into parents, from the fitted level upwards
+    for upper in LEVELS[:LEVELS.index(level)][::-1]:
+        for parent in hierarchy.names(upper):
+            children = hierarchy.children[parent]
+            if all(c in out for c in children):
+                out[parent] = sum_forecasts([out[c] for c in children])
+    # Top-down: split parents into children, from the fitted level downwards
+    for lower in LEVELS[LEVELS.index(level) + 1:]:
+        parents = hierarchy.names(LEVELS[LEVELS.index(lower) - 1])
+        for parent in parents:
+            if parent not in out:
+                continue
+            children = hierarchy.children[parent]
+            shares = recent_shares(history or {}, children, target)
+            for child in children:
+                out[child] = split_forecast(out[parent], shares[child])
+    return out
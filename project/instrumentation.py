@@ -0,0 +1,170 @@
+"""
+instrumentation.py
+Lightweight spans recording wall time, CPU time, peak RSS and row counts.
+
+Peak RSS comes from getrusage, which only knows the high-water mark of the whole
+process. A span records it as 'process_peak_rss_mb' (the mark when the span ended,
+including everything the process did before) and as 'rss_growth_mb', how much the
+span raised it: 0 for a span that stayed below an earlier peak, so memory is
+attributed to the span that first needed it.
+
+Code is wrapped in `span(name, rows=..., **labels)`; spans are kept by the
+recorder opened with `collect()` and discarded when none is open, so library
+code can be instrumented unconditionally. Pipeline workers collect their own
+spans and return them to the parent, which writes a run's spans as JSON lines,
+a Prometheus text snapshot and a summary naming the slowest series.
+"""
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from .config import METRICS_PATH, METRICS_SNAPSHOT_PATH
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_current = None
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / 2 ** 20 if os.uname().sysname == 'Darwin' else peak / 2 ** 10
+
+class SpanRecorder:
+    """Collects finished spans of one process."""
+
+    def __init__(self):
+        self.records = []
+        self._stack = []
+
+    @contextmanager
+    def span(self, name: str, rows: int = None, **labels):
+        """Measure the enclosed block; the yielded record may be updated (e.g. record['rows'] = n)."""
+        parent = self._stack[-1] if self._stack else None
+        # Nested spans inherit the labels (e.g. series, target) of the span they run in
+        record = {'span': name, 'parent': parent['span'] if parent else None,
+                  'labels': {**(parent['labels'] if parent else {}), **labels}, 'rows': rows,
+                  'pid': os.getpid(), 'start': datetime.now(timezone.utc).isoformat(timespec='milliseconds')}
+        self._stack.append(record)
+        wall, cpu, rss = time.perf_counter(), time.process_time(), peak_rss_mb()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - wall
+            record['cpu_seconds'] = time.process_time() - cpu
+            record['process_peak_rss_mb'] = peak_rss_mb()
+            record['rss_growth_mb'] = None if rss is None else record['process_peak_rss_mb'] - rss
+            self._stack.pop()
+            self.records.append(record)
+
+@contextmanager
+def collect():
+    """Record every span opened in this process until the block exits; yields the SpanRecorder."""
+    global _current
+    previous, _current = _current, SpanRecorder()
+    try:
+        yield _current
+    finally:
+        _current = previous
+
+@contextmanager
+def span(name: str, rows: int = None, **labels):
+    """Measure a block on the active recorder (see collect); a no-op recorder is used when none is active."""
+    with (_current or SpanRecorder()).span(name, rows, **labels) as record:
+        yield record
+
+def timed(name: str = None):
+    """Decorator running a function inside a span named after it."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def extend(records):
+    """Add spans recorded elsewhere (e.g. in a worker process) to the active recorder."""
+    if _current is not None:
+        _current.records.extend(records)
+
+def slowest_series(records, span_name: str = 'fit_series', top: int = 5) -> list:
+    """Return the `top` (series, target, seconds, rss_growth_mb) tuples with the longest `span_name` spans."""
+    rows = [(r['labels'].get('series'), r['labels'].get('target'), r['seconds'], r.get('rss_growth_mb'))
+            for r in records if r['span'] == span_name]
+    return sorted(rows, key=lambda row: row[2], reverse=True)[:top]
+
+def write_jsonl(records, run_id: str, path: str = METRICS_PATH):
+    """Append spans as JSON lines tagged with the run id."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps({'run_id': run_id, **record}) + '\n')
+
+def prometheus_snapshot(records, prefix: str = 'covid_pipeline') -> str:
+    """
+    Render spans in the Prometheus text exposition format.
+
+    Spans are aggregated by name (count, total and max wall time, CPU time, rows),
+    so per-series spans do not create one time series per series.
+    """
+    stats = {}
+    for record in records:
+        s = stats.setdefault(record['span'], {'count': 0, 'seconds': 0.0, 'max': 0.0, 'cpu': 0.0, 'rows': 0})
+        s['count'] += 1
+        s['seconds'] += record['seconds']
+        s['max'] = max(s['max'], record['seconds'])
+        s['cpu'] += record['cpu_seconds']
+        s['rows'] += record['rows'] or 0
+    metrics = [
+        ('span_count', 'counter', 'Number of finished spans.', 'count'),
+        ('span_seconds_total', 'counter', 'Total wall time of the spans.', 'seconds'),
+        ('span_max_seconds', 'gauge', 'Longest wall time of a single span.', 'max'),
+        ('span_cpu_seconds_total', 'counter', 'Total CPU time of the spans.', 'cpu'),
+        ('span_rows_total', 'counter', 'Rows processed by the spans.', 'rows'),
+    ]
+    lines = []
+    for metric, kind, help_text, field in metrics:
+        lines += [f'# HELP {prefix}_{metric} {help_text}', f'# TYPE {prefix}_{metric} {kind}']
+        lines += [f'{prefix}_{metric}{{span="{name}"}} {s[field]:g}' for name, s in sorted(stats.items())]
+    peaks = [r['process_peak_rss_mb'] for r in records if r.get('process_peak_rss_mb') is not None]
+    if peaks:
+        lines += [f'# HELP {prefix}_peak_rss_megabytes Peak resident set size of any pipeline process.',
+                  f'# TYPE {prefix}_peak_rss_megabytes gauge',
+                  f'{prefix}_peak_rss_megabytes {max(peaks):g}']
+    return '\n'.join(lines) + '\n'
+
+def write_snapshot(records, path: str = METRICS_SNAPSHOT_PATH):
+    """Atomically replace the Prometheus snapshot file."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus_snapshot(records))
+    os.replace(tmp_path, path)
+
+def summarize(records, top: int = 5) -> str:
+    """Return a text summary of the top-level stages and the slowest series."""
+    lines = ['Run summary:']
+    for record in records:
+        if record['parent'] is None and 'series' not in record['labels']:
+            rows = f", {record['rows']} rows" if record['rows'] is not None else ''
+            lines.append(f"  {record['span']}: {record['seconds']:.2f}s wall, {record['cpu_seconds']:.2f}s CPU{rows}")
+    slowest = slowest_series(records, top=top)
+    if slowest:
+        lines.append('  Slowest series: ' + ', '.join(
+            f'{series} - {target} ({seconds:.2f}s' + (f', +{growth:.0f} MB peak RSS)' if growth else ')')
+            for series, target, seconds, growth in slowest))
+    peaks = [r['process_peak_rss_mb'] for r in records if r.get('process_peak_rss_mb') is not None]
+    if peaks:
+        lines.append(f'  Peak RSS: {max(peaks):.0f} MB')
+    return '\n'.join(lines)
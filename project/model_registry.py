@@ -0,0 +1,171 @@
+"""
+model_registry.py
+Lazy, bounded in-memory registry of saved Prophet models.
+
+Models are stored as Prophet JSON ('{name}_{target}_prophet_model.json'), which
+does not depend on pickled pandas/Stan internals. Legacy joblib files are still
+read when no JSON file exists. Loaded models are kept in an LRU cache so the
+dashboard and serving paths can hold hot models without loading all of them.
+"""
+import os
+import threading
+from collections import OrderedDict
+from .config import MODEL_DIR, MODEL_SUFFIX, LEGACY_MODEL_SUFFIX, BASELINE_SUFFIX, MODEL_CACHE_SIZE
+from .utils import save_model, load_model
+from .logging_config import logger
+
+def model_path_for(name, target, model_dir=MODEL_DIR):
+    """Return the path the model for a (series, target) pair is saved to."""
+    return os.path.join(model_dir, f'{name}_{target}{MODEL_SUFFIX}')
+
+def baseline_path_for(name, target, model_dir=MODEL_DIR):
+    """Return the path the baseline state of a (series, target) pair is saved to."""
+    return os.path.join(model_dir, f'{name}_{target}{BASELINE_SUFFIX}')
+
+def remove_model(name, target, model_dir=MODEL_DIR, keep: str = None) -> list:
+    """
+    Delete the saved models of a (series, target) pair: Prophet JSON, legacy joblib and baseline state.
+
+    Used when a series changes model type or is no longer fitted, so that no stale model is served.
+
+    Args:
+        keep (str, optional): Path of the model just saved for the series, left in place.
+
+    Returns:
+        list: Paths removed.
+    """
+    removed = []
+    for path in (model_path_for(name, target, model_dir),
+                 os.path.join(model_dir, f'{name}_{target}{LEGACY_MODEL_SUFFIX}'),
+                 baseline_path_for(name, target, model_dir)):
+        if path != keep and os.path.exists(path):
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+def parse_model_name(filename: str):
+    """Split a model file name into (series, target), or return None if it is not a model file."""
+    for suffix in (MODEL_SUFFIX, LEGACY_MODEL_SUFFIX):
+        if filename.endswith(suffix):
+            stem = filename[:-len(suffix)]
+            if '_' in stem:
+                return tuple(stem.rsplit('_', 1))
+    return None
+
+class ModelRegistry:
+    """
+    Thread-safe LRU cache of Prophet models loaded on first use.
+
+    Args:
+        model_dir (str): Directory holding the saved models.
+        max_models (int): Maximum number of models kept in memory.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR, max_models: int = MODEL_CACHE_SIZE):
+        self.model_dir = model_dir
+        self.max_models = max_models
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, name, target):
+        """Return the file backing a model, preferring JSON over a legacy joblib file."""
+        path = model_path_for(name, target, self.model_dir)
+        legacy = os.path.join(self.model_dir, f'{name}_{target}{LEGACY_MODEL_SUFFIX}')
+        if not os.path.exists(path) and os.path.exists(legacy):
+            return legacy
+        return path
+
+    def keys(self) -> list:
+        """Return every (series, target) pair with a saved model."""
+        keys = set()
+        for filename in os.listdir(self.model_dir):
+            key = parse_model_name(filename)
+            if key:
+                keys.add(key)
+        return sorted(keys)
+
+    def version(self, name, target):
+        """Return the modification time of a model file, or None if it is missing."""
+        try:
+            return os.stat(self.path(name, target)).st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self, path):
+        """
+        Return the model saved at a path, loading it on a cache miss.
+
+        Cache entries are keyed on path and mtime, so a model rewritten on disk is reloaded.
+        """
+        key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+        model = load_model(path)
+        with self._lock:
+            self._cache[key] = model
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_models:
+                self._cache.popitem(last=False)
+        return model
+
+    def get(self, name, target):
+        """Return the model of a (series, target) pair. Raises FileNotFoundError if there is none."""
+        path = self.path(name, target)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No saved model for {name} - {target}")
+        return self.load(path)
+
+    def save(self, name, target, model) -> str:
+        """Save a model as Prophet JSON and return its path."""
+        path = model_path_for(name, target, self.model_dir)
+        save_model(model, path)
+        return path
+
+    def clear(self):
+        """Drop every cached model."""
+        with self._lock:
+            self._cache.clear()
+
+_default_registry = None
+
+def default_registry() -> ModelRegistry:
+    """Return the process-wide registry for MODEL_DIR."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ModelRegistry()
+    return _default_registry
+
+def convert_legacy_models(model_dir: str = MODEL_DIR, remove: bool = False) -> list:
+    """
+    Re-save joblib models as Prophet JSON.
+
+    Models that cannot be unpickled in the current environment are logged and skipped.
+
+    Args:
+        model_dir (str): Directory holding the saved models.
+        remove (bool): Delete each joblib file once its JSON copy is written.
+
+    Returns:
+        list: (series, target) pairs that were converted.
+    """
+    converted = []
+    for filename in sorted(os.listdir(model_dir)):
+        if not filename.endswith(LEGACY_MODEL_SUFFIX):
+            continue
+        name, target = parse_model_name(filename)
+        legacy = os.path.join(model_dir, filename)
+        try:
+            save_model(load_model(legacy), model_path_for(name, target, model_dir))
+        except Exception as e:
+            logger.error(f"Could not convert {filename}: {e}")
+            continue
+        if remove:
+            os.remove(legacy)
+        converted.append((name, target))
+    return converted
@@ -1,14 +1,18 @@
 from project.logging_config import logger
 import pandas as pd
-from prophet import Prophet
+import time
 
-def train_prophet_model(df: pd.DataFrame, params: dict = None):
+def train_prophet_model(df: pd.DataFrame, params: dict = None, init: dict = None, regressors: list = None):
     """
     Train a Prophet time series forecasting model on the given dataframe.
 
     Args:
         df (pd.DataFrame): DataFrame with columns 'ds' (date) and 'y' (target value).
         params (dict, optional): Prophet model parameters. Defaults to None.
+        init (dict, optional): Initial values for the Stan optimizer (k, m, delta, beta,
+            sigma_obs), e.g. from warm_start_init. Defaults to None (cold start).
+        regressors (list, optional): Columns of df added to the model as extra regressors.
+            Their values must then also be given in the future dataframe.
 
     Returns:
         Prophet: Trained Prophet model.
@@ -16,15 +20,36 @@ def train_prophet_model(df: pd.DataFrame, params: dict = None):
     Raises:
         Exception: If model training fails.
     """
+    # Prophet (and the matplotlib it pulls in) is only imported once a model is fitted
+    from prophet import Prophet
     try:
+        start = time.perf_counter()
         model = Prophet(**params) if params else Prophet()
-        model.fit(df)
-        logger.info("Prophet model trained successfully.")
+        for name in regressors or []:
+            model.add_regressor(name)
+        if init:
+            model.fit(df, init=init)
+        else:
+            model.fit(df)
+        logger.info(f"Prophet model trained successfully on {len(df)} rows in {time.perf_counter() - start:.2f}s.")
         return model
     except Exception as e:
         logger.error(f"Error training Prophet model: {e}")
         raise
 
+def warm_start_init(model):
+    """
+    Extract fitted parameters from a trained Prophet model to warm-start a refit.
+
+    Args:
+        model (Prophet): Previously trained Prophet model.
+
+    Returns:
+        dict: Initial values for k, m, sigma_obs, delta and beta.
+    """
+    from prophet.utilities import warm_start_params
+    return warm_start_params(model)
+
 def make_future_dataframe(model, periods=7):
     """
     Create a future dataframe for forecasting with the given Prophet model.
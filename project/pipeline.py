@@ -1,44 +1,555 @@
-from .data_acquisition import load_covid_data
-from .data_preprocessing import clean_data, preprocess_grouped_data
-from .feature_engineering import add_lag_features, add_date_features
-from .modeling import train_prophet_model, make_future_dataframe, predict
-from .evaluation import evaluate_forecast
-from .config import PROPHET_PARAM_GRID
-from .utils import save_model, save_params
+from .data_acquisition import load_clean_covid_data, stream_series_cube
+from .data_preprocessing import build_series_cube, split_levels
+from .aggregate_store import ingest_file, latest_batch, read_series, read_parent_of
+from .feature_engineering import long_frame, build_features, regressor_frames
+from .modeling import train_prophet_model, make_future_dataframe, predict, warm_start_init
+from .evaluation import evaluate_batch, leaderboard, write_leaderboard
+from .config import (PROPHET_PARAM_GRID, MODEL_DIR, FORECAST_DB_PATH, TARGETS, FORECAST_PERIODS, FAST_PREDICT,
+                     FEATURE_REGRESSORS, INGEST_CHUNKED, BASELINE_TIER, HIERARCHY_LEVEL,
+                     HIERARCHY_RECONCILE, EVALUATE, EVALUATION_HOLDOUT, RAW_DATA_PATH, AGGREGATE_DB_PATH)
+from .utils import save_model, save_params, load_model, resolve_n_jobs
+from .tuning import load_series_params
+from .fast_predict import extract_params, predict_frame
+from .baseline_models import fit_baselines, save_baseline
+from .hierarchy import Hierarchy, coherent_forecasts
+from .model_registry import model_path_for, baseline_path_for, remove_model
+from .forecast_store import connect, start_run, write_forecast, write_forecasts, read_forecasts, FORECAST_COLUMNS
+from .training_manifest import load_manifest, save_manifest, make_entry, plan_series, SKIP, WARM
+from . import instrumentation
+from .instrumentation import span
+from .logging_config import logger
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
 import os
+import tempfile
+import numpy as np
+import pandas as pd
 
-def run_pipeline():
-    # 1. Load and clean data
-    df = load_covid_data()
-    df = clean_data(df)
-
-    # 2. Preprocess for global, region, and country
-    global_data = preprocess_grouped_data(df)['global']
-    region_data = preprocess_grouped_data(df, 'WHO Region')
-    country_data = preprocess_grouped_data(df, 'Country/Region')
-
-    # 3. Feature engineering
-    for d in [global_data] + list(region_data.values()) + list(country_data.values()):
-        d = add_lag_features(d, ['Confirmed', 'Deaths', 'Recovered', 'Active'])
-        d = add_date_features(d)
-
-    # 4. Modeling and saving for each group/target
-    results = {}
-    for name, data in {'global': global_data, **region_data, **country_data}.items():
-        for target in ['Confirmed', 'Deaths', 'Recovered', 'Active']:
-            df_model = data.reset_index()[['Date', target]].rename(columns={'Date': 'ds', target: 'y'})
-            model = train_prophet_model(df_model)
-            future = make_future_dataframe(model, periods=7)
-            forecast = predict(model, future)
-            # Save model and forecast
-            model_path = os.path.join('..', 'Models', f'{name}_{target}_prophet_model.joblib')
+class StopJobs(Exception):
+    """Raised by a record callback to abandon the remaining jobs of a batch (see _run_jobs)."""
+
+def fit_series(name, target, df_model, periods=FORECAST_PERIODS, params=None,
+               model_dir=MODEL_DIR, warm_start=False, fast_predict=FAST_PREDICT, regressors=None):
+    """
+    Train, forecast and save the model of a single (series, target) pair.
+
+    This is the unit of work handed to pipeline workers, so it only receives the
+    small 'ds'/'y' frame of its own series.
+
+    Args:
+        name (str): Series name ('global', a WHO region or a country).
+        target (str): Target column the series was built from (e.g. 'Confirmed').
+        df_model (pd.DataFrame): DataFrame with columns 'ds' and 'y'.
+        periods (int): Number of days to forecast.
+        params (dict, optional): Prophet model parameters.
+        model_dir (str): Directory the fitted model is saved to.
+        warm_start (bool): Initialize Stan from the previously saved model's fitted parameters.
+        fast_predict (bool): Forecast with the NumPy engine; models it does not support
+            fall back to Prophet.predict.
+        regressors (pd.DataFrame, optional): 'ds' and extra regressor columns covering the
+            history and the forecast window (see feature_engineering.regressor_frames).
+
+    Returns:
+        pd.DataFrame: Forecast with at least 'ds', 'trend', 'yhat', 'yhat_lower' and 'yhat_upper'.
+    """
+    model_path = model_path_for(name, target, model_dir)
+    names = [c for c in regressors.columns if c != 'ds'] if regressors is not None else []
+    if names:
+        horizon = pd.date_range(df_model['ds'].max(), periods=periods + 1, freq='D')[1:]
+        known = regressors.set_index('ds').reindex(horizon)
+        unknown = [c for c in names if known[c].isna().any()]
+        if unknown:
+            raise ValueError(f"Regressors {unknown} are not known {periods} days ahead.")
+        df_model = df_model.merge(regressors, on='ds', how='left').dropna(subset=names)
+    with span('fit_series', rows=len(df_model), series=name, target=target, warm_start=warm_start):
+        init = None
+        if warm_start:
+            try:
+                init = warm_start_init(load_model(model_path))
+            except Exception as e:
+                logger.warning(f"Cannot warm-start {name}_{target}, fitting from scratch: {e}")
+        with span('train', rows=len(df_model)):
+            model = train_prophet_model(df_model, params, init=init, regressors=names)
+        future = make_future_dataframe(model, periods=periods)
+        if names:
+            future = future.merge(regressors, on='ds', how='left')
+        forecast = None
+        with span('predict', rows=len(future)):
+            if fast_predict:
+                try:
+                    forecast = predict_frame(extract_params(model), future['ds'])
+                except ValueError as e:
+                    logger.info(f"Using Prophet.predict for {name}_{target}: {e}")
+            if forecast is None:
+                forecast = predict(model, future)
+        with span('save_model'):
             save_model(model, model_path)
-            # Optionally save forecast as CSV
-            forecast_path = os.path.join('..', 'Data_modified', f'{name}_{target}_weekly_forecast.csv')
-            forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(7).to_csv(forecast_path, index=False)
-            results[f'{name}_{target}'] = forecast
-    # Optionally return results for further use
-    return results
+    return forecast
+
+def _fit_job(*args, **kwargs):
+    """Run fit_series and return (forecast, spans) so workers hand their spans to the parent."""
+    with instrumentation.collect() as recorder:
+        forecast = fit_series(*args, **kwargs)
+    return forecast, recorder.records
+
+def build_tasks(datasets, targets=TARGETS):
+    """
+    Split grouped datasets into independent (name, target, ds/y frame) tasks.
+
+    Args:
+        datasets (dict): Preprocessed DataFrames keyed by series name, indexed by 'Date'.
+        targets (list): Target columns to model.
+
+    Returns:
+        list: Tuples of (name, target, df_model).
+    """
+    tasks = []
+    for name, data in datasets.items():
+        frame = data.reset_index()
+        for target in targets:
+            df_model = frame[['Date', target]].rename(columns={'Date': 'ds', target: 'y'})
+            tasks.append((name, target, df_model))
+    return tasks
+
+def plan_jobs(tasks, manifest=None, force=False, regressors=None, model_dir=MODEL_DIR):
+    """
+    Turn tasks into fitting jobs, leaving out the series the manifest marks unchanged.
+
+    Args:
+        tasks (list): Tuples of (name, target, df_model) as built by build_tasks.
+        manifest (dict, optional): Training manifest as returned by load_manifest.
+        force (bool): Refit every series from scratch, ignoring the manifest plan.
+        regressors (dict, optional): Extra regressor frames keyed by series name, as for run_tasks.
+        model_dir (str): Directory the fitted models are saved to.
+
+    Returns:
+        tuple: (jobs, fingerprints) where jobs are tuples of (key, name, target, df_model,
+            params, warm_start, regressors) and fingerprints map every task key to what
+            its manifest entry is compared on.
+    """
+    jobs, fingerprints = [], {}
+    for name, target, df_model in tasks:
+        key = f'{name}_{target}'
+        params = load_series_params(name, target)
+        series_regressors = None
+        fingerprints[key] = params
+        if regressors is not None and name in regressors:
+            columns = list(dict.fromkeys(n.format(target=target) for n in FEATURE_REGRESSORS))
+            series_regressors = regressors[name][['ds', *columns]]
+            # Changing the regressors must refit the series from scratch
+            fingerprints[key] = {**(params or {}), 'regressors': columns}
+        plan = None if manifest is None or force else plan_series(
+            manifest.get(key), df_model, fingerprints[key], model_path_for(name, target, model_dir))
+        if plan == SKIP:
+            continue
+        jobs.append((key, name, target, df_model, params, plan == WARM, series_regressors))
+    return jobs, fingerprints
+
+def run_tasks(tasks, n_jobs=None, periods=FORECAST_PERIODS, manifest=None, force=False,
+              db_path=FORECAST_DB_PATH, regressors=None, baseline=BASELINE_TIER, model_dir=MODEL_DIR,
+              run_id=None):
+    """
+    Run fit_series over every task, sequentially or on a process pool.
+
+    The last `periods` rows of each forecast are written to the forecast store as one
+    run (a new one unless run_id is given), from this process only. A failing series is logged and recorded; it never
+    aborts the rest of the batch.
+    Tuned parameters saved in Model_parameters/ are used when present. When a training
+    manifest is given, unchanged series are skipped, series that only grew at the tail
+    are warm-started, and the manifest is updated in place for every series that was refit.
+    With the baseline tier, series a batch-fitted baseline forecasts well enough on a
+    holdout skip Prophet and save their baseline state instead (baseline_models.save_baseline).
+    The model type used is recorded in the manifest, and the model a series had saved
+    with the other type earlier is deleted so that it is not served.
+
+    Args:
+        tasks (list): Tuples of (name, target, df_model) as built by build_tasks.
+        n_jobs (int, optional): Worker processes; see resolve_n_jobs. Defaults to config.N_JOBS.
+        periods (int): Number of days to forecast.
+        manifest (dict, optional): Training manifest as returned by load_manifest.
+        force (bool): Refit every series from scratch, ignoring the manifest plan.
+        db_path (str): Path of the forecast store.
+        regressors (dict, optional): Frames keyed by series name holding 'ds' and the
+            config.FEATURE_REGRESSORS columns of every target, used as extra regressors.
+        baseline (bool): Try the baseline tier (baseline_models.py) before Prophet.
+            Series with extra regressors always use Prophet.
+        model_dir (str): Directory the fitted models are saved to.
+        run_id (str, optional): Forecast-store run to write into, from forecast_store.start_run.
+
+    Returns:
+        tuple: (results, failures) dictionaries keyed by '{name}_{target}', holding
+            forecasts and error messages respectively.
+    """
+    n_jobs = resolve_n_jobs(n_jobs)
+    results, failures = {}, {}
+    jobs, fingerprints = plan_jobs(tasks, manifest, force, regressors, model_dir)
+    skipped = len(tasks) - len(jobs)
+    if skipped:
+        logger.info(f"Skipping {skipped} unchanged series.")
+    if not jobs:
+        return results, failures
+
+    conn = connect(db_path)
+    run_id = run_id or start_run(conn, note=f'{len(jobs)} series')
+
+    def record(key, name, target, df_model, params, job_result, model='prophet'):
+        forecast, spans = job_result
+        instrumentation.extend(spans)
+        results[key] = forecast
+        with span('write_forecast', rows=periods, series=name, target=target):
+            write_forecast(conn, run_id, name, target, forecast[FORECAST_COLUMNS].tail(periods))
+        saved = model_path_for(name, target, model_dir) if model == 'prophet' else \
+            baseline_path_for(name, target, model_dir)
+        if remove_model(name, target, model_dir, keep=saved):
+            logger.info(f"Removed the stale models of {key}; it is now forecast by {model}.")
+        if manifest is not None:
+            manifest[key] = make_entry(df_model, fingerprints[key], saved, model)
+
+    try:
+        if baseline:
+            jobs = _run_baselines(jobs, record, periods, model_dir)
+        _run_jobs(jobs, record, failures, n_jobs, periods, model_dir)
+    finally:
+        conn.close()
+    return results, failures
+
+def _run_baselines(jobs, record, periods, model_dir=MODEL_DIR):
+    """
+    Forecast jobs with the baseline tier, passing accepted ones to record; return the jobs left for Prophet.
+
+    The state of every accepted baseline is saved to model_dir before it is recorded.
+    """
+    candidates = {job[0]: job[3] for job in jobs if job[6] is None}
+    with span('baseline_tier', rows=len(candidates)):
+        forecasts, choices, _ = fit_baselines(candidates, periods)
+        for key, name, target, df_model, params, _, _ in jobs:
+            if key in forecasts:
+                model, _, sigma = choices[key]
+                save_baseline(baseline_path_for(name, target, model_dir), model, df_model, sigma)
+                record(key, name, target, df_model, params, (forecasts[key], []), model=model)
+    logger.info(f"Baseline tier forecast {len(forecasts)} of {len(jobs)} series; "
+                f"{len(jobs) - len(forecasts)} left for Prophet.")
+    return [job for job in jobs if job[0] not in forecasts]
+
+def _run_jobs(jobs, record, failures, n_jobs, periods, model_dir=MODEL_DIR):
+    """
+    Fit jobs in-process or on a pool, passing each success to record and collecting failures.
+
+    A StopJobs raised by record cancels the jobs not started yet and propagates.
+    """
+    if n_jobs == 1:
+        for key, name, target, df_model, params, warm, regressors in jobs:
+            try:
+                record(key, name, target, df_model, params,
+                       _fit_job(name, target, df_model, periods, params, model_dir, warm, regressors=regressors))
+            except StopJobs:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to fit {key}: {e}")
+                failures[key] = str(e)
+        return
+
+    logger.info(f"Fitting {len(jobs)} series on {n_jobs} worker processes.")
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = {
+            executor.submit(_fit_job, name, target, df_model, periods, params, model_dir, warm,
+                            regressors=regressors): (key, name, target, df_model, params)
+            for key, name, target, df_model, params, warm, regressors in jobs
+        }
+        for future in as_completed(futures):
+            key, name, target, df_model, params = futures[future]
+            try:
+                record(key, name, target, df_model, params, future.result())
+            except StopJobs:
+                for pending in futures:
+                    pending.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Failed to fit {key}: {e}")
+                failures[key] = str(e)
+
+def evaluate_holdout(tasks, holdout=EVALUATION_HOLDOUT, n_jobs=None, regressors=None,
+                     baseline=BASELINE_TIER) -> pd.DataFrame:
+    """
+    Backtest the fitting path on the last `holdout` days of every series.
+
+    Each task is refit without its last `holdout` days, with the same model
+    selection as a pipeline run, into a scratch directory, so the saved models,
+    forecast store and training manifest are left untouched.
+
+    Args:
+        tasks (list): Tuples of (name, target, df_model) as built by build_tasks.
+        holdout (int): Days held out and forecast.
+        n_jobs (int, optional): Worker processes; see resolve_n_jobs.
+        regressors (dict, optional): Extra regressor frames, as for run_tasks.
+        baseline (bool): Try the baseline tier before Prophet, as for run_tasks.
+
+    Returns:
+        pd.DataFrame: Leaderboard (see evaluation.leaderboard) of the series that could be fitted.
+    """
+    train = [(name, target, df_model.iloc[:-holdout]) for name, target, df_model in tasks
+             if len(df_model) > holdout]
+    manifest = {}
+    with tempfile.TemporaryDirectory(prefix='covid-holdout-') as scratch:
+        results, _ = run_tasks(train, n_jobs=n_jobs, periods=holdout, manifest=manifest, force=True,
+                               db_path=os.path.join(scratch, 'forecasts.sqlite'), regressors=regressors,
+                               baseline=baseline, model_dir=scratch)
+    frames = {(name, target): df_model for name, target, df_model in tasks}
+    keys = [(name, target) for name, target, _ in train if f'{name}_{target}' in results]
+    forecasts = [results[f'{name}_{target}'].tail(holdout) for name, target in keys]
+    history = np.full((len(keys), max((len(frames[k]) - holdout for k in keys), default=0)), np.nan)
+    for i, key in enumerate(keys):
+        y = frames[key]['y'].to_numpy(dtype=float)[:-holdout]
+        history[i, history.shape[1] - len(y):] = y
+    metrics = evaluate_batch(
+        np.array([frames[key]['y'].to_numpy(dtype=float)[-holdout:] for key in keys]).reshape(len(keys), holdout),
+        np.array([f['yhat'].to_numpy() for f in forecasts]).reshape(len(keys), holdout),
+        np.array([f['yhat_lower'].to_numpy() for f in forecasts]).reshape(len(keys), holdout),
+        np.array([f['yhat_upper'].to_numpy() for f in forecasts]).reshape(len(keys), holdout),
+        history)
+    return leaderboard(keys, metrics, [manifest[f'{name}_{target}']['model'] for name, target in keys])
+
+def derive_hierarchy(tasks, results, failures, hierarchy, level, history, reconcile=False,
+                     periods=FORECAST_PERIODS, db_path=FORECAST_DB_PATH, manifest=None,
+                     model_dir=MODEL_DIR, run_id=None) -> dict:
+    """
+    Write the forecasts of the levels that were not fitted, derived from those that were.
+
+    Forecasts of series skipped as unchanged are read back from the store. The
+    derived forecasts (or, with reconcile, every reconciled forecast) are written
+    as one new run, or into run_id. Series that are now derived lose the Prophet models and manifest
+    entries of earlier runs that fitted them, so no stale model is served next to
+    their derived forecast.
+
+    Args:
+        tasks (list): The (name, target, df_model) tasks that were run.
+        results (dict): Forecasts returned by run_tasks.
+        failures (dict): Failures returned by run_tasks.
+        hierarchy (Hierarchy): Country/region structure.
+        level (str): Level the models were fitted at.
+        history (dict): Daily frames keyed by series name, for top-down shares.
+        reconcile (bool): Every level was fitted; reconcile them instead of deriving.
+        periods (int): Number of forecast days.
+        db_path (str): Path of the forecast store.
+        manifest (dict, optional): Training manifest; entries of derived series are removed.
+        model_dir (str): Directory derived series' stale models are removed from.
+        run_id (str, optional): Forecast-store run to write into; a new one by default.
+
+    Returns:
+        dict: The written forecasts, keyed by (series, target).
+    """
+    fitted = {}
+    for name, target, _ in tasks:
+        key = f'{name}_{target}'
+        if key in results:
+            fitted[(name, target)] = results[key][FORECAST_COLUMNS].tail(periods).reset_index(drop=True)
+    skipped = [(name, target) for name, target, _ in tasks
+               if f'{name}_{target}' not in results and f'{name}_{target}' not in failures]
+    for (name, target), frame in read_forecasts(skipped, db_path=db_path).groupby(['series', 'target']):
+        fitted[(name, target)] = frame[FORECAST_COLUMNS].reset_index(drop=True)
+
+    derived = {}
+    for target in dict.fromkeys(target for _, target, _ in tasks):
+        by_series = {name: frame for (name, t), frame in fitted.items() if t == target}
+        coherent = coherent_forecasts(by_series, hierarchy, level, history, target, reconcile_all=reconcile)
+        derived.update({(name, target): frame for name, frame in coherent.items()
+                        if reconcile or (name, target) not in fitted})
+    if derived:
+        write_forecasts(derived, note=f"hierarchy {'reconciled' if reconcile else level}", db_path=db_path,
+                        run_id=run_id)
+    if not reconcile:
+        stale = [(name, target) for name, target in derived if remove_model(name, target, model_dir)]
+        if manifest is not None:
+            for name, target in derived:
+                manifest.pop(f'{name}_{target}', None)
+        if stale:
+            logger.info(f"Removed {len(stale)} stale models of series now derived from the {level} level.")
+    logger.info(f"Derived {len(derived)} forecasts from the {level} level.")
+    return derived
+
+def load_datasets(chunked=INGEST_CHUNKED, from_store=False, names=None, aggregate_db_path=AGGREGATE_DB_PATH):
+    """
+    Load the raw data into the daily frames of every series, plus extra regressors.
+
+    Args:
+        chunked (bool): Stream the CSV in chunks (stream_series_cube) instead of loading it whole.
+        from_store (bool): Read the daily series from the incremental aggregate store
+            (aggregate_store.py) instead of aggregating the CSV.
+        names (list, optional): With from_store, read only these series.
+        aggregate_db_path (str): Path of the aggregate store.
+
+    Returns:
+        tuple: (datasets, parent_of, regressors) where datasets maps every series name
+            (global, WHO regions, countries) to its frame indexed by 'Date', parent_of
+            maps countries to their region, and regressors are the frames for
+            config.FEATURE_REGRESSORS (None when none are configured).
+    """
+    if from_store:
+        # 1-2. Daily totals are kept up to date by aggregate_store.ingest_file
+        with span('read_aggregate_store') as stage:
+            datasets = read_series(names, aggregate_db_path)
+            parent_of = read_parent_of(aggregate_db_path)
+            stage['rows'] = sum(len(frame) for frame in datasets.values())
+    elif chunked:
+        # 1-2. Aggregate the CSV chunk by chunk within the ingestion memory budget
+        with span('stream_series_cube'):
+            cube = stream_series_cube()
+    else:
+        # 1. Load and clean data (served from the columnar cache when the CSV is unchanged)
+        with span('load_clean_covid_data') as stage:
+            df = load_clean_covid_data()
+            stage['rows'] = len(df)
+
+        # 2. Preprocess for global, region, and country in a single aggregation pass
+        with span('preprocess_all_levels', rows=len(df)):
+            cube = build_series_cube(df)
+    if not from_store:
+        global_data, region_data, country_data = split_levels(cube)
+        datasets = {'global': global_data, **region_data, **country_data}
+        parent_of = cube.parent_of
+
+    # 3. Feature engineering: every series in one vectorized pass, extended over the
+    # forecast window so that lagged and calendar regressors are known there
+    regressors = None
+    if FEATURE_REGRESSORS:
+        with span('feature_engineering') as stage:
+            features = build_features(long_frame(datasets, horizon=FORECAST_PERIODS), TARGETS)
+            stage['rows'] = len(features)
+            names = dict.fromkeys(n.format(target=t) for t in TARGETS for n in FEATURE_REGRESSORS)
+            regressors = regressor_frames(features, list(names))
+    return datasets, parent_of, regressors
+
+def load_run_datasets(chunked=INGEST_CHUNKED, delta=None, level=None, aggregate_db_path=AGGREGATE_DB_PATH):
+    """
+    Load the datasets of a pipeline run from its source: the aggregate store once it is seeded, else the CSV.
+
+    A delta is first added to the store, which an empty store is seeded for from
+    config.RAW_DATA_PATH, so the delta does not stand in for the history. Once
+    seeded, the store holds the deltas the CSV lacks, so every run reads it.
+
+    Args:
+        chunked (bool): Stream the CSV in chunks (see load_datasets).
+        delta (str, optional): CSV of new (location, date) rows to ingest first.
+        level (str, optional): Hierarchy level fitted; without one, a delta run reads
+            only the series the delta changed.
+        aggregate_db_path (str): Path of the aggregate store.
+
+    Returns:
+        tuple: (datasets, parent_of, regressors) as returned by load_datasets.
+    """
+    changed = None
+    seeded = latest_batch(aggregate_db_path) > 0
+    if delta:
+        if not seeded:
+            with span('seed_aggregate_store') as stage:
+                stage['rows'] = ingest_file(RAW_DATA_PATH, aggregate_db_path)['rows']
+        with span('ingest_delta') as stage:
+            ingest = ingest_file(delta, aggregate_db_path)
+            stage['rows'] = ingest['rows']
+        changed = [name for names in ingest['changed'].values() for name in names]
+    elif seeded:
+        logger.info("Reading the series from the aggregate store, which holds the deltas added since "
+                    "it was seeded; add new rows with --delta.")
+    return load_datasets(chunked, from_store=bool(delta) or seeded, names=None if level else changed,
+                         aggregate_db_path=aggregate_db_path)
+
+def run_pipeline(n_jobs=None, force=False, chunked=INGEST_CHUNKED, baseline=BASELINE_TIER,
+                 level=HIERARCHY_LEVEL, reconcile=HIERARCHY_RECONCILE, evaluate=EVALUATE, delta=None):
+    """
+    Run the end-to-end pipeline: load, preprocess, fit, forecast and save.
+
+    Only series whose input changed since the last run (per the training manifest
+    in Models/) are refit.
+
+    Args:
+        n_jobs (int, optional): Worker processes used for fitting. Defaults to config.N_JOBS.
+        force (bool): Refit every series from scratch.
+        chunked (bool): Stream the CSV in chunks straight into the series totals
+            (stream_series_cube) instead of loading and cleaning it whole.
+        baseline (bool): Forecast series with the baseline tier where it is accurate
+            enough, fitting Prophet only for the rest.
+        level (str, optional): Fit only the series of this level ('country', 'region'
+            or 'global') and derive the other levels from their forecasts (hierarchy.py).
+            None fits every level independently.
+        reconcile (bool): With a level set, fit every level and reconcile the
+            forecasts so that they add up instead.
+        evaluate (bool): Also backtest the fitted series on their last EVALUATION_HOLDOUT
+            days and store the accuracy leaderboard under this run's id (evaluation.py).
+            The run id is the forecast-store run holding this run's forecasts, fitted and
+            derived, so a leaderboard can be matched with the forecasts of its run.
+        delta (str, optional): CSV of new (location, date) rows. It is added to the
+            incremental aggregate store, the series are read from there, and only the
+            series it changed are refit (all series of the fitted level in hierarchical mode).
+            An empty store is first seeded from config.RAW_DATA_PATH. Once seeded, the store
+            is the source of every run, with or without a delta (see load_run_datasets).
+
+    Returns:
+        tuple: (results, failures) as returned by run_tasks.
+
+    Raises:
+        ValueError: If reconcile is set without a level.
+    """
+    if reconcile and not level:
+        raise ValueError("reconcile needs a hierarchy level.")
+    with instrumentation.collect() as recorder:
+        datasets, parent_of, regressors = load_run_datasets(chunked, delta, level)
+
+        # 4. Modeling and saving for each group/target; in hierarchical mode only one
+        # level is fitted unless every level is reconciled
+        hierarchy = Hierarchy(parent_of) if level else None
+        fit_names = hierarchy.names(level) if level and not reconcile else datasets
+        tasks = build_tasks({name: datasets[name] for name in fit_names})
+        manifest = load_manifest()
+        # One forecast-store run holds every forecast of this pipeline run
+        conn = connect()
+        try:
+            run_id = start_run(conn, note=f'pipeline: {len(tasks)} series')
+        finally:
+            conn.close()
+        with span('run_tasks', rows=len(tasks)):
+            results, failures = run_tasks(tasks, n_jobs=n_jobs, manifest=manifest, force=force,
+                                          regressors=regressors, baseline=baseline, run_id=run_id)
+        if level:
+            with span('derive_hierarchy'):
+                derive_hierarchy(tasks, results, failures, hierarchy, level, datasets, reconcile,
+                                 manifest=manifest, run_id=run_id)
+        with span('save_manifest'):
+            save_manifest(manifest)
+        if evaluate:
+            with span('evaluate_holdout', rows=len(tasks)):
+                board = evaluate_holdout(tasks, n_jobs=n_jobs, regressors=regressors, baseline=baseline)
+                write_leaderboard(board, run_id)
+            logger.info(f"Holdout leaderboard {run_id}: median sMAPE {board['smape'].median():.2f}%, "
+                        f"median MASE {board['mase'].median():.2f}, coverage {board['coverage'].mean():.0%}.")
+    if failures:
+        logger.warning(f"{len(failures)} of {len(tasks)} series failed: {sorted(failures)}")
+
+    # 5. Metrics: JSON lines and a Prometheus snapshot in logs/, plus a summary
+    instrumentation.write_jsonl(recorder.records, run_id)
+    instrumentation.write_snapshot(recorder.records)
+    logger.info(instrumentation.summarize(recorder.records))
+    return results, failures
 
 if __name__ == "__main__":
-    run_pipeline()
+    parser = argparse.ArgumentParser(description="Run the COVID-19 forecasting pipeline.")
+    parser.add_argument('--n-jobs', type=int, default=None,
+                        help="Worker processes for model fitting (-1 for all cores).")
+    parser.add_argument('--force', action='store_true',
+                        help="Refit every series from scratch, ignoring the training manifest.")
+    parser.add_argument('--chunked', action='store_true', default=INGEST_CHUNKED,
+                        help="Stream the CSV in chunks for datasets larger than memory.")
+    parser.add_argument('--no-baseline', dest='baseline', action='store_false', default=BASELINE_TIER,
+                        help="Fit Prophet for every series instead of trying the baseline tier first.")
+    parser.add_argument('--level', choices=['country', 'region', 'global'], default=HIERARCHY_LEVEL,
+                        help="Fit only this level and derive the others from its forecasts.")
+    parser.add_argument('--reconcile', action='store_true', default=HIERARCHY_RECONCILE,
+                        help="With --level, fit every level and reconcile the forecasts instead.")
+    parser.add_argument('--evaluate', action='store_true', default=EVALUATE,
+                        help="Backtest the fitted series on a holdout and store the accuracy leaderboard.")
+    parser.add_argument('--delta', metavar='CSV',
+                        help="Add a CSV of new rows to the aggregate store and refit only the changed series.")
+    args = parser.parse_args()
+    if args.reconcile and not args.level:
+        parser.error("--reconcile requires --level")
+    run_pipeline(n_jobs=args.n_jobs, force=args.force, chunked=args.chunked, baseline=args.baseline,
+                 level=args.level, reconcile=args.reconcile, evaluate=args.evaluate, delta=args.delta)
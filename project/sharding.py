@@ -0,0 +1,487 @@
+"""
+sharding.py
+Sharded, resumable pipeline runs across processes or machines.
+
+A sharded run lives in a directory that every node can see (SHARD_DIR on a shared
+filesystem). `plan` splits the fitting jobs of a pipeline run into shards of about
+equal rows and records them in a SQLite job table, next to the input of every
+shard. Any number of `work` processes, on any node, then claim shards one at a
+time; no broker is involved, the job table's locks coordinate them.
+
+Every (series, target) is checkpointed in its own transaction as soon as it is
+fitted: its forecast and manifest entry go into the job table, its model into the
+run's staging directory. A worker that dies loses at most the series it was
+fitting; its shard is claimed again once its lease expires and resumes with the
+series not checkpointed yet. `merge` finally publishes the models to Models/, the
+forecasts to the forecast store in Data_modified/ (as one run) and the manifest.
+
+Example:
+    python -m project.sharding plan --shards 32
+    python -m project.sharding work --n-jobs -1     # on as many nodes as wanted
+    python -m project.sharding merge
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import pandas as pd
+from .config import (SHARD_DIR, SHARD_COUNT, SHARD_LEASE_SECONDS, MODEL_DIR, MANIFEST_PATH, FORECAST_DB_PATH,
+                     FORECAST_PERIODS, INGEST_CHUNKED, BASELINE_TIER, HIERARCHY_LEVEL, HIERARCHY_RECONCILE,
+                     HIERARCHY_SHARE_DAYS, TARGETS, AGGREGATE_DB_PATH)
+from .forecast_store import write_forecasts, FORECAST_COLUMNS
+from .hierarchy import Hierarchy
+from .model_registry import model_path_for, baseline_path_for, remove_model
+from .training_manifest import load_manifest, save_manifest, make_entry
+from .pipeline import load_run_datasets, build_tasks, plan_jobs, derive_hierarchy, StopJobs, _run_baselines, _run_jobs
+from .utils import resolve_n_jobs
+from . import instrumentation
+from .instrumentation import span
+from .logging_config import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS shards (
+    shard INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    target TEXT NOT NULL,
+    shard INTEGER,
+    status TEXT NOT NULL,
+    model TEXT,
+    forecast TEXT,
+    entry TEXT,
+    error TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_shard ON jobs (shard, status);
+"""
+
+# Shard states; jobs are also SKIPPED (unchanged since the last run) or FAILED
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+def connect(run_dir: str = SHARD_DIR) -> sqlite3.Connection:
+    """
+    Open the job table of a sharded run, creating it if needed.
+
+    The connection is in autocommit mode; writes go through _transaction, which
+    takes the database lock up front. The default rollback journal is kept, as WAL
+    does not work on network filesystems.
+    """
+    os.makedirs(run_dir, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(run_dir, 'jobs.sqlite'), timeout=60, isolation_level=None)
+    conn.executescript(SCHEMA)
+    return conn
+
+@contextmanager
+def _transaction(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def read_meta(conn) -> dict:
+    """Return the options a run was planned with (empty if it was never planned)."""
+    return {name: json.loads(value) for name, value in conn.execute("SELECT name, value FROM meta")}
+
+def partition(sizes: list, n_shards: int) -> list:
+    """
+    Assign items to shards so that the shards hold about the same total size.
+
+    Largest items first, each to the currently smallest shard.
+
+    Args:
+        sizes (list): Size of every item (e.g. rows of a series).
+        n_shards (int): Number of shards.
+
+    Returns:
+        list: Shard number of every item.
+    """
+    loads = [0] * max(1, n_shards)
+    shards = [0] * len(sizes)
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        shard = loads.index(min(loads))
+        shards[i] = shard
+        loads[shard] += sizes[i]
+    return shards
+
+def _input_path(run_dir, shard):
+    return os.path.join(run_dir, 'inputs', f'shard-{shard:05d}.pkl')
+
+def create_run(run_dir: str, tasks: list, jobs: list, fingerprints: dict, n_shards: int = SHARD_COUNT,
+               options: dict = None, history: dict = None, model_dir: str = MODEL_DIR):
+    """
+    Record a planned run: shard inputs, the job table and the run options.
+
+    Shard inputs are written first (each atomically); the job table and options are
+    then written in one transaction, so a run either exists completely or not at all.
+
+    Args:
+        run_dir (str): Directory of the run.
+        tasks (list): Every (name, target, df_model) task of the run, skipped ones included.
+        jobs (list): Jobs to fit, as returned by pipeline.plan_jobs.
+        fingerprints (dict): Manifest fingerprints of the jobs, as returned by plan_jobs.
+        n_shards (int): Number of shards; fewer are used when there are fewer jobs.
+        options (dict, optional): JSON-serializable run options ('periods', 'baseline',
+            'level', 'reconcile', 'parent_of') read back by work and merge.
+        history (dict, optional): Recent daily frames keyed by series name, for
+            top-down hierarchy shares at merge time.
+        model_dir (str): Directory of the published models, copied to the staging
+            directory for warm-started jobs.
+
+    Returns:
+        str: The run id.
+    """
+    conn = connect(run_dir)
+    try:
+        if read_meta(conn):
+            raise FileExistsError(f"A sharded run is already planned in {run_dir}.")
+        staging = os.path.join(run_dir, 'models')
+        os.makedirs(os.path.join(run_dir, 'inputs'), exist_ok=True)
+        os.makedirs(staging, exist_ok=True)
+        n_shards = max(1, min(n_shards, len(jobs)))
+        assignment = partition([len(job[3]) for job in jobs], n_shards)
+        for shard in range(n_shards):
+            shard_jobs = [job for job, s in zip(jobs, assignment) if s == shard]
+            path = _input_path(run_dir, shard)
+            pd.to_pickle({'jobs': shard_jobs, 'fingerprints': {job[0]: fingerprints[job[0]] for job in shard_jobs}},
+                         f'{path}.tmp')
+            os.replace(f'{path}.tmp', path)
+        # Warm starts read the previous model from the staging directory the shard fits into
+        for key, name, target, *_, warm, _ in jobs:
+            published = model_path_for(name, target, model_dir)
+            if warm and os.path.exists(published):
+                shutil.copy2(published, model_path_for(name, target, staging))
+        if history is not None:
+            pd.to_pickle(history, os.path.join(run_dir, 'history.pkl'))
+
+        run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        shard_of = {job[0]: s for job, s in zip(jobs, assignment)}
+        rows = [0] * n_shards
+        for job, s in zip(jobs, assignment):
+            rows[s] += len(job[3])
+        now = _now()
+        with _transaction(conn):
+            conn.executemany("INSERT INTO shards (shard, status, rows) VALUES (?, ?, ?)",
+                             [(shard, PENDING, rows[shard]) for shard in range(n_shards)])
+            conn.executemany(
+                "INSERT INTO jobs (key, name, target, shard, status, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(f'{name}_{target}', name, target, shard_of.get(f'{name}_{target}'),
+                  PENDING if f'{name}_{target}' in shard_of else SKIPPED, now) for name, target, _ in tasks])
+            conn.executemany("INSERT INTO meta (name, value) VALUES (?, ?)",
+                             [(name, json.dumps(value)) for name, value in
+                              {**(options or {}), 'run_id': run_id, 'n_shards': n_shards,
+                               'planned_at': now}.items()])
+    finally:
+        conn.close()
+    logger.info(f"Planned sharded run {run_id}: {len(jobs)} of {len(tasks)} series in {n_shards} shards.")
+    return run_id
+
+def plan(run_dir: str = SHARD_DIR, n_shards: int = SHARD_COUNT, force=False, chunked=INGEST_CHUNKED,
+         baseline=BASELINE_TIER, level=HIERARCHY_LEVEL, reconcile=HIERARCHY_RECONCILE, fresh=False,
+         aggregate_db_path=AGGREGATE_DB_PATH):
+    """
+    Plan a sharded pipeline run, or keep the unfinished run already planned in run_dir.
+
+    Loads the data and selects the series to fit exactly like pipeline.run_pipeline,
+    from the aggregate store once it is seeded.
+
+    Args:
+        run_dir (str): Directory of the run, on a filesystem shared by every worker.
+        n_shards (int): Number of shards; use several per worker so faster nodes take more.
+        force (bool): Refit every series, ignoring the training manifest.
+        chunked (bool): Stream the CSV in chunks (see run_pipeline).
+        baseline (bool): Try the baseline tier before Prophet (see run_pipeline).
+        level (str, optional): Fit only this hierarchy level and derive the others at merge.
+        reconcile (bool): Fit every level and reconcile them at merge.
+        fresh (bool): Discard an unfinished run in run_dir instead of resuming it.
+        aggregate_db_path (str): Path of the aggregate store (see pipeline.load_run_datasets).
+
+    Returns:
+        str: Id of the planned (or resumed) run.
+
+    Raises:
+        ValueError: If reconcile is set without a level.
+    """
+    if reconcile and not level:
+        raise ValueError("reconcile needs a hierarchy level.")
+    conn = connect(run_dir)
+    try:
+        meta = read_meta(conn)
+    finally:
+        conn.close()
+    if meta and 'merged_at' not in meta and not fresh:
+        logger.info(f"Resuming sharded run {meta['run_id']} in {run_dir}.")
+        return meta['run_id']
+    if meta:
+        clear_run(run_dir)
+
+    datasets, parent_of, regressors = load_run_datasets(chunked, aggregate_db_path=aggregate_db_path)
+    hierarchy = Hierarchy(parent_of) if level else None
+    fit_names = hierarchy.names(level) if level and not reconcile else datasets
+    tasks = build_tasks({name: datasets[name] for name in fit_names})
+    jobs, fingerprints = plan_jobs(tasks, load_manifest(), force, regressors)
+    history = {name: data[TARGETS].tail(HIERARCHY_SHARE_DAYS) for name, data in datasets.items()} if level else None
+    options = {'periods': FORECAST_PERIODS, 'baseline': baseline, 'level': level, 'reconcile': reconcile,
+               'parent_of': parent_of if level else None}
+    return create_run(run_dir, tasks, jobs, fingerprints, n_shards, options, history)
+
+def clear_run(run_dir: str = SHARD_DIR):
+    """Delete the job table, shard inputs and staged models of a run."""
+    for name in ('jobs.sqlite', 'jobs.sqlite-journal', 'history.pkl'):
+        if os.path.exists(os.path.join(run_dir, name)):
+            os.remove(os.path.join(run_dir, name))
+    for name in ('inputs', 'models'):
+        shutil.rmtree(os.path.join(run_dir, name), ignore_errors=True)
+
+def claim_shard(conn, worker: str, lease_seconds: float = SHARD_LEASE_SECONDS):
+    """
+    Atomically claim a pending shard, or one whose worker's lease has expired.
+
+    Returns:
+        int or None: The claimed shard, or None if none is left.
+    """
+    now = time.time()
+    with _transaction(conn):
+        row = conn.execute("SELECT shard FROM shards WHERE status = ? OR (status = ? AND lease_until < ?) "
+                           "ORDER BY shard LIMIT 1", (PENDING, RUNNING, now)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE shards SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1 "
+                     "WHERE shard = ?", (RUNNING, worker, now + lease_seconds, row[0]))
+    return row[0]
+
+def _dump_forecast(frame) -> str:
+    return json.dumps({'ds': frame['ds'].dt.strftime('%Y-%m-%d').tolist(),
+                       **{c: frame[c].astype(float).tolist() for c in FORECAST_COLUMNS[1:]}})
+
+def _load_forecast(text) -> pd.DataFrame:
+    frame = pd.DataFrame(json.loads(text))
+    frame['ds'] = pd.to_datetime(frame['ds'])
+    return frame
+
+def run_shard(conn, run_dir: str, shard: int, worker: str, n_jobs=1, lease_seconds: float = SHARD_LEASE_SECONDS):
+    """
+    Fit the series of a claimed shard that are not checkpointed yet.
+
+    Every fitted series is checkpointed in one transaction, which also renews the
+    worker's lease; failures are recorded per series. The shard is then marked done.
+    A worker that finds the shard taken over by another (its lease expired) checkpoints
+    nothing more and stops, leaving the shard to its new owner.
+
+    Returns:
+        int: Number of series checkpointed.
+    """
+    meta = read_meta(conn)
+    periods = meta['periods']
+    staging = os.path.join(run_dir, 'models')
+    shard_input = pd.read_pickle(_input_path(run_dir, shard))
+    done = {key for (key,) in conn.execute("SELECT key FROM jobs WHERE shard = ? AND status = ?", (shard, DONE))}
+    jobs = [job for job in shard_input['jobs'] if job[0] not in done]
+    fingerprints = shard_input['fingerprints']
+    checkpointed = []
+
+    def record(key, name, target, df_model, params, job_result, model='prophet'):
+        forecast, spans = job_result
+        instrumentation.extend(spans)
+        saved = model_path_for(name, target, staging) if model == 'prophet' else \
+            baseline_path_for(name, target, staging)
+        entry = make_entry(df_model, fingerprints[key], saved, model)
+        with _transaction(conn):
+            renewed = conn.execute("UPDATE shards SET lease_until = ? "
+                                   "WHERE shard = ? AND worker = ? AND status = ?",
+                                   (time.time() + lease_seconds, shard, worker, RUNNING))
+            if renewed.rowcount == 0:
+                raise StopJobs(f"shard {shard} was taken over by another worker")
+            conn.execute("UPDATE jobs SET status = ?, model = ?, forecast = ?, entry = ?, error = NULL, "
+                         "updated_at = ? WHERE key = ?",
+                         (DONE, model, _dump_forecast(forecast[FORECAST_COLUMNS].tail(periods)),
+                          json.dumps(entry), _now(), key))
+        checkpointed.append(key)
+
+    failures = {}
+    try:
+        with span('shard', rows=sum(len(job[3]) for job in jobs), shard=shard, worker=worker):
+            if meta['baseline']:
+                jobs = _run_baselines(jobs, record, periods, staging)
+            _run_jobs(jobs, record, failures, n_jobs, periods, staging)
+    except StopJobs as e:
+        logger.warning(f"{worker} stops: {e}; {len(checkpointed)} series were checkpointed before.")
+        return len(checkpointed)
+    with _transaction(conn):
+        finished = conn.execute("UPDATE shards SET status = ?, lease_until = NULL "
+                                "WHERE shard = ? AND worker = ?", (DONE, shard, worker))
+        if finished.rowcount == 0:
+            logger.warning(f"{worker} lost shard {shard} to another worker before finishing it.")
+            return len(checkpointed)
+        conn.executemany("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE key = ?",
+                         [(FAILED, error, _now(), key) for key, error in failures.items()])
+    logger.info(f"Shard {shard} done by {worker}: {len(checkpointed)} series checkpointed, "
+                f"{len(failures)} failed, {len(done)} already done.")
+    return len(checkpointed)
+
+def work(run_dir: str = SHARD_DIR, n_jobs=None, worker: str = None, max_shards: int = None,
+         lease_seconds: float = SHARD_LEASE_SECONDS) -> int:
+    """
+    Claim and fit shards of a planned run until none is left.
+
+    Args:
+        run_dir (str): Directory of the run.
+        n_jobs (int, optional): Worker processes used within each shard; see resolve_n_jobs.
+        worker (str, optional): Name of this worker; defaults to 'host:pid'.
+        max_shards (int, optional): Stop after this many shards.
+        lease_seconds (float): Time without a checkpoint after which another worker may
+            take over a shard.
+
+    Returns:
+        int: Number of series this worker checkpointed.
+    """
+    worker = worker or f'{socket.gethostname()}:{os.getpid()}'
+    n_jobs = resolve_n_jobs(n_jobs)
+    conn = connect(run_dir)
+    total, shards = 0, 0
+    try:
+        if not read_meta(conn):
+            raise FileNotFoundError(f"No sharded run is planned in {run_dir}.")
+        while max_shards is None or shards < max_shards:
+            shard = claim_shard(conn, worker, lease_seconds)
+            if shard is None:
+                break
+            total += run_shard(conn, run_dir, shard, worker, n_jobs, lease_seconds)
+            shards += 1
+    finally:
+        conn.close()
+    return total
+
+def status(run_dir: str = SHARD_DIR) -> dict:
+    """Return the run options and counts of shards and series by state."""
+    conn = connect(run_dir)
+    try:
+        return {
+            'meta': {k: v for k, v in read_meta(conn).items() if k != 'parent_of'},
+            'shards': dict(conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall()),
+            'series': dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()),
+        }
+    finally:
+        conn.close()
+
+def merge(run_dir: str = SHARD_DIR, model_dir: str = MODEL_DIR, db_path: str = FORECAST_DB_PATH,
+          manifest_path: str = MANIFEST_PATH) -> dict:
+    """
+    Publish a finished run: models, forecasts (one store run) and manifest entries.
+
+    Merging again after an interrupted merge is safe; a merged run is not published twice.
+
+    Args:
+        run_dir (str): Directory of the run.
+        model_dir (str): Directory the models are published to.
+        db_path (str): Path of the forecast store.
+        manifest_path (str): Path of the training manifest.
+
+    Returns:
+        dict: The published forecasts, keyed by (series, target).
+    """
+    conn = connect(run_dir)
+    try:
+        meta = read_meta(conn)
+        if not meta:
+            raise FileNotFoundError(f"No sharded run is planned in {run_dir}.")
+        if 'merged_at' in meta:
+            logger.info(f"Sharded run {meta['run_id']} was already merged at {meta['merged_at']}.")
+            return {}
+        unfinished = conn.execute("SELECT COUNT(*) FROM shards WHERE status != ?", (DONE,)).fetchone()[0]
+        if unfinished:
+            raise RuntimeError(f"{unfinished} shards of run {meta['run_id']} are not finished; "
+                               "start more workers before merging.")
+        rows = conn.execute("SELECT key, name, target, status, model, forecast, entry, error FROM jobs").fetchall()
+
+        staging = os.path.join(run_dir, 'models')
+        os.makedirs(model_dir, exist_ok=True)
+        manifest = load_manifest(manifest_path)
+        frames, results, failures = {}, {}, {}
+        for key, name, target, state, model, forecast, entry, error in rows:
+            if state == FAILED:
+                failures[key] = error
+            if state != DONE:
+                continue
+            frames[(name, target)] = results[key] = _load_forecast(forecast)
+            entry = json.loads(entry)
+            staged = os.path.join(staging, entry['model_file'])
+            published = os.path.join(model_dir, entry['model_file'])
+            # Missing when an interrupted merge already moved it
+            if os.path.exists(staged):
+                shutil.move(staged, published)
+            # The model replaces any of the other type published for the series earlier
+            remove_model(name, target, model_dir, keep=published)
+            manifest[key] = entry
+        with span('merge_shards', rows=len(frames)):
+            if frames:
+                write_forecasts(frames, note=f"sharded run {meta['run_id']}", db_path=db_path)
+            if meta.get('level'):
+                history_path = os.path.join(run_dir, 'history.pkl')
+                history = pd.read_pickle(history_path) if os.path.exists(history_path) else {}
+                tasks = [(name, target, None) for _, name, target, *_ in rows]
+                derive_hierarchy(tasks, results, failures, Hierarchy(meta['parent_of']), meta['level'],
+                                 history, meta['reconcile'], meta['periods'], db_path, manifest, model_dir)
+            save_manifest(manifest, manifest_path)
+        with _transaction(conn):
+            conn.execute("INSERT INTO meta (name, value) VALUES ('merged_at', ?)", (json.dumps(_now()),))
+    finally:
+        conn.close()
+    if failures:
+        logger.warning(f"{len(failures)} series of run {meta['run_id']} failed: {sorted(failures)}")
+    logger.info(f"Merged sharded run {meta['run_id']}: published {len(frames)} forecasts.")
+    return frames
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipeline as shards claimed by any number of workers.")
+    parser.add_argument('command', choices=['plan', 'work', 'merge', 'status', 'run'],
+                        help="'run' plans (or resumes), works and merges on this node alone.")
+    parser.add_argument('--run-dir', default=SHARD_DIR, help="Run directory, shared by every worker.")
+    parser.add_argument('--shards', type=int, default=SHARD_COUNT)
+    parser.add_argument('--n-jobs', type=int, default=None, help="Worker processes per shard (-1 for all cores).")
+    parser.add_argument('--force', action='store_true', help="Refit every series, ignoring the training manifest.")
+    parser.add_argument('--fresh', action='store_true', help="Discard an unfinished run instead of resuming it.")
+    parser.add_argument('--chunked', action='store_true', default=INGEST_CHUNKED)
+    parser.add_argument('--no-baseline', dest='baseline', action='store_false', default=BASELINE_TIER)
+    parser.add_argument('--level', choices=['country', 'region', 'global'], default=HIERARCHY_LEVEL)
+    parser.add_argument('--reconcile', action='store_true', default=HIERARCHY_RECONCILE)
+    args = parser.parse_args()
+    if args.reconcile and not args.level:
+        parser.error("--reconcile requires --level")
+    if args.command == 'status':
+        print(json.dumps(status(args.run_dir), indent=2))
+    else:
+        with instrumentation.collect() as recorder:
+            if args.command in ('plan', 'run'):
+                plan(args.run_dir, args.shards, args.force, args.chunked, args.baseline, args.level,
+                     args.reconcile, args.fresh)
+            if args.command in ('work', 'run'):
+                work(args.run_dir, args.n_jobs)
+            if args.command in ('merge', 'run'):
+                merge(args.run_dir)
+        instrumentation.write_jsonl(recorder.records, datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f'))
@@ -0,0 +1,143 @@
+"""
+startup.py
+Cold-start tooling: an import-time report and background prewarming.
+
+import_report imports modules in a fresh interpreter with `python -X importtime`
+and attributes the time to the top-level packages loaded, which shows where the
+startup of the dashboard or the pipeline goes. start_prewarm runs warm-up steps
+(e.g. loading the forecast index and hot models) on a daemon thread, so a server
+pays for them after its first response instead of before it.
+
+Example: python -m project.startup project.dashboard_data project.chatbot_gemini
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import pandas as pd
+from .logging_config import logger
+
+# Modules the dashboard imports on start and on its first page
+STARTUP_MODULES = ['project.dashboard_data', 'project.model_registry', 'project.visualization',
+                   'project.chatbot_gemini', 'project.pipeline']
+
+def parse_importtime(text: str) -> list:
+    """
+    Parse the stderr of `python -X importtime`.
+
+    Returns:
+        list: (module, self_us, cumulative_us) for every imported module, in import order.
+    """
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+def import_report(modules=STARTUP_MODULES, python: str = sys.executable) -> pd.DataFrame:
+    """
+    Measure how long importing each module takes from a cold interpreter.
+
+    Each module is imported in its own fresh process, so modules it shares with
+    the others are counted for each of them. Modules a bare interpreter loads
+    anyway (site, encodings, ...) are not counted.
+
+    Args:
+        modules (list): Dotted module names.
+        python (str): Interpreter to run.
+
+    Returns:
+        pd.DataFrame: Columns 'module', 'package' (top-level package loaded while importing
+            it), 'ms' (that package's own import time) and 'share' (of the module's total),
+            largest first per module. Modules that fail to import are logged and left out.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def importtime(code):
+        return subprocess.run([python, '-X', 'importtime', '-c', code], cwd=root, capture_output=True, text=True)
+
+    # Modules every interpreter loads before running any code
+    interpreter = {name for name, _, _ in parse_importtime(importtime('pass').stderr)}
+    frames = []
+    for module in modules:
+        proc = importtime(f'import {module}')
+        if proc.returncode != 0:
+            logger.warning(f"Cannot import {module}: {proc.stderr.strip().splitlines()[-1:]}")
+            continue
+        rows = pd.DataFrame([row for row in parse_importtime(proc.stderr) if row[0] not in interpreter],
+                            columns=['name', 'self_us', 'cumulative_us'])
+        packages = rows.assign(package=rows['name'].str.split('.').str[0]).groupby('package')['self_us'].sum()
+        frame = (packages / 1000).rename('ms').reset_index()
+        frame['share'] = frame['ms'] / frame['ms'].sum()
+        frames.append(frame.assign(module=module).sort_values('ms', ascending=False))
+    if not frames:
+        return pd.DataFrame(columns=['module', 'package', 'ms', 'share'])
+    return pd.concat(frames, ignore_index=True)[['module', 'package', 'ms', 'share']]
+
+def start_prewarm(steps, delay: float = 0.0, before_start=None):
+    """
+    Run warm-up steps one after the other on a background daemon thread.
+
+    A failing step is logged and does not stop the others.
+
+    Args:
+        steps (list): (name, callable) pairs.
+        delay (float): Seconds to wait before the first step.
+        before_start (callable, optional): Called with the thread before it starts, e.g.
+            to attach a framework context to it.
+
+    Returns:
+        tuple: (thread, timings) where timings maps each finished step to its seconds,
+            or to the exception it raised.
+    """
+    timings = {}
+
+    def run():
+        time.sleep(delay)
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                step()
+                timings[name] = time.perf_counter() - start
+                logger.info(f"Prewarmed {name} in {timings[name]:.2f}s.")
+            except Exception as e:
+                timings[name] = e
+                logger.warning(f"Prewarming {name} failed: {e}")
+
+    thread = threading.Thread(target=run, name='prewarm', daemon=True)
+    if before_start is not None:
+        before_start(thread)
+    thread.start()
+    return thread, timings
+
+def prewarm_models(registry, series: list) -> list:
+    """
+    Load the saved models of the given series into a model registry.
+
+    At most registry.max_models are loaded, so prewarming never evicts its own models.
+
+    Returns:
+        list: The (series, target) pairs loaded.
+    """
+    keys = [key for key in registry.keys() if key[0] in series][:registry.max_models]
+    for name, target in keys:
+        registry.get(name, target)
+    return keys
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report where module import (cold start) time goes.")
+    parser.add_argument('modules', nargs='*', default=STARTUP_MODULES)
+    parser.add_argument('--top', type=int, default=8, help="Packages shown per module.")
+    args = parser.parse_args()
+    report = import_report(args.modules)
+    for module, frame in report.groupby('module', sort=False):
+        print(f"{module}: {frame['ms'].sum():.0f} ms")
+        print(frame.head(args.top)[['package', 'ms', 'share']].to_string(
+            index=False, formatters={'ms': '{:.1f}'.format, 'share': '{:.0%}'.format}))
+        print()
@@ -1,12 +1,16 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import os
 from datetime import datetime
-import joblib
 import json
 from logging_config import logger
 import dotenv
+from project.forecast_store import ensure_store
+from project.dashboard_data import load_forecast_index, store_version, path_version, paginate
+from project.config import DASHBOARD_PAGE_SIZE, DASHBOARD_GRID_COLUMNS, DASHBOARD_PREWARM, DASHBOARD_PREWARM_SERIES
+from project.visualization import small_multiples
+from project.startup import start_prewarm, prewarm_models
+from project.model_registry import default_registry, parse_model_name
 
 from pathlib import Path
 
@@ -33,16 +37,21 @@ def about_section():
     st.markdown(get_readme_content())
 
 # --- Helper Functions ---
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _cached_forecast_index(version):
+    index = load_forecast_index()
+    logger.info(f"Loaded forecast index for store version {version}")
+    return index
+
+def forecast_index():
+    # Shared across sessions; rebuilt only when the pipeline has written to the store
+    return _cached_forecast_index(store_version())
+
 def get_available_countries():
     try:
-        files = os.listdir(DATA_DIR)
-        countries = set()
-        for f in files:
-            if '_' in f:
-                country = f.split('_')[0]
-                countries.add(country)
+        countries = forecast_index().series()
         logger.info(f"Loaded countries: {countries}")
-        return sorted(list(countries))
+        return countries
     except Exception as e:
         logger.error(f"Error loading countries: {e}")
         st.error("Failed to load available countries. Please check your data directory.")
@@ -50,28 +59,22 @@ def get_available_countries():
 
 def get_available_types(country):
     try:
-        files = os.listdir(DATA_DIR)
-        types = set()
-        for f in files:
-            if f.startswith(country + '_') and f.endswith('_weekly_forecast.csv'):
-                t = f.split('_')[1]
-                types.add(t)
+        types = forecast_index().targets(country)
         logger.info(f"Loaded types for {country}: {types}")
-        return sorted(list(types))
+        return types
     except Exception as e:
         logger.error(f"Error loading types for {country}: {e}")
         st.error(f"Failed to load available types for {country}.")
         return []
 
 def load_forecast(country, case_type):
-    path = os.path.join(DATA_DIR, f'{country}_{case_type}_weekly_forecast.csv')
     try:
-        if os.path.exists(path):
-            df = pd.read_csv(path)
+        df = forecast_index().forecast(country, case_type)
+        if df is not None:
             logger.info(f"Loaded forecast for {country} - {case_type}")
             return df
         else:
-            logger.warning(f"Forecast file not found: {path}")
+            logger.warning(f"Forecast not found in store: {country} - {case_type}")
             return None
     except Exception as e:
         logger.error(f"Error loading forecast for {country} - {case_type}: {e}")
@@ -92,6 +95,8 @@ if __name__ == "__main__":
     main()
 
 def plot_forecast_graph(df, country, case_type, key=None):
+    # plotly is only loaded by the pages that draw charts
+    import plotly.express as px
     try:
         fig = px.line(df, x='ds', y=['yhat', 'yhat_lower', 'yhat_upper'],
                       labels={'ds': 'Date', 'value': 'Predicted'},
@@ -102,28 +107,64 @@ def plot_forecast_graph(df, country, case_type, key=None):
         logger.error(f"Error plotting forecast graph for {country} - {case_type}: {e}")
         st.error(f"Failed to plot forecast for {country} - {case_type}.")
 
-# Helper to get available models
+def graph_series(case_type):
+    index = forecast_index()
+    return [c for c in index.series() if c != 'global' and case_type in index.targets(c)]
+
+# One figure per (store version, case type, page), shared across sessions as serialized JSON
+@st.cache_data(max_entries=64, show_spinner=False)
+def _small_multiples_json(version, case_type, graph_page):
+    names, pages_total = paginate(graph_series(case_type), graph_page, DASHBOARD_PAGE_SIZE)
+    if not names:
+        return None
+    fig = small_multiples(forecast_index().frame(case_type, names), columns=DASHBOARD_GRID_COLUMNS,
+                          title=f"{case_type} forecasts, page {graph_page} of {pages_total}")
+    return fig.to_json()
+
+def small_multiples_figure(version, case_type, graph_page):
+    try:
+        figure_json = _small_multiples_json(version, case_type, graph_page)
+        return None if figure_json is None else json.loads(figure_json)
+    except Exception as e:
+        logger.error(f"Error plotting {case_type} forecasts, page {graph_page}: {e}")
+        st.error(f"Failed to plot {case_type} forecasts.")
+        return None
+
+# Load the forecast index and hot models once per server process, off the request path
+@st.cache_resource(show_spinner=False)
+def start_background_prewarm():
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+    except ImportError:
+        add_script_run_ctx = None
+    return start_prewarm([
+        ('forecast index', forecast_index),
+        ('models', lambda: prewarm_models(default_registry(), DASHBOARD_PREWARM_SERIES)),
+    ], before_start=add_script_run_ctx)
+
+# Directory listings are cached per directory mtime, so new pipeline output shows up
 @st.cache_data
+def _list_files(directory, suffix, version):
+    return sorted(f for f in os.listdir(directory) if f.endswith(suffix))
+
+# Helper to get available models
 def get_model_files():
-    files = [f for f in os.listdir(MODELS_DIR) if f.endswith('_prophet_model.joblib')]
-    return files
+    files = _list_files(MODELS_DIR, '', path_version(MODELS_DIR))
+    return [f for f in files if parse_model_name(f)]
 
-@st.cache_data
 def get_param_files():
-    files = [f for f in os.listdir(PARAMS_DIR) if f.endswith('_model_params.json')]
-    return files
+    return _list_files(PARAMS_DIR, '_model_params.json', path_version(PARAMS_DIR))
 
-@st.cache_data
 def get_forecast_files():
-    files = [f for f in os.listdir(DATA_DIR) if f.endswith('_weekly_forecast.csv')]
-    return files
+    return _list_files(DATA_DIR, '_weekly_forecast.csv', path_version(DATA_DIR))
 
-# Load model and params
+# Load model and params; models stay in the shared LRU registry between reruns
 def load_model_and_params(model_name):
     model_path = os.path.join(MODELS_DIR, model_name)
-    param_name = model_name.replace('_prophet_model.joblib', '_model_params.json')
-    param_path = os.path.join(PARAMS_DIR, param_name)
-    model = joblib.load(model_path)
+    name, target = parse_model_name(model_name)
+    param_path = os.path.join(PARAMS_DIR, f'{name}_{target}_model_params.json')
+    # Baseline-tier series have no model; their forecast is served from the store (load_forecast)
+    model = default_registry().load(model_path) if os.path.exists(model_path) else None
     params = None
     if os.path.exists(param_path):
         with open(param_path, 'r') as f:
@@ -139,6 +180,8 @@ def load_forecast_csv(forecast_name):
 
 # --- Streamlit App ---
 st.set_page_config(page_title="COVID-19 Forecasting Dashboard", layout="wide")
+# Seed the forecast store from the legacy per-series CSVs on first launch
+ensure_store()
 
 # --- Sidebar Navigation ---
 pages = [
@@ -158,15 +201,19 @@ if page == "Project Overview & Chatbot":
     - An AI-powered chatbot for project Q&A
     """)
     st.header("Ask the Project Chatbot")
-    from project.chatbot_gemini import ask_gemini
     user_q = st.text_input("Ask a question about the project, data, or COVID-19 trends:")
     if user_q:
-        with st.spinner("Gemini is thinking..."):
-            try:
-                answer = ask_gemini(user_q)
-                st.success(answer)
-            except Exception as e:
-                st.error(f"Chatbot error: {e}")
+        try:
+            # The chatbot stack is only loaded once a question is asked
+            from project.chatbot_gemini import ask_gemini, ask_gemini_stream
+            # Stream the answer as it is generated; older Streamlit versions show it when complete
+            if hasattr(st, 'write_stream'):
+                st.write_stream(ask_gemini_stream(user_q))
+            else:
+                with st.spinner("Gemini is thinking..."):
+                    st.success(ask_gemini(user_q))
+        except Exception as e:
+            st.error(f"Chatbot error: {e}")
     else:
         st.info("This is a Gemini LLM-powered chatbot with access to project data and the web.")
 
@@ -193,10 +240,22 @@ elif page == "Project Graphs":
     if global_df is not None:
         plot_forecast_graph(global_df, 'global', 'Confirmed', key='global-Confirmed')
     st.header("Country/Region Trends")
-    for country in get_available_countries():
-        for case_type in get_available_types(country):
+    case_type = st.radio("Case Type", sorted(forecast_index().data['target'].unique()), horizontal=True)
+    names = graph_series(case_type)
+    pages_total = paginate(names, 1, DASHBOARD_PAGE_SIZE)[1]
+    graph_page = st.number_input(f"Page (of {pages_total})", min_value=1, max_value=pages_total, value=1)
+    layout = st.radio("Layout", ["Small multiples", "One chart per series"], horizontal=True)
+    if layout == "Small multiples":
+        figure = small_multiples_figure(store_version(), case_type, int(graph_page))
+        if figure is not None:
+            st.plotly_chart(figure, use_container_width=True, key=f"grid-{case_type}-{graph_page}")
+    else:
+        for country in paginate(names, int(graph_page), DASHBOARD_PAGE_SIZE)[0]:
             st.subheader(f"{country} - {case_type}")
             df = load_forecast(country, case_type)
             if df is not None:
                 plot_forecast_graph(df, country, case_type, key=f"{country}-{case_type}")
 
+# --- Background prewarm, started once the first page has been sent ---
+if DASHBOARD_PREWARM:
+    start_background_prewarm()
@@ -0,0 +1,103 @@
+"""
+synthetic_data.py
+Generator of covid.csv-shaped data at arbitrary scale for benchmarks and tests.
+
+Each location follows a randomly parameterized epidemic curve: daily new cases
+grow logistically with Poisson noise, deaths and recoveries are binomial shares
+of earlier cases, and Active = Confirmed - Deaths - Recovered. The defaults
+reproduce the shape of Data_original/covid.csv (187 countries, 188 days, 8
+countries reported by province); scale multiplies the number of countries.
+
+Example: python -m project.synthetic_data --scale 10 --output Data_original/covid_x10.csv
+"""
+import argparse
+import numpy as np
+import pandas as pd
+
+WHO_REGIONS = ['Eastern Mediterranean', 'Europe', 'Africa', 'Americas', 'Western Pacific', 'South-East Asia']
+COLUMNS = ['Province/State', 'Country/Region', 'Lat', 'Long', 'Date',
+           'Confirmed', 'Deaths', 'Recovered', 'Active', 'WHO Region']
+
+def generate_covid_data(n_countries: int = 187, n_days: int = 188, n_provinces: int = 10,
+                        province_share: float = 0.04, start: str = '2020-01-22', seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a raw COVID-19 dataset with the columns and dtypes of covid.csv.
+
+    Args:
+        n_countries (int): Number of countries.
+        n_days (int): Number of daily observations per location.
+        n_provinces (int): Provinces of each country that is reported by province.
+        province_share (float): Share of countries reported by province.
+        start (str): First date.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: One row per (location, day), sorted by date like covid.csv.
+    """
+    rng = np.random.default_rng(seed)
+    n_split = int(round(n_countries * province_share))
+    countries = [f'Country {i:05d}' for i in range(n_countries)]
+    locations = [(country, f'Province {p:02d}') for country in countries[:n_split] for p in range(n_provinces)]
+    locations += [(country, None) for country in countries[n_split:]]
+    n_loc = len(locations)
+    region_of = {c: WHO_REGIONS[i % len(WHO_REGIONS)] for i, c in enumerate(countries)}
+
+    # Logistic epidemic curve per location
+    days = np.arange(n_days)
+    peak = rng.uniform(0.3, 1.2, n_loc)[:, None] * n_days
+    rate = rng.uniform(0.03, 0.15, n_loc)[:, None]
+    size = np.exp(rng.normal(8, 2.5, n_loc))[:, None]
+    expected_new = size * rate * np.exp(-rate * (days - peak)) / (1 + np.exp(-rate * (days - peak))) ** 2
+    new_cases = rng.poisson(expected_new)
+    confirmed = new_cases.cumsum(axis=1)
+    new_deaths = rng.binomial(new_cases, rng.uniform(0.005, 0.05, n_loc)[:, None])
+    deaths = new_deaths.cumsum(axis=1)
+    # Recoveries are reported with a two-week lag
+    lag = 14
+    recovered = np.zeros_like(confirmed)
+    recovered[:, lag:] = rng.binomial(new_cases - new_deaths, 0.9)[:, :-lag].cumsum(axis=1) if n_days > lag else 0
+    active = confirmed - deaths - recovered
+
+    dates = pd.date_range(start, periods=n_days, freq='D').strftime('%Y-%m-%d')
+    # covid.csv lists every location for a day before moving to the next day
+    df = pd.DataFrame({
+        'Province/State': np.tile([p for _, p in locations], n_days),
+        'Country/Region': np.tile([c for c, _ in locations], n_days),
+        'Lat': np.tile(rng.uniform(-60, 70, n_loc).round(4), n_days),
+        'Long': np.tile(rng.uniform(-180, 180, n_loc).round(4), n_days),
+        'Date': np.repeat(dates, n_loc),
+        'Confirmed': confirmed.T.ravel(),
+        'Deaths': deaths.T.ravel(),
+        'Recovered': recovered.T.ravel(),
+        'Active': active.T.ravel(),
+        'WHO Region': np.tile([region_of[c] for c, _ in locations], n_days),
+    })
+    return df[COLUMNS]
+
+def write_covid_csv(path: str, scale: float = 1, **kwargs) -> pd.DataFrame:
+    """
+    Write a synthetic covid.csv with `scale` times today's number of countries.
+
+    Args:
+        path (str): Output CSV path.
+        scale (float): Multiplier on the default number of countries.
+        **kwargs: Further arguments for generate_covid_data.
+
+    Returns:
+        pd.DataFrame: The generated data.
+    """
+    kwargs.setdefault('n_countries', max(1, int(round(187 * scale))))
+    df = generate_covid_data(**kwargs)
+    df.to_csv(path, index=False)
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic covid.csv-shaped dataset.")
+    parser.add_argument('--output', required=True, help="CSV path to write.")
+    parser.add_argument('--scale', type=float, default=1, help="Multiplier on today's number of countries.")
+    parser.add_argument('--days', type=int, default=188)
+    parser.add_argument('--provinces', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    df = write_covid_csv(args.output, args.scale, n_days=args.days, n_provinces=args.provinces, seed=args.seed)
+    print(f"Wrote {len(df)} rows to {args.output}")
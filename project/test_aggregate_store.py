@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from project.aggregate_store import (connect, ingest_file, ingest_frame, read_series, read_parent_of,
+                                     changed_since, latest_batch)
+from project.data_preprocessing import clean_data, build_series_cube, split_levels
+from project.synthetic_data import generate_covid_data
+
+def row(country, date, confirmed, region='Europe', province=None):
+    return {'Province/State': province, 'Country/Region': country, 'Lat': 0.0, 'Long': 0.0, 'Date': date,
+            'Confirmed': confirmed, 'Deaths': 0, 'Recovered': 0, 'Active': confirmed, 'WHO Region': region}
+
+class TestAggregateStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'aggregates.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_daily_deltas_match_full_aggregation(self):
+        raw = generate_covid_data(n_countries=12, n_days=30, n_provinces=3, province_share=0.3)
+        last_day = raw['Date'].max()
+        history, delta = raw[raw['Date'] < last_day], raw[raw['Date'] == last_day]
+        for name, part in (('history.csv', history), ('delta.csv', delta)):
+            part.to_csv(os.path.join(self.tmp_dir, name), index=False)
+        ingest_file(os.path.join(self.tmp_dir, 'history.csv'), self.db_path)
+        result = ingest_file(os.path.join(self.tmp_dir, 'delta.csv'), self.db_path, chunk_rows=5)
+        self.assertEqual(result['accepted'], len(delta))
+        self.assertEqual(result['changed']['country'], sorted(delta['Country/Region'].unique()))
+        self.assertEqual(changed_since(1, self.db_path), result['changed'])
+
+        global_data, region_data, country_data = split_levels(build_series_cube(clean_data(raw)))
+        expected = {'global': global_data, **region_data, **country_data}
+        frames = read_series(db_path=self.db_path)
+        self.assertEqual(sorted(frames), sorted(expected))
+        for name, frame in expected.items():
+            pd.testing.assert_frame_equal(frames[name], frame, check_freq=False)
+
+    def test_validation_duplicates_and_corrections(self):
+        conn = connect(self.db_path)
+        try:
+            ingest_frame(conn, pd.DataFrame([row('A', '2020-03-01', 10), row('B', '2020-03-01', 5)]))
+            result = ingest_frame(conn, pd.DataFrame([
+                row('A', '2020-03-01', 99),                 # duplicate of a stored row
+                row('A', '2020-03-02', 12),
+                row('A', '2020-03-02', 13),                 # duplicate within the delta
+                row('B', 'not a date', 1),
+                row('B', '2020-03-02', 6, region='Africa'),  # B is in Europe
+            ]))
+            self.assertEqual((result['accepted'], result['duplicates'], result['invalid']), (1, 2, 2))
+            self.assertEqual(result['changed'], {'country': ['A'], 'region': ['Europe'], 'global': ['global']})
+            corrected = ingest_frame(conn, pd.DataFrame([row('A', '2020-03-01', 11)]), replace=True)
+            self.assertEqual(corrected['replaced'], 1)
+        finally:
+            conn.close()
+        frames = read_series(['A', 'global'], db_path=self.db_path)
+        self.assertEqual(frames['A']['Confirmed'].tolist(), [11, 12])
+        self.assertEqual(frames['global']['Confirmed'].tolist(), [16, 12])
+
+    def test_unknown_region_is_filled_in_later(self):
+        self.assertEqual(latest_batch(self.db_path), 0)
+        conn = connect(self.db_path)
+        try:
+            first = ingest_frame(conn, pd.DataFrame([row('A', '2020-03-01', 10, region=None),
+                                                     row('B', '2020-03-01', 5)]))
+            # A is left out of the region totals until its region is known
+            self.assertEqual(first['changed']['region'], ['Europe'])
+            result = ingest_frame(conn, pd.DataFrame([row('A', '2020-03-02', 12, region='Africa')]))
+            self.assertEqual((result['accepted'], result['invalid']), (1, 0))
+            self.assertEqual(result['changed']['region'], ['Africa'])
+        finally:
+            conn.close()
+        self.assertEqual(read_parent_of(self.db_path), {'A': 'Africa', 'B': 'Europe'})
+        frames = read_series(db_path=self.db_path)
+        self.assertNotIn('', frames)
+        self.assertEqual(frames['Africa']['Confirmed'].tolist(), [10, 12])
+        self.assertEqual(frames['Europe']['Confirmed'].tolist(), [5])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+import pandas as pd
+from project.baseline_models import damped_trend, log_linear, fit_baselines
+
+def frame(values, start='2020-01-22'):
+    return pd.DataFrame({'ds': pd.date_range(start, periods=len(values), freq='D'), 'y': values})
+
+class TestBaselineModels(unittest.TestCase):
+    def test_batch_models_follow_simple_curves(self):
+        # Rows are right-aligned: the second series starts later
+        values = np.vstack([np.arange(40.0) * 3 + 10, np.r_[[np.nan] * 10, np.full(30, 7.0)]])
+        forecast = damped_trend(values, 5)
+        np.testing.assert_allclose(forecast[0], 130 + 3 * np.arange(5), rtol=0.02)
+        np.testing.assert_allclose(forecast[1], 7.0)
+        growth = np.expm1(0.1 * np.arange(30.0))[None]
+        np.testing.assert_allclose(log_linear(growth, 3)[0], np.expm1(0.1 * np.arange(30, 33)))
+
+    def test_fit_baselines_escalates_poor_fits(self):
+        rng = np.random.default_rng(0)
+        frames = {
+            'smooth': frame(np.cumsum(np.full(60, 100.0))),
+            'noisy': frame(rng.integers(0, 1000, 60).astype(float)),
+            'short': frame(np.arange(10.0)),
+        }
+        forecasts, choices, escalated = fit_baselines(frames, horizon=7)
+        self.assertEqual(sorted(escalated), ['noisy', 'short'])
+        self.assertIn(choices['smooth'][0], ('damped_trend', 'log_linear'))
+        forecast = forecasts['smooth']
+        self.assertEqual(forecast['ds'].iloc[0], pd.Timestamp('2020-03-22'))
+        self.assertEqual(len(forecast), 7)
+        self.assertTrue((forecast['yhat_lower'] <= forecast['yhat']).all())
+        self.assertTrue((forecast['yhat'] <= forecast['yhat_upper']).all())
+
+if __name__ == '__main__':
+    unittest.main()
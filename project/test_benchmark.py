@@ -0,0 +1,29 @@
+import unittest
+from project.synthetic_data import generate_covid_data, COLUMNS
+from project.benchmark import StageRecorder, compare_results
+
+class TestBenchmark(unittest.TestCase):
+    def test_generate_covid_data(self):
+        df = generate_covid_data(n_countries=10, n_days=30, n_provinces=3, province_share=0.2)
+        self.assertEqual(list(df.columns), COLUMNS)
+        # 2 countries by province (3 rows each) + 8 countries, for each of 30 days
+        self.assertEqual(len(df), (2 * 3 + 8) * 30)
+        self.assertEqual(df['Country/Region'].nunique(), 10)
+        self.assertTrue((df['Active'] == df['Confirmed'] - df['Deaths'] - df['Recovered']).all())
+        self.assertTrue((df['Active'] >= 0).all())
+
+    def test_stage_recorder_and_compare(self):
+        recorder = StageRecorder()
+        with recorder.stage('build', rows=3):
+            list(range(1000))
+        record = recorder.stages[0]
+        self.assertEqual(record['stage'], 'build')
+        self.assertIn('peak_mb', record)
+        baseline = {'stages': [{'stage': 'build', 'seconds': 1.0}, {'stage': 'old', 'seconds': 1.0}]}
+        current = {'stages': [{'stage': 'build', 'seconds': 1.5}]}
+        rows = compare_results(baseline, current, tolerance=0.2)
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0]['regression'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from project.chat_cache import CachedChatbot, TTLCache, normalize_question
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestChatCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.llm_calls = []
+        self.search_calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_bot(self, answer='The data starts on 2020-01-22.', path=None):
+        def llm(system_prompt, question):
+            self.llm_calls.append(question)
+            return answer
+
+        def search(query):
+            self.search_calls.append(query)
+            return 'web result'
+
+        return CachedChatbot(llm, search, lambda: 'static context',
+                             TTLCache(10, 60, path=path, clock=self.clock),
+                             TTLCache(10, 60, clock=self.clock))
+
+    def test_normalize_question(self):
+        self.assertEqual(normalize_question('  When does the DATA start?? '), 'when does the data start')
+
+    def test_repeated_and_rephrased_questions_are_cached(self):
+        bot = self.make_bot()
+        first = bot.ask('When does the data start?')
+        self.assertEqual(bot.ask('When does the data start?'), first)
+        self.assertEqual(bot.ask('when does the data START'), first)
+        self.assertEqual(len(self.llm_calls), 1)
+        # A different context is a different cache entry
+        bot.ask('When does the data start?', context='Only Europe. ')
+        self.assertEqual(len(self.llm_calls), 2)
+
+    def test_entries_expire(self):
+        bot = self.make_bot()
+        bot.ask('How many countries?')
+        self.clock.now += 61
+        bot.ask('How many countries?')
+        self.assertEqual(len(self.llm_calls), 2)
+
+    def test_web_fallback_is_cached(self):
+        bot = self.make_bot(answer="Sorry, I don't know.")
+        answer = bot.ask('Latest vaccine news?')
+        self.assertEqual(answer, "Sorry, I don't know.\n\n[Web Search]: web result")
+        bot.ask('Latest vaccine news?', use_cache=False)
+        self.assertEqual(len(self.llm_calls), 2)
+        self.assertEqual(len(self.search_calls), 1)
+
+    def test_persisted_answers_survive_restart(self):
+        path = os.path.join(self.tmp_dir, 'answers.json')
+        self.make_bot(path=path).ask('What is Active?')
+        answer = self.make_bot(answer='other', path=path).ask('What is Active?')
+        self.assertEqual(answer, 'The data starts on 2020-01-22.')
+        self.assertEqual(len(self.llm_calls), 1)
+
+    def test_local_answers_skip_the_llm(self):
+        bot = self.make_bot()
+        bot.local_answer = lambda q: {'answer': 'Brazil had 10 deaths.', 'snippet': 'Brazil had 10 deaths.'} \
+            if 'Brazil' in q else None
+        self.assertEqual(bot.ask('deaths in Brazil?'), 'Brazil had 10 deaths.')
+        self.assertEqual(self.llm_calls, [])
+        bot.phrase_local = True
+        bot.ask('deaths in Brazil today?')
+        self.assertEqual(self.llm_calls, ['deaths in Brazil today?'])
+
+    def make_streaming_bot(self, chunks, delay=0.0):
+        bot = self.make_bot()
+        self.search_started = threading.Event()
+
+        def llm_stream(system_prompt, question):
+            self.llm_calls.append(question)
+            for chunk in chunks:
+                time.sleep(delay)
+                yield chunk
+
+        def search(query):
+            self.search_started.set()
+            self.search_calls.append(query)
+            return 'web result'
+
+        bot.llm_stream, bot.search = llm_stream, search
+        return bot
+
+    def test_stream_yields_chunks_and_caches_the_answer(self):
+        bot = self.make_streaming_bot(['The data ', 'starts on ', '2020-01-22.'])
+        chunks = list(bot.ask_stream('When does the data start?', speculative_search=False))
+        self.assertEqual(chunks, ['The data ', 'starts on ', '2020-01-22.'])
+        self.assertEqual(list(bot.ask_stream('when does the data start')), ['The data starts on 2020-01-22.'])
+        self.assertEqual(bot.ask('When does the data start?'), 'The data starts on 2020-01-22.')
+        self.assertEqual(len(self.llm_calls), 1)
+        self.assertEqual(self.search_calls, [])
+
+    def test_slow_stream_times_out_to_speculative_search(self):
+        bot = self.make_streaming_bot(['slow ', 'answer that never ends'], delay=0.5)
+        started = time.perf_counter()
+        answer = ''.join(bot.ask_stream('Latest news?', speculative_search=True, llm_timeout=0.2,
+                                        search_timeout=1))
+        self.assertLess(time.perf_counter() - started, 0.45)
+        self.assertTrue(self.search_started.is_set())
+        self.assertEqual(answer, '\n\n[Web Search]: web result')
+        # Timed-out answers are not cached
+        self.assertIsNone(bot.answer_cache.get(bot._keys('Latest news?', None)[0]))
+
+    def test_ask_async_with_fallback_and_timeout(self):
+        bot = self.make_bot(answer="Sorry, I don't know.")
+        answer = asyncio.run(bot.ask_async('Latest vaccine news?'))
+        self.assertEqual(answer, "Sorry, I don't know.\n\n[Web Search]: web result")
+        self.assertEqual(asyncio.run(bot.ask_async('latest vaccine news')), answer)
+
+        def slow_llm(system_prompt, question):
+            time.sleep(0.5)
+            return 'too late'
+        bot.llm = slow_llm
+        answer = asyncio.run(bot.ask_async('Anything new?', llm_timeout=0.1))
+        self.assertIn('[Web Search]: web result', answer)
+
+    def test_streamed_fallback_is_cached_as_streamed(self):
+        bot = self.make_streaming_bot(["Sorry, I don't know."])
+        streamed = ''.join(bot.ask_stream('Latest vaccine news?'))
+        self.assertEqual(streamed, "Sorry, I don't know.\n\n[Web Search]: web result")
+        self.assertEqual(list(bot.ask_stream('Latest vaccine news?')), [streamed])
+        self.assertEqual(bot.ask('Latest vaccine news?'), streamed)
+        self.assertEqual(len(self.search_calls), 1)
+
+    def test_local_answers_never_search_and_phrasing_times_out(self):
+        bot = self.make_streaming_bot(['phrased ', 'too slowly'], delay=0.5)
+        bot.local_answer = lambda q: {'answer': 'Brazil had 10 deaths.', 'snippet': 'Brazil had 10 deaths.'}
+        bot.phrase_local = True
+        started = time.perf_counter()
+        answer = ''.join(bot.ask_stream('deaths in Brazil?', speculative_search=True, llm_timeout=0.2))
+        self.assertLess(time.perf_counter() - started, 0.45)
+        self.assertEqual(answer, 'Brazil had 10 deaths.')
+        answer = asyncio.run(bot.ask_async('deaths in Brazil today?', speculative_search=True, llm_timeout=0.2))
+        self.assertEqual(answer, 'Brazil had 10 deaths.')
+        self.assertEqual(self.search_calls, [])
+
+    def test_lru_eviction(self):
+        cache = TTLCache(2, 60, clock=self.clock)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+
+if __name__ == '__main__':
+    unittest.main()
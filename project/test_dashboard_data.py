@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from project.dashboard_data import ForecastIndex, paginate, store_version, load_forecast_index
+from project.forecast_store import connect, start_run, write_forecast, write_forecasts
+
+def rows(series, target, start):
+    dates = pd.date_range('2020-08-01', periods=2, freq='D')
+    return pd.DataFrame({'series': series, 'target': target, 'run_id': 'r1', 'ds': dates,
+                         'yhat': [start, start + 1.0], 'yhat_lower': start - 1.0, 'yhat_upper': start + 2.0})
+
+class TestDashboardData(unittest.TestCase):
+    def test_frame_concatenates_series_in_requested_order(self):
+        index = ForecastIndex(pd.concat([rows('A', 'Confirmed', 1.0), rows('B', 'Confirmed', 5.0),
+                                         rows('B', 'Deaths', 9.0)], ignore_index=True))
+        frame = index.frame('Confirmed', ['B', 'A'])
+        self.assertEqual(frame['series'].tolist(), ['B', 'B', 'A', 'A'])
+        self.assertEqual(frame['yhat'].tolist(), [5.0, 6.0, 1.0, 2.0])
+        self.assertEqual(index.frame('Deaths')['series'].unique().tolist(), ['B'])
+
+    def test_paginate_clamps_page(self):
+        items = list(range(10))
+        self.assertEqual(paginate(items, 2, 4), ([4, 5, 6, 7], 3))
+        self.assertEqual(paginate(items, 9, 4), ([8, 9], 3))
+        self.assertEqual(paginate([], 1, 4), ([], 1))
+
+class TestStoreVersion(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'forecasts.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def forecast(self, start):
+        return pd.DataFrame({'ds': pd.date_range('2020-08-01', periods=2, freq='D'), 'yhat': [start, start + 1.0],
+                             'yhat_lower': start - 1.0, 'yhat_upper': start + 2.0})
+
+    def test_index_is_rebuilt_after_a_pipeline_write(self):
+        write_forecasts({('A', 'Confirmed'): self.forecast(1.0)}, db_path=self.db_path)
+        version = store_version(self.db_path)
+        index = load_forecast_index(self.db_path)
+        self.assertEqual(index.series(), ['A'])
+        # Reading the store leaves the version alone
+        self.assertEqual(store_version(self.db_path), version)
+
+        write_forecasts({('A', 'Confirmed'): self.forecast(5.0), ('B', 'Deaths'): self.forecast(9.0)},
+                        db_path=self.db_path)
+        self.assertNotEqual(store_version(self.db_path), version)
+        rebuilt = load_forecast_index(self.db_path)
+        self.assertEqual(rebuilt.series(), ['A', 'B'])
+        self.assertEqual(rebuilt.forecast('A', 'Confirmed')['yhat'].tolist(), [5.0, 6.0])
+
+    def test_writes_still_in_the_wal_change_the_version(self):
+        write_forecasts({('A', 'Confirmed'): self.forecast(1.0)}, db_path=self.db_path)
+        conn = connect(self.db_path)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            version = store_version(self.db_path)
+            # Not checkpointed into the database file while the writer is open
+            write_forecast(conn, start_run(conn), 'B', 'Deaths', self.forecast(9.0))
+            self.assertNotEqual(store_version(self.db_path), version)
+            self.assertEqual(load_forecast_index(self.db_path).series(), ['A', 'B'])
+        finally:
+            conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
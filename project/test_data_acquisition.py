@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from project.data_acquisition import load_covid_data, load_clean_covid_data, stream_series_cube
+from project.data_preprocessing import clean_data, build_series_cube, COUNTRY_COL, REGION_COL
+from project.logging_config import logger
+from project.synthetic_data import generate_covid_data
+
+class TestStreamSeriesCube(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'covid.csv')
+        # Shuffled rows with exact duplicates, so that later chunks hold earlier dates
+        df = generate_covid_data(n_countries=30, n_days=20, province_share=0.1, seed=1)
+        self.df = df.sample(frac=1, random_state=0)
+        self.df = self.df.iloc[np.r_[np.arange(len(df)), np.arange(0, len(df), 7)]]
+        self.df.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def assert_same_cube(self, expected, actual):
+        self.assertEqual(expected.metrics, actual.metrics)
+        self.assertTrue((expected.dates == actual.dates).all())
+        for level in (None, REGION_COL, COUNTRY_COL):
+            keys, values, observed = expected.levels[level]
+            self.assertEqual(keys, actual.levels[level][0])
+            self.assertEqual(values.dtype, actual.levels[level][1].dtype)
+            np.testing.assert_array_equal(values, actual.levels[level][1])
+            np.testing.assert_array_equal(observed, actual.levels[level][2])
+
+    def test_chunks_match_in_memory_cube(self):
+        expected = build_series_cube(clean_data(load_covid_data(self.path)))
+        for chunk_rows in (13, 250, None):
+            self.assert_same_cube(expected, stream_series_cube(self.path, chunk_rows=chunk_rows))
+
+    def test_first_row_of_a_location_date_wins(self):
+        corrected = self.df.iloc[:1].assign(Confirmed=self.df['Confirmed'].iloc[0] + 1000)
+        corrected.to_csv(self.path, mode='a', header=False, index=False)
+        expected = build_series_cube(clean_data(self.df))
+        self.assert_same_cube(expected, stream_series_cube(self.path, chunk_rows=100))
+
+class TestCleanDataCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.path = os.path.join(self.tmp_dir, 'covid.csv')
+        self.df = generate_covid_data(n_countries=10, n_days=15, seed=2)
+        self.df.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def load(self):
+        """Return (frame, whether it was served from the cache)."""
+        with self.assertLogs(logger, 'INFO') as logs:
+            df = load_clean_covid_data(self.path, cache_dir=self.cache_dir)
+        return df, any('from cache' in line for line in logs.output)
+
+    def entries(self):
+        return sorted(name for name in os.listdir(self.cache_dir) if os.path.isdir(os.path.join(self.cache_dir, name)))
+
+    def test_cache_hit_matches_cold_load_and_is_writable(self):
+        cold, hit = self.load()
+        self.assertFalse(hit)
+        cached, hit = self.load()
+        self.assertTrue(hit)
+        pd.testing.assert_frame_equal(cold, cached)
+        cached.loc[cached.index[0], 'Confirmed'] = -1
+        self.assertEqual(cached['Confirmed'].iloc[0], -1)
+        # Writes stay in memory
+        again, hit = self.load()
+        self.assertTrue(hit)
+        pd.testing.assert_frame_equal(cold, again)
+
+    def test_touched_file_with_same_content_is_a_hit(self):
+        self.load()
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        _, hit = self.load()
+        self.assertTrue(hit)
+
+    def test_changed_content_rebuilds(self):
+        cold, _ = self.load()
+        before = self.entries()
+        # Same size, different content: only the SHA-1 tells them apart
+        text = open(self.path).read()
+        last_digit = max(i for i, c in enumerate(text) if c.isdigit() and c != '9')
+        with open(self.path, 'w') as f:
+            f.write(text[:last_digit] + str(int(text[last_digit]) + 1) + text[last_digit + 1:])
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        rebuilt, hit = self.load()
+        self.assertFalse(hit)
+        self.assertFalse(cold.equals(rebuilt))
+        self.assertEqual(len(self.entries()), 1)
+        self.assertNotEqual(before, self.entries())
+        # Appended rows change the size
+        self.df.iloc[:3].to_csv(self.path, mode='a', header=False, index=False)
+        _, hit = self.load()
+        self.assertFalse(hit)
+        self.assertEqual(len(self.entries()), 1)
+
+    def test_unreadable_entry_is_rebuilt(self):
+        cold, _ = self.load()
+        entry = os.path.join(self.cache_dir, self.entries()[0])
+        os.remove(os.path.join(entry, 'col_0.npy'))
+        rebuilt, hit = self.load()
+        self.assertFalse(hit)
+        pd.testing.assert_frame_equal(cold, rebuilt)
+        _, hit = self.load()
+        self.assertTrue(hit)
+
+if __name__ == '__main__':
+    unittest.main()
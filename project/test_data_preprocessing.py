@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+import pandas as pd
+from project.data_preprocessing import clean_data, preprocess_grouped_data, preprocess_all_levels, build_series_cube
+
+class TestDataPreprocessing(unittest.TestCase):
+    def setUp(self):
+        # Two provinces of one country, a country with a missing day, and a second region
+        self.df = clean_data(pd.DataFrame({
+            'Province/State': ['P1', 'P2', 'P1', 'P2', None, None, None, None],
+            'Country/Region': ['A', 'A', 'A', 'A', 'B', 'B', 'C', 'C'],
+            'Lat': [1.0] * 8,
+            'Long': [2.0] * 8,
+            'Date': ['2020-01-01', '2020-01-01', '2020-01-02', '2020-01-02',
+                     '2020-01-01', '2020-01-03', '2020-01-02', '2020-01-03'],
+            'Confirmed': [1, 2, 3, 4, 5, 6, 7, 8],
+            'Deaths': [0, 1, 0, 1, 0, 1, 0, 1],
+            'Recovered': [0] * 8,
+            'Active': [1, 1, 3, 2, 5, 5, 7, 7],
+            'WHO Region': ['R1', 'R1', 'R1', 'R1', 'R1', 'R1', 'R2', 'R2'],
+        }))
+        self.metrics = ['Confirmed', 'Deaths', 'Recovered', 'Active']
+
+    def reference(self, group_col):
+        # Per-group resampling, as the pipeline originally did it
+        return {key: group.set_index('Date')[self.metrics].resample('D').sum()
+                for key, group in self.df.groupby(group_col, observed=True)}
+
+    def test_levels_match_per_group_resampling(self):
+        global_data, region_data, country_data = preprocess_all_levels(self.df)
+        for group_col, datasets in [('Country/Region', country_data), ('WHO Region', region_data)]:
+            expected = self.reference(group_col)
+            self.assertEqual(sorted(expected), sorted(datasets))
+            for key, frame in datasets.items():
+                pd.testing.assert_frame_equal(frame, expected[key], check_dtype=False, check_freq=False)
+        expected_global = self.df.set_index('Date')[self.metrics].resample('D').sum()
+        pd.testing.assert_frame_equal(global_data, expected_global, check_dtype=False, check_freq=False)
+
+    def test_gap_days_are_zero_filled(self):
+        country_b = preprocess_grouped_data(self.df, 'Country/Region')['B']
+        self.assertEqual(len(country_b), 3)
+        self.assertEqual(country_b.loc['2020-01-02', 'Confirmed'], 0)
+
+    def test_series_span_own_date_range(self):
+        country_c = preprocess_grouped_data(self.df, 'Country/Region')['C']
+        self.assertEqual(country_c.index[0], pd.Timestamp('2020-01-02'))
+
+    def test_global_is_sum_of_countries(self):
+        cube = build_series_cube(self.df)
+        _, country_values, _ = cube.levels['Country/Region']
+        _, global_values, _ = cube.levels[None]
+        np.testing.assert_array_equal(global_values[0], country_values.sum(axis=0))
+        self.assertEqual(list(preprocess_grouped_data(self.df)), ['global'])
+
+if __name__ == '__main__':
+    unittest.main()
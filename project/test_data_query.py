@@ -0,0 +1,65 @@
+import unittest
+import pandas as pd
+from project.data_preprocessing import clean_data
+from project.data_query import DataQueryEngine
+
+class TestDataQuery(unittest.TestCase):
+    def setUp(self):
+        dates = pd.date_range('2020-06-29', periods=4, freq='D').strftime('%Y-%m-%d')
+        rows = []
+        for i, date in enumerate(dates):
+            # Spain is reported by two provinces; US and Italy as a whole
+            rows += [
+                {'Province/State': 'A', 'Country/Region': 'Spain', 'Date': date, 'Confirmed': 10 + i,
+                 'Deaths': 1 + i, 'Recovered': 0, 'Active': 9, 'WHO Region': 'Europe'},
+                {'Province/State': 'B', 'Country/Region': 'Spain', 'Date': date, 'Confirmed': 20 + i,
+                 'Deaths': 2, 'Recovered': 0, 'Active': 18 + i, 'WHO Region': 'Europe'},
+                {'Province/State': None, 'Country/Region': 'Italy', 'Date': date, 'Confirmed': 5,
+                 'Deaths': 1, 'Recovered': 0, 'Active': 4, 'WHO Region': 'Europe'},
+                {'Province/State': None, 'Country/Region': 'US', 'Date': date, 'Confirmed': 100 + 10 * i,
+                 'Deaths': 5 + 5 * i, 'Recovered': 0, 'Active': 95 + 5 * i, 'WHO Region': 'Americas'},
+                {'Province/State': None, 'Country/Region': 'New Zealand', 'Date': date, 'Confirmed': 1000 + i,
+                 'Deaths': 0, 'Recovered': 0, 'Active': 1000 + i, 'WHO Region': 'Western Pacific'},
+            ]
+        df = pd.DataFrame(rows).assign(Lat=0.0, Long=0.0)
+        self.engine = DataQueryEngine.from_frame(clean_data(df))
+
+    def test_value_lookups(self):
+        self.assertEqual(self.engine.value('Spain', 'Confirmed', '2020-06-30'), 32)
+        self.assertEqual(self.engine.value('global', 'Deaths', '2020-06-29'), 9)
+        answer = self.engine.answer('How many deaths in Spain on 2020-07-01?')
+        self.assertEqual(answer['intent'], 'value')
+        self.assertIn('5 deaths', answer['answer'])
+        self.assertIn('5 new deaths', self.engine.answer('new deaths in the USA on July 1')['answer'])
+
+    def test_rank_and_peak(self):
+        answer = self.engine.answer('Which WHO region had the most deaths in July?')
+        self.assertEqual(answer['intent'], 'rank')
+        # New deaths over July 1-2: Americas 10, Europe 2
+        self.assertIn('Americas (10)', answer['answer'])
+        top = self.engine.rank('country', 'Confirmed', ascending=True, top=2)
+        self.assertEqual([name for name, _ in top], ['Italy', 'Spain'])
+        self.assertEqual(self.engine.answer('When did US peak in new cases?')['intent'], 'peak')
+
+    def test_unrecognized_and_out_of_range(self):
+        self.assertIsNone(self.engine.answer('What is Prophet?'))
+        self.assertIsNone(self.engine.answer('tell us about deaths'))
+        self.assertEqual(self.engine.answer('deaths in Italy on 2021-01-01')['intent'], 'out_of_range')
+
+    def test_non_lookup_questions_are_left_to_the_llm(self):
+        for question in ('Why did deaths in Italy rise so fast?',
+                         'What is the death rate in Italy?',
+                         'What is the forecast for confirmed cases in Spain next week?',
+                         'Compare deaths in Italy and Spain',
+                         'Deaths in Italy vs Spain',
+                         'How many deaths in Italy and Spain?',
+                         'What is the trend of active cases in the US?'):
+            self.assertIsNone(self.engine.answer(question), question)
+
+    def test_place_names_do_not_select_the_statistic(self):
+        answer = self.engine.answer('How many cases in New Zealand?')
+        self.assertEqual(answer['answer'], 'New Zealand had 1,003 confirmed cases on 2020-07-02 (cumulative).')
+        self.assertIn('1 new confirmed cases', self.engine.answer('new cases in New Zealand on 2020-07-01')['answer'])
+
+if __name__ == '__main__':
+    unittest.main()
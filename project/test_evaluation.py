@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from project.evaluation import evaluate_batch, leaderboard, write_leaderboard, read_leaderboard, compare_leaderboards
+
+class TestEvaluation(unittest.TestCase):
+    def test_batch_metrics_handle_zeros_and_padding(self):
+        actual = np.array([[10.0, 20.0, np.nan], [0.0, 0.0, 0.0]])
+        forecast = np.array([[12.0, 20.0, 5.0], [0.0, 1.0, 0.0]])
+        history = np.array([[np.nan, 8.0, 9.0, 11.0], [0.0, 0.0, 0.0, 0.0]])
+        metrics = evaluate_batch(actual, forecast, forecast - 1, forecast + 1, history)
+        np.testing.assert_array_equal(metrics['n'], [2, 3])
+        np.testing.assert_allclose(metrics['mae'], [1.0, 1 / 3])
+        np.testing.assert_allclose(metrics['rmse'], [np.sqrt(2), np.sqrt(1 / 3)])
+        # Zero actuals: no MAPE, sMAPE of 200% on the one missed day only
+        self.assertAlmostEqual(metrics['mape'][0], 10.0)
+        self.assertTrue(np.isnan(metrics['mape'][1]))
+        np.testing.assert_allclose(metrics['smape'], [100 * (4 / 22) / 2, 200 / 3])
+        # Naive MAE of [8, 9, 11] is 1.5; a constant history cannot scale a non-zero error
+        self.assertAlmostEqual(metrics['mase'][0], 1 / 1.5)
+        self.assertTrue(np.isnan(metrics['mase'][1]))
+        np.testing.assert_allclose(metrics['coverage'], [0.5, 1.0])
+
+    def test_leaderboards_round_trip_and_compare(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            db_path = os.path.join(tmp_dir, 'forecasts.sqlite')
+            keys = [('A', 'Confirmed'), ('B', 'Confirmed')]
+            actual = np.array([[10.0, 10.0], [5.0, 5.0]])
+            before = leaderboard(keys, evaluate_batch(actual, actual + [[1], [1]]), ['prophet', 'prophet'])
+            after = leaderboard(keys, evaluate_batch(actual, actual + [[0], [2]]), ['damped_trend', 'prophet'])
+            write_leaderboard(before, 'run1', db_path)
+            write_leaderboard(after, 'run2', db_path)
+            self.assertEqual(read_leaderboard(db_path=db_path)['run_id'].unique().tolist(), ['run2'])
+            changes = compare_leaderboards(read_leaderboard('run1', db_path), read_leaderboard('run2', db_path), 'mae')
+            self.assertEqual(changes['series'].tolist(), ['B', 'A'])
+            np.testing.assert_allclose(changes['change'], [1.0, -1.0])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+import pandas as pd
+from project.modeling import train_prophet_model, make_future_dataframe, predict
+from project.fast_predict import extract_params, predict_frame, predict_batch
+
+class TestFastPredict(unittest.TestCase):
+    def setUp(self):
+        # Two months of a growing series with a weekly pattern
+        ds = pd.date_range(start='2020-01-01', periods=60, freq='D')
+        y = np.arange(60) * 3.0 + 5 * np.sin(np.arange(60) * 2 * np.pi / 7) + 10
+        self.df = pd.DataFrame({'ds': ds, 'y': y})
+
+    def test_matches_prophet_predict(self):
+        for mode in ('additive', 'multiplicative'):
+            model = train_prophet_model(self.df, {'seasonality_mode': mode})
+            future = make_future_dataframe(model, periods=7)
+            expected = predict(model, future)
+            forecast = predict_frame(extract_params(model), future['ds'], seed=0)
+            np.testing.assert_allclose(forecast['trend'], expected['trend'], rtol=1e-6)
+            np.testing.assert_allclose(forecast['yhat'], expected['yhat'], rtol=1e-6)
+            # Intervals are simulated, so only check they bracket the point forecast
+            self.assertTrue((forecast['yhat_lower'] <= forecast['yhat']).all())
+            self.assertTrue((forecast['yhat_upper'] >= forecast['yhat']).all())
+
+    def test_predict_batch(self):
+        model = train_prophet_model(self.df)
+        params = extract_params(model)
+        forecasts = predict_batch({'a': params, 'b': params}, horizon=5, n_samples=0)
+        expected = predict(model, make_future_dataframe(model, periods=5)).tail(5)
+        self.assertEqual(set(forecasts), {'a', 'b'})
+        self.assertEqual(list(forecasts['a']['ds']), list(expected['ds']))
+        np.testing.assert_allclose(forecasts['b']['yhat'], expected['yhat'], rtol=1e-6)
+        self.assertNotIn('yhat_lower', forecasts['a'])
+
+    def test_unsupported_model(self):
+        model = train_prophet_model(self.df.assign(cap=500.0), {'growth': 'logistic'})
+        with self.assertRaises(ValueError):
+            extract_params(model)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import pandas as pd
+from project.feature_engineering import long_frame, build_features, regressor_frames
+
+def make_datasets(n_series=4, seed=0):
+    rng = np.random.default_rng(seed)
+    datasets = {}
+    for i in range(n_series):
+        n_days = int(rng.integers(10, 30))
+        index = pd.date_range(f'2020-01-{i + 1:02d}', periods=n_days, freq='D', name='Date')
+        datasets[f'series {i}'] = pd.DataFrame({'Confirmed': rng.integers(0, 50, n_days).cumsum(),
+                                                'Deaths': rng.integers(0, 3, n_days).cumsum()}, index=index)
+    return datasets
+
+class TestFeatureEngineering(unittest.TestCase):
+    def test_features_match_pandas_groupby(self):
+        features = build_features(long_frame(make_datasets()), ['Confirmed', 'Deaths'], lags=[1, 7], windows=[3])
+        grouped = features.groupby('series', observed=True)['Confirmed']
+        new = grouped.diff()
+        expected = {
+            'Confirmed_lag_7': grouped.shift(7),
+            'Confirmed_new': new,
+            'Confirmed_new_roll_sum_3': new.groupby(features['series'], observed=True).rolling(3).sum()
+                .reset_index(level=0, drop=True),
+            'Confirmed_growth': new / grouped.shift(1).where(grouped.shift(1) > 0),
+        }
+        for column, values in expected.items():
+            np.testing.assert_allclose(features[column], values, err_msg=column)
+        np.testing.assert_array_equal(features['day_of_week'], features['Date'].dt.dayofweek)
+
+    def test_unsorted_input_is_sorted(self):
+        frame = long_frame(make_datasets())
+        shuffled = frame.sample(frac=1, random_state=0)
+        pd.testing.assert_frame_equal(build_features(shuffled, ['Deaths']), build_features(frame, ['Deaths']))
+
+    def test_horizon_makes_long_lags_known(self):
+        datasets = make_datasets(2)
+        features = build_features(long_frame(datasets, horizon=7), ['Confirmed'], lags=[1, 7], windows=[])
+        frames = regressor_frames(features, ['Confirmed_lag_1', 'Confirmed_lag_7'])
+        future = frames['series 1'].tail(7)
+        self.assertTrue(future['Confirmed_lag_7'].notna().all())
+        self.assertEqual(future['Confirmed_lag_1'].notna().sum(), 1)
+        self.assertEqual(future['Confirmed_lag_7'].iloc[-1], datasets['series 1']['Confirmed'].iloc[-1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import numpy as np
+import pandas as pd
+from project.forecast_store import write_forecasts, read_forecasts
+from project.modeling import train_prophet_model
+from project.model_registry import ModelRegistry
+from project.forecast_service import ForecastService, start_service
+from project.pipeline import run_tasks
+
+async def http_get(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+class TestForecastService(unittest.TestCase):
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.model_dir, 'forecasts.sqlite')
+        self.registry = ModelRegistry(self.model_dir)
+        df = pd.DataFrame({
+            'ds': pd.date_range(start='2020-01-01', periods=20, freq='D'),
+            'y': [float(i) for i in range(20)]
+        })
+        self.registry.save('Italy', 'Confirmed', train_prophet_model(df))
+
+    def tearDown(self):
+        shutil.rmtree(self.model_dir)
+
+    def test_forecast_requests(self):
+        async def scenario():
+            service = ForecastService(self.registry, workers=2, n_samples=100, db_path=self.db_path)
+            server = await start_service(service, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                path = '/forecast?series=Italy&target=Confirmed&target=Deaths&horizon=30'
+                first, second = await asyncio.gather(http_get(port, path), http_get(port, path))
+                bad = await http_get(port, '/forecast?series=Italy&horizon=0')
+                missing = await http_get(port, '/forecast?series=Nowhere&target=Confirmed')
+                return first, second, bad, missing, service.stats()
+            finally:
+                server.close()
+                await server.wait_closed()
+                service.close()
+
+        first, second, bad, missing, stats = asyncio.run(scenario())
+        status, body = first
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body['forecasts']), 1)
+        self.assertEqual(len(body['forecasts'][0]['forecast']), 30)
+        self.assertEqual(body['forecasts'][0]['forecast'][0]['ds'], '2020-01-21')
+        self.assertEqual(body['errors'][0]['target'], 'Deaths')
+        self.assertEqual(second, first)
+        self.assertEqual(bad[0], 400)
+        self.assertEqual(missing[0], 404)
+        self.assertEqual(stats['size'], 1)
+
+    def test_series_without_model_are_served_from_the_store(self):
+        stored = pd.DataFrame({'ds': pd.date_range('2020-01-21', periods=7, freq='D'),
+                               'yhat': range(7), 'yhat_lower': range(7), 'yhat_upper': range(7)})
+        run_id = write_forecasts({('Europe', 'Confirmed'): stored}, db_path=self.db_path)
+
+        async def scenario():
+            service = ForecastService(self.registry, workers=2, n_samples=0, db_path=self.db_path)
+            try:
+                short = await service.forecast([('Europe', 'Confirmed'), ('Italy', 'Confirmed')], 5)
+                longer = await service.forecast([('Europe', 'Confirmed'), ('Italy', 'Confirmed')], 30)
+                keys = await service.dispatch('GET', '/series')
+                return short, longer, keys
+            finally:
+                service.close()
+
+        short, longer, keys = asyncio.run(scenario())
+        forecasts, errors = short
+        self.assertEqual(errors, [])
+        europe = next(f for f in forecasts if f['series'] == 'Europe')
+        self.assertEqual(europe['version'], run_id)
+        self.assertEqual([r['yhat'] for r in europe['forecast']], [0, 1, 2, 3, 4])
+        # Stored forecasts only cover FORECAST_PERIODS days; models serve any horizon
+        forecasts, errors = longer
+        self.assertEqual([f['series'] for f in forecasts], ['Italy'])
+        self.assertEqual(errors[0]['series'], 'Europe')
+        # Both horizons loaded the Italy model once, through the registry's cache
+        self.assertEqual((self.registry.misses, self.registry.hits), (1, 1))
+        self.assertEqual(keys[1]['keys'], [{'series': 'Europe', 'target': 'Confirmed'},
+                                           {'series': 'Italy', 'target': 'Confirmed'}])
+
+    def test_baseline_series_are_served_at_any_horizon(self):
+        smooth = pd.DataFrame({'ds': pd.date_range('2020-01-01', periods=60, freq='D'),
+                               'y': np.cumsum(np.full(60, 100.0))})
+        results, _ = run_tasks([('Spain', 'Confirmed', smooth)], n_jobs=1, periods=7, manifest={},
+                               db_path=self.db_path, model_dir=self.model_dir)
+        self.assertIn('Spain_Confirmed', results)
+
+        async def scenario():
+            service = ForecastService(self.registry, workers=2, n_samples=0, db_path=self.db_path)
+            try:
+                return await service.forecast([('Spain', 'Confirmed')], 30), service.keys()
+            finally:
+                service.close()
+
+        (forecasts, errors), keys = asyncio.run(scenario())
+        self.assertEqual(errors, [])
+        served = [r['yhat'] for r in forecasts[0]['forecast']]
+        self.assertEqual(len(served), 30)
+        # The stored days are served unchanged, and the rest continue them
+        stored = read_forecasts([('Spain', 'Confirmed')], db_path=self.db_path)['yhat'].tolist()
+        np.testing.assert_allclose(served[:7], stored)
+        self.assertGreater(served[-1], served[6])
+        self.assertIn(('Spain', 'Confirmed'), keys)
+
+    def test_versions_are_resolved_off_the_event_loop(self):
+        run_id = write_forecasts({('Europe', 'Confirmed'): pd.DataFrame({
+            'ds': pd.date_range('2020-01-21', periods=7, freq='D'),
+            'yhat': range(7), 'yhat_lower': range(7), 'yhat_upper': range(7)})}, db_path=self.db_path)
+        service = ForecastService(self.registry, workers=2, n_samples=0, db_path=self.db_path)
+        threads = []
+        resolve = service.versions
+        service.versions = lambda keys: threads.append(threading.current_thread().name) or resolve(keys)
+        keys = [('Italy', 'Confirmed'), ('Europe', 'Confirmed'), ('Nowhere', 'Confirmed')]
+        try:
+            versions = resolve(keys)
+            asyncio.run(service.forecast(keys, 5))
+        finally:
+            service.close()
+        self.assertEqual(versions[('Italy', 'Confirmed')][1], 'model')
+        self.assertEqual(versions[('Europe', 'Confirmed')], (run_id, 'store'))
+        self.assertEqual(versions[('Nowhere', 'Confirmed')], (None, None))
+        # One lookup for the whole request, on the worker pool
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('forecast'))
+
+if __name__ == '__main__':
+    unittest.main()
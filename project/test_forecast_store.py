@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from project import forecast_store
+
+class TestForecastStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'forecasts.sqlite')
+        self.forecast = pd.DataFrame({
+            'ds': pd.date_range('2020-07-28', periods=3, freq='D'),
+            'yhat': [1.0, 2.0, 3.0],
+            'yhat_lower': [0.5, 1.5, 2.5],
+            'yhat_upper': [1.5, 2.5, 3.5],
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        forecast_store.write_forecasts({('India', 'Deaths'): self.forecast}, db_path=self.db_path)
+        df = forecast_store.read_forecast('India', 'Deaths', db_path=self.db_path)
+        pd.testing.assert_frame_equal(df, self.forecast, check_dtype=False)
+        self.assertIsNone(forecast_store.read_forecast('India', 'Active', db_path=self.db_path))
+
+    def test_latest_run_per_key(self):
+        first = forecast_store.write_forecasts({('India', 'Deaths'): self.forecast,
+                                                ('Brazil', 'Deaths'): self.forecast}, db_path=self.db_path)
+        updated = self.forecast.assign(yhat=self.forecast['yhat'] * 10)
+        second = forecast_store.write_forecasts({('India', 'Deaths'): updated}, db_path=self.db_path)
+        df = forecast_store.read_forecasts(db_path=self.db_path)
+        self.assertEqual(set(df['run_id']), {first, second})
+        self.assertEqual(df.loc[df['series'] == 'India', 'yhat'].tolist(), [10.0, 20.0, 30.0])
+        old = forecast_store.read_forecast('India', 'Deaths', run_id=first, db_path=self.db_path)
+        self.assertEqual(old['yhat'].tolist(), [1.0, 2.0, 3.0])
+        self.assertEqual(forecast_store.latest_run_id(self.db_path), second)
+
+    def test_names_with_underscores(self):
+        self.assertEqual(forecast_store.parse_legacy_name('Papua_New_Guinea_Active_weekly_forecast.csv'),
+                         ('Papua_New_Guinea', 'Active'))
+        self.assertIsNone(forecast_store.parse_legacy_name('global_data_weekly_forecast.csv'))
+        forecast_store.write_forecasts({('Papua_New_Guinea', 'Active'): self.forecast}, db_path=self.db_path)
+        self.assertEqual(forecast_store.list_series(self.db_path), ['Papua_New_Guinea'])
+        self.assertEqual(forecast_store.list_targets('Papua_New_Guinea', self.db_path), ['Active'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from project.forecasting import batch_cross_validate
+from project.logging_config import logger
+
+def task(name, slope, days=40):
+    values = np.cumsum(np.full(days, float(slope)))
+    return (name, 'Confirmed', pd.DataFrame({'ds': pd.date_range('2020-01-22', periods=days, freq='D'), 'y': values}))
+
+class TestBatchCrossValidate(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.tasks = [task('A', 10), task('B', 20), task('Short', 5, days=10)]
+        self.options = {'initial': '20 days', 'period': '10 days', 'horizon': '5 days', 'n_jobs': 1,
+                        'cache_dir': self.tmp_dir, 'params': {'A_Confirmed': None, 'B_Confirmed': None}}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_folds_and_metrics_for_every_long_enough_series(self):
+        df_cv, metrics = batch_cross_validate(self.tasks, **self.options)
+        self.assertEqual(sorted(df_cv['series'].unique()), ['A', 'B'])
+        self.assertEqual(df_cv.groupby('series')['cutoff'].nunique().tolist(), [2, 2])
+        self.assertTrue((df_cv['ds'] > df_cv['cutoff']).all())
+        self.assertEqual(sorted(metrics['series'].unique()), ['A', 'B'])
+        self.assertIn('rmse', metrics.columns)
+
+    def test_cached_folds_are_reused(self):
+        first, _ = batch_cross_validate(self.tasks, **self.options)
+        self.assertEqual(len(os.listdir(self.tmp_dir)), 4)
+        self.assertFalse([name for name in os.listdir(self.tmp_dir) if name.endswith('.tmp')])
+        with self.assertLogs(logger, 'INFO') as logs:
+            second, _ = batch_cross_validate(self.tasks, **self.options)
+        self.assertTrue(any('4 cached folds, 0 to fit' in line for line in logs.output))
+        pd.testing.assert_frame_equal(first[['ds', 'yhat', 'y']], second[['ds', 'yhat', 'y']])
+        # Changed params refit the series' folds
+        with self.assertLogs(logger, 'INFO') as logs:
+            batch_cross_validate(self.tasks, **{**self.options, 'params': {'A_Confirmed': {'changepoint_prior_scale': 0.5}}})
+        self.assertTrue(any('2 cached folds, 2 to fit' in line for line in logs.output))
+
+if __name__ == '__main__':
+    unittest.main()
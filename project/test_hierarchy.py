@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from project.hierarchy import Hierarchy, coherent_forecasts, reconcile
+from project.forecast_store import read_forecasts
+from project.pipeline import derive_hierarchy
+
+PARENT_OF = {'A': 'R1', 'B': 'R1', 'C': 'R2'}
+DATES = pd.date_range('2020-08-01', periods=3, freq='D')
+
+def forecast(level, width=1.0):
+    yhat = np.full(len(DATES), float(level))
+    return pd.DataFrame({'ds': DATES, 'yhat': yhat, 'yhat_lower': yhat - width, 'yhat_upper': yhat + width})
+
+def history(values):
+    return pd.DataFrame({'Confirmed': values}, index=pd.date_range('2020-07-01', periods=len(values), name='Date'))
+
+class TestHierarchy(unittest.TestCase):
+    def setUp(self):
+        self.hierarchy = Hierarchy(PARENT_OF)
+
+    def test_bottom_up_sums_children(self):
+        out = coherent_forecasts({'A': forecast(1), 'B': forecast(2), 'C': forecast(4, width=2)},
+                                 self.hierarchy, 'country')
+        np.testing.assert_allclose(out['R1']['yhat'], 3)
+        np.testing.assert_allclose(out['global']['yhat'], 7)
+        # Half-widths add in quadrature: sqrt(1 + 1 + 4)
+        np.testing.assert_allclose(out['global']['yhat_upper'] - out['global']['yhat'], np.sqrt(6))
+
+    def test_top_down_splits_by_recent_share(self):
+        hist = {'A': history([0, 10, 30]), 'B': history([100, 10, 10]), 'C': history([5, 5, 5])}
+        out = coherent_forecasts({'R1': forecast(100), 'R2': forecast(8)}, self.hierarchy, 'region',
+                                 hist, 'Confirmed')
+        np.testing.assert_allclose(out['global']['yhat'], 108)
+        np.testing.assert_allclose(out['A']['yhat'], 100 * 40 / 160)
+        np.testing.assert_allclose(out['C']['yhat'], 8)
+
+    def test_reconciled_forecasts_add_up(self):
+        fitted = {'global': forecast(20), 'R1': forecast(5), 'R2': forecast(6),
+                  'A': forecast(1), 'B': forecast(2), 'C': forecast(4)}
+        out = reconcile(fitted, self.hierarchy)
+        np.testing.assert_allclose(out['R1']['yhat'], out['A']['yhat'] + out['B']['yhat'])
+        np.testing.assert_allclose(out['global']['yhat'], out['R1']['yhat'] + out['R2']['yhat'])
+
+    def test_derived_forecasts_are_stored(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            db_path = os.path.join(tmp_dir, 'forecasts.sqlite')
+            tasks = [(name, 'Confirmed', None) for name in PARENT_OF]
+            results = {'A_Confirmed': forecast(1), 'C_Confirmed': forecast(4)}
+            # Models and manifest entries of an earlier run that fitted every level
+            for name in ('A', 'R2'):
+                with open(os.path.join(tmp_dir, f'{name}_Confirmed_prophet_model.json'), 'w') as f:
+                    f.write('{}')
+            manifest = {'A_Confirmed': {}, 'R2_Confirmed': {}}
+            derived = derive_hierarchy(tasks, results, {'B_Confirmed': 'failed'}, self.hierarchy,
+                                       'country', {}, db_path=db_path, manifest=manifest, model_dir=tmp_dir)
+            # R1 misses its failed child B, so only R2 is derived; global needs R1
+            self.assertEqual(sorted(derived), [('R2', 'Confirmed')])
+            self.assertEqual(read_forecasts(db_path=db_path)['series'].unique().tolist(), ['R2'])
+            # The derived series' stale model and manifest entry are dropped
+            self.assertEqual(sorted(os.listdir(tmp_dir)), ['A_Confirmed_prophet_model.json', 'forecasts.sqlite'])
+            self.assertEqual(list(manifest), ['A_Confirmed'])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from project import instrumentation
+from project.instrumentation import collect, span
+
+class TestInstrumentation(unittest.TestCase):
+    def test_spans_are_collected_with_inherited_labels(self):
+        with collect() as recorder:
+            with span('load') as stage:
+                stage['rows'] = 10
+            with span('fit_series', rows=5, series='Italy', target='Deaths'):
+                with span('train'):
+                    pass
+            with span('fit_series', series='Spain', target='Deaths'):
+                pass
+        names = [r['span'] for r in recorder.records]
+        self.assertEqual(names, ['load', 'train', 'fit_series', 'fit_series'])
+        train = recorder.records[1]
+        self.assertEqual(train['parent'], 'fit_series')
+        self.assertEqual(train['labels'], {'series': 'Italy', 'target': 'Deaths'})
+        self.assertEqual(recorder.records[0]['rows'], 10)
+        self.assertGreaterEqual(train['seconds'], 0)
+
+        summary = instrumentation.summarize(recorder.records)
+        self.assertIn('load:', summary)
+        self.assertIn('Slowest series:', summary)
+        snapshot = instrumentation.prometheus_snapshot(recorder.records)
+        self.assertIn('covid_pipeline_span_count{span="fit_series"} 2', snapshot)
+        self.assertIn('covid_pipeline_span_rows_total{span="load"} 10', snapshot)
+
+    def test_span_without_recorder_is_discarded(self):
+        with span('orphan'):
+            pass
+        with collect() as recorder:
+            pass
+        self.assertEqual(recorder.records, [])
+
+    def test_rss_growth_is_attributed_to_the_span_that_raised_the_peak(self):
+        # The process peak as getrusage reports it: it only ever grows
+        peaks = iter([100.0, 340.0, 340.0, 340.0])
+        peak_rss_mb = instrumentation.peak_rss_mb
+        instrumentation.peak_rss_mb = lambda: next(peaks)
+        try:
+            with collect() as recorder:
+                with span('fit_series', series='Italy', target='Deaths'):
+                    pass
+                with span('fit_series', series='Spain', target='Deaths'):
+                    pass
+        finally:
+            instrumentation.peak_rss_mb = peak_rss_mb
+        italy, spain = recorder.records
+        self.assertEqual((italy['process_peak_rss_mb'], italy['rss_growth_mb']), (340.0, 240.0))
+        # Spain ran below the peak Italy set, so it raised nothing
+        self.assertEqual((spain['process_peak_rss_mb'], spain['rss_growth_mb']), (340.0, 0.0))
+        summary = instrumentation.summarize(recorder.records)
+        self.assertIn('Italy - Deaths', summary)
+        self.assertIn('+240 MB peak RSS', summary)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+import joblib
+import pandas as pd
+from project.model_registry import ModelRegistry, parse_model_name, convert_legacy_models, model_path_for
+from project.modeling import train_prophet_model
+
+class TestModelRegistry(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        df = pd.DataFrame({'ds': pd.date_range('2020-01-01', periods=20, freq='D'), 'y': range(20)})
+        cls.model = train_prophet_model(df, {'uncertainty_samples': 0})
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.registry = ModelRegistry(self.tmp_dir, max_models=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_parse_model_name(self):
+        self.assertEqual(parse_model_name('India_Confirmed_prophet_model.json'), ('India', 'Confirmed'))
+        self.assertEqual(parse_model_name('South_East Asia_Deaths_prophet_model.joblib'),
+                         ('South_East Asia', 'Deaths'))
+        self.assertIsNone(parse_model_name('training_manifest.json'))
+        self.assertIsNone(parse_model_name('India_prophet_model.txt'))
+        self.assertIsNone(parse_model_name('_prophet_model.json'))
+
+    def test_lru_eviction(self):
+        for name in ('A', 'B', 'C'):
+            self.registry.save(name, 'Confirmed', self.model)
+        self.assertEqual(self.registry.keys(), [('A', 'Confirmed'), ('B', 'Confirmed'), ('C', 'Confirmed')])
+        first = self.registry.get('A', 'Confirmed')
+        self.registry.get('B', 'Confirmed')
+        self.assertIs(self.registry.get('A', 'Confirmed'), first)
+        self.assertEqual((self.registry.hits, self.registry.misses), (1, 2))
+        # Loading C evicts B, the least recently used
+        self.registry.get('C', 'Confirmed')
+        self.assertIs(self.registry.get('A', 'Confirmed'), first)
+        self.registry.get('B', 'Confirmed')
+        self.assertEqual((self.registry.hits, self.registry.misses), (2, 4))
+
+    def test_rewritten_model_is_reloaded(self):
+        path = self.registry.save('A', 'Confirmed', self.model)
+        first = self.registry.get('A', 'Confirmed')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNot(self.registry.get('A', 'Confirmed'), first)
+        self.assertEqual(self.registry.misses, 2)
+
+    def test_missing_model(self):
+        with self.assertRaises(FileNotFoundError):
+            self.registry.get('Nowhere', 'Confirmed')
+        self.assertIsNone(self.registry.version('Nowhere', 'Confirmed'))
+
+    def test_convert_legacy_models(self):
+        legacy = os.path.join(self.tmp_dir, 'A_Confirmed_prophet_model.joblib')
+        joblib.dump(self.model, legacy)
+        with open(os.path.join(self.tmp_dir, 'B_Confirmed_prophet_model.joblib'), 'w') as f:
+            f.write('not a pickle')
+        # Until converted, the legacy file backs the model
+        self.assertEqual(self.registry.path('A', 'Confirmed'), legacy)
+        self.assertEqual(convert_legacy_models(self.tmp_dir, remove=True), [('A', 'Confirmed')])
+        self.assertFalse(os.path.exists(legacy))
+        self.assertEqual(self.registry.path('A', 'Confirmed'), model_path_for('A', 'Confirmed', self.tmp_dir))
+        converted = self.registry.get('A', 'Confirmed')
+        self.assertEqual(converted.params['k'].tolist(), self.model.params['k'].tolist())
+        # The unreadable file is left in place
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, 'B_Confirmed_prophet_model.joblib')))
+
+if __name__ == '__main__':
+    unittest.main()
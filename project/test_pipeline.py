@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from project.forecast_store import connect, start_run, read_forecasts
+from project.pipeline import run_tasks, evaluate_holdout
+from project.training_manifest import make_entry
+
+def task(name, slope, days=40):
+    values = np.cumsum(np.full(days, float(slope)))
+    return (name, 'Confirmed', pd.DataFrame({'ds': pd.date_range('2020-01-22', periods=days, freq='D'), 'y': values}))
+
+class TestRunTasks(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'forecasts.sqlite')
+        # An empty series cannot be fitted
+        self.tasks = [task('A', 10), task('B', 20), ('Empty', 'Confirmed', pd.DataFrame({'ds': [], 'y': []}))]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def check(self, results, failures):
+        self.assertEqual(sorted(results), ['A_Confirmed', 'B_Confirmed'])
+        self.assertEqual(list(failures), ['Empty_Confirmed'])
+        self.assertEqual(len(read_forecasts(db_path=self.db_path)), 14)
+        for name in ('A', 'B'):
+            self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, f'{name}_Confirmed_prophet_model.json')))
+
+    def test_process_pool_collects_failures(self):
+        self.check(*run_tasks(self.tasks, n_jobs=2, periods=7, db_path=self.db_path,
+                              baseline=False, model_dir=self.tmp_dir))
+
+    def test_in_process_collects_failures(self):
+        self.check(*run_tasks(self.tasks, n_jobs=1, periods=7, db_path=self.db_path,
+                              baseline=False, model_dir=self.tmp_dir))
+
+    def test_baseline_series_are_skipped_and_replace_stale_models(self):
+        smooth = task('Smooth', 100, days=60)
+        stale = os.path.join(self.tmp_dir, 'Smooth_Confirmed_prophet_model.json')
+        with open(stale, 'w') as f:
+            f.write('{}')
+        manifest = {'Smooth_Confirmed': make_entry(smooth[2].iloc[:50], None, stale)}
+        results, _ = run_tasks([smooth], n_jobs=1, periods=7, manifest=manifest, db_path=self.db_path,
+                               model_dir=self.tmp_dir)
+        self.assertEqual(list(results), ['Smooth_Confirmed'])
+        self.assertNotEqual(manifest['Smooth_Confirmed']['model'], 'prophet')
+        self.assertEqual(manifest['Smooth_Confirmed']['model_file'], 'Smooth_Confirmed_baseline.json')
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, 'Smooth_Confirmed_baseline.json')))
+        self.assertFalse(os.path.exists(stale))
+        # Unchanged, it is skipped on its baseline state
+        self.assertEqual(run_tasks([smooth], n_jobs=1, periods=7, manifest=manifest, db_path=self.db_path,
+                                   model_dir=self.tmp_dir), ({}, {}))
+        # Escalated to Prophet, its baseline state is removed
+        run_tasks([smooth], n_jobs=1, periods=7, manifest=manifest, force=True, db_path=self.db_path,
+                  baseline=False, model_dir=self.tmp_dir)
+        self.assertEqual(manifest['Smooth_Confirmed']['model'], 'prophet')
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'Smooth_Confirmed_baseline.json')))
+
+    def test_forecasts_are_written_into_a_given_run(self):
+        conn = connect(self.db_path)
+        run_id = start_run(conn, note='pipeline')
+        conn.close()
+        run_tasks(self.tasks[:1], n_jobs=1, periods=7, db_path=self.db_path, baseline=False,
+                  model_dir=self.tmp_dir, run_id=run_id)
+        self.assertEqual(read_forecasts(db_path=self.db_path)['run_id'].unique().tolist(), [run_id])
+
+class TestEvaluateHoldout(unittest.TestCase):
+    def test_leaderboard_records_the_chosen_model(self):
+        rng = np.random.default_rng(0)
+        noisy = ('Noisy', 'Confirmed', pd.DataFrame({'ds': pd.date_range('2020-01-22', periods=60, freq='D'),
+                                                     'y': rng.integers(0, 1000, 60).astype(float)}))
+        tasks = [task('Smooth', 100, days=60), noisy, task('Tiny', 1, days=5)]
+        board = evaluate_holdout(tasks, holdout=7, n_jobs=1)
+        # Too short to hold out 7 days
+        self.assertEqual(sorted(board['series']), ['Noisy', 'Smooth'])
+        models = dict(zip(board['series'], board['model']))
+        self.assertEqual(models['Noisy'], 'prophet')
+        self.assertIn(models['Smooth'], ('damped_trend', 'log_linear'))
+        self.assertEqual(board['n'].tolist(), [7, 7])
+        # The smooth series is forecast almost exactly
+        self.assertLess(board.set_index('series').loc['Smooth', 'smape'], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from project import sharding
+from project.aggregate_store import ingest_file
+from project.forecast_store import read_forecasts
+from project.pipeline import plan_jobs
+from project.synthetic_data import generate_covid_data
+
+def task(name, slope, days=60):
+    values = np.cumsum(np.full(days, float(slope)))
+    return (name, 'Confirmed', pd.DataFrame({'ds': pd.date_range('2020-01-22', periods=days, freq='D'), 'y': values}))
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.run_dir = os.path.join(self.tmp_dir, 'run')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_partition_balances_rows(self):
+        shards = sharding.partition([10, 9, 5, 4, 1, 1], 2)
+        loads = [sum(size for size, s in zip([10, 9, 5, 4, 1, 1], shards) if s == shard) for shard in (0, 1)]
+        self.assertEqual(sorted(loads), [15, 15])
+
+    def test_interrupted_run_resumes_and_merges(self):
+        tasks = [task('A', 10), task('B', 20), task('C', 30)]
+        jobs, fingerprints = plan_jobs(tasks)
+        sharding.create_run(self.run_dir, tasks, jobs, fingerprints, n_shards=2,
+                            options={'periods': 7, 'baseline': True, 'level': None})
+        # A worker dies holding shard 0; another finishes shard 1
+        conn = sharding.connect(self.run_dir)
+        self.assertEqual(sharding.claim_shard(conn, 'dead', lease_seconds=-1), 0)
+        conn.close()
+        self.assertGreater(sharding.work(self.run_dir, n_jobs=1, worker='w1', max_shards=1), 0)
+        with self.assertRaises(RuntimeError):
+            sharding.merge(self.run_dir, model_dir=self.tmp_dir, db_path=os.path.join(self.tmp_dir, 'f.sqlite'))
+        # The expired lease lets a restarted worker take over shard 0
+        sharding.work(self.run_dir, n_jobs=1, worker='w2')
+        self.assertEqual(sharding.status(self.run_dir)['series'], {'done': 3})
+
+        db_path = os.path.join(self.tmp_dir, 'f.sqlite')
+        manifest_path = os.path.join(self.tmp_dir, 'manifest.json')
+        merged = sharding.merge(self.run_dir, model_dir=self.tmp_dir, db_path=db_path, manifest_path=manifest_path)
+        self.assertEqual(sorted(merged), [('A', 'Confirmed'), ('B', 'Confirmed'), ('C', 'Confirmed')])
+        stored = read_forecasts(db_path=db_path)
+        self.assertEqual(len(stored), 21)
+        with open(manifest_path) as f:
+            self.assertEqual(sorted(json.load(f)), ['A_Confirmed', 'B_Confirmed', 'C_Confirmed'])
+        # A second merge publishes nothing again
+        self.assertEqual(sharding.merge(self.run_dir, model_dir=self.tmp_dir, db_path=db_path,
+                                        manifest_path=manifest_path), {})
+
+    def test_worker_that_lost_its_lease_stops(self):
+        tasks = [task('A', 10), task('B', 20)]
+        jobs, fingerprints = plan_jobs(tasks)
+        sharding.create_run(self.run_dir, tasks, jobs, fingerprints, n_shards=1,
+                            options={'periods': 7, 'baseline': False, 'level': None})
+        conn = sharding.connect(self.run_dir)
+        try:
+            # w1's lease expires and w2 takes the shard over while w1 is still fitting
+            self.assertEqual(sharding.claim_shard(conn, 'w1', lease_seconds=-1), 0)
+            self.assertEqual(sharding.claim_shard(conn, 'w2'), 0)
+            self.assertEqual(sharding.run_shard(conn, self.run_dir, 0, 'w1'), 0)
+            self.assertEqual(conn.execute("SELECT status, worker FROM shards").fetchall(), [('running', 'w2')])
+            self.assertEqual(sharding.status(self.run_dir)['series'], {'pending': 2})
+            self.assertEqual(sharding.run_shard(conn, self.run_dir, 0, 'w2'), 2)
+            self.assertEqual(conn.execute("SELECT status FROM shards").fetchall(), [('done',)])
+        finally:
+            conn.close()
+        staged = os.listdir(os.path.join(self.run_dir, 'models'))
+        self.assertFalse([name for name in staged if name.endswith('.tmp')])
+
+    def test_plan_reads_a_seeded_aggregate_store(self):
+        aggregate_db_path = os.path.join(self.tmp_dir, 'aggregates.sqlite')
+        csv_path = os.path.join(self.tmp_dir, 'delta.csv')
+        generate_covid_data(n_countries=2, n_days=40).to_csv(csv_path, index=False)
+        ingest_file(csv_path, aggregate_db_path)
+        sharding.plan(self.run_dir, n_shards=1, force=True, baseline=False, level=None,
+                      aggregate_db_path=aggregate_db_path)
+        jobs = pd.read_pickle(sharding._input_path(self.run_dir, 0))['jobs']
+        self.assertEqual(sorted({job[1] for job in jobs}),
+                         sorted(['global', 'Country 00000', 'Country 00001', 'Eastern Mediterranean', 'Europe']))
+        self.assertTrue(all(len(job[3]) == 40 for job in jobs))
+
+if __name__ == '__main__':
+    unittest.main()
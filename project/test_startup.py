@@ -0,0 +1,34 @@
+import unittest
+from project.startup import parse_importtime, import_report, start_prewarm
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |       1500 | pandas
+"""
+
+class TestStartup(unittest.TestCase):
+    def test_parse_importtime(self):
+        self.assertEqual(parse_importtime(SAMPLE), [('_io', 120, 120), ('pandas', 300, 1500)])
+
+    def test_heavy_packages_are_not_imported_eagerly(self):
+        report = import_report(['project.pipeline', 'project.visualization'])
+        self.assertEqual(sorted(report['module'].unique()), ['project.pipeline', 'project.visualization'])
+        loaded = set(report['package'])
+        for package in ('prophet', 'matplotlib', 'sklearn', 'plotly', 'langchain_core'):
+            self.assertNotIn(package, loaded)
+
+    def test_prewarm_runs_every_step_in_background(self):
+        calls = []
+
+        def fail():
+            raise RuntimeError("no store")
+
+        thread, timings = start_prewarm([('index', lambda: calls.append('index')), ('broken', fail),
+                                         ('models', lambda: calls.append('models'))])
+        thread.join(5)
+        self.assertEqual(calls, ['index', 'models'])
+        self.assertIsInstance(timings['broken'], RuntimeError)
+        self.assertGreaterEqual(timings['models'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from project.training_manifest import load_manifest, save_manifest, make_entry, plan_series, SKIP, WARM, COLD
+
+def frame(days, start=1.0):
+    return pd.DataFrame({'ds': pd.date_range('2020-01-22', periods=days, freq='D'),
+                         'y': [start + i for i in range(days)]})
+
+class TestTrainingManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.model_path = os.path.join(self.tmp_dir, 'A_Confirmed_prophet_model.json')
+        with open(self.model_path, 'w') as f:
+            f.write('{}')
+        self.params = {'changepoint_prior_scale': 0.1}
+        self.entry = make_entry(frame(30), self.params, self.model_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_unchanged_series_is_skipped(self):
+        self.assertEqual(plan_series(self.entry, frame(30), self.params, self.model_path), SKIP)
+
+    def test_appended_rows_warm_start(self):
+        self.assertEqual(plan_series(self.entry, frame(35), self.params, self.model_path), WARM)
+
+    def test_edited_history_is_refit_cold(self):
+        edited = frame(35)
+        edited.loc[3, 'y'] += 1
+        self.assertEqual(plan_series(self.entry, edited, self.params, self.model_path), COLD)
+        self.assertEqual(plan_series(self.entry, frame(25), self.params, self.model_path), COLD)
+
+    def test_changed_params_or_new_series_are_refit_cold(self):
+        self.assertEqual(plan_series(self.entry, frame(30), {'changepoint_prior_scale': 0.5}, self.model_path), COLD)
+        self.assertEqual(plan_series(None, frame(30), self.params, self.model_path), COLD)
+
+    def test_missing_model_file_is_refit_cold(self):
+        os.remove(self.model_path)
+        self.assertEqual(plan_series(self.entry, frame(30), self.params, self.model_path), COLD)
+
+    def test_baseline_series_are_planned_on_their_baseline_state(self):
+        os.remove(self.model_path)
+        state_path = os.path.join(self.tmp_dir, 'A_Confirmed_baseline.json')
+        with open(state_path, 'w') as f:
+            f.write('{}')
+        entry = make_entry(frame(30), self.params, state_path, model='damped_trend')
+        self.assertEqual(entry['model_file'], 'A_Confirmed_baseline.json')
+        self.assertEqual(plan_series(entry, frame(30), self.params, self.model_path), SKIP)
+        # There is no model to warm-start from
+        self.assertEqual(plan_series(entry, frame(35), self.params, self.model_path), COLD)
+        os.remove(state_path)
+        self.assertEqual(plan_series(entry, frame(30), self.params, self.model_path), COLD)
+
+    def test_save_and_load_round_trip(self):
+        path = os.path.join(self.tmp_dir, 'manifest.json')
+        self.assertEqual(load_manifest(path), {})
+        save_manifest({'A_Confirmed': self.entry}, path)
+        self.assertEqual(load_manifest(path), {'A_Confirmed': self.entry})
+        self.assertFalse(os.path.exists(f'{path}.tmp'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+import pandas as pd
+from project.tuning import make_cutoffs, score_params, tune_all
+
+GRID = {'changepoint_prior_scale': [0.001, 0.5], 'seasonality_mode': ['additive']}
+
+def frame(days):
+    return pd.DataFrame({'ds': pd.date_range('2020-01-22', periods=days, freq='D'),
+                         'y': np.arange(days, dtype=float) * 10})
+
+class TestTuning(unittest.TestCase):
+    def test_make_cutoffs(self):
+        df = frame(60)
+        cutoffs = make_cutoffs(df, folds=3, horizon=7, period=7)
+        self.assertEqual(cutoffs[-1], df['ds'].max() - pd.Timedelta(days=7))
+        self.assertEqual(np.diff(cutoffs).tolist(), [pd.Timedelta(days=7)] * 2)
+        # Cutoffs leaving fewer than TUNING_MIN_TRAIN_DAYS of training data are dropped
+        self.assertEqual(len(make_cutoffs(df, folds=10, horizon=7, period=7)), 4)
+        self.assertEqual(make_cutoffs(frame(20), folds=1, horizon=7, period=7), [])
+
+    def test_score_params(self):
+        df = frame(45)
+        score = score_params(df, {'changepoint_prior_scale': 0.05}, make_cutoffs(df, 1, 7, 7), 7)
+        self.assertTrue(np.isfinite(score))
+        self.assertLess(score, 5.0)
+
+    def test_tune_all(self):
+        rungs = [{'folds': 1, 'horizon': 3, 'period': 3}, {'folds': 2, 'horizon': 7, 'period': 7}]
+        tasks = [('Long', 'Confirmed', frame(60)), ('Tiny', 'Confirmed', frame(20))]
+        best = tune_all(tasks, grid=GRID, rungs=rungs, keep_fraction=0.5, n_jobs=1)
+        self.assertEqual(sorted(best), ['Long_Confirmed'])
+        self.assertIn(best['Long_Confirmed']['params']['changepoint_prior_scale'], [0.001, 0.5])
+
+    def test_series_too_short_for_a_later_rung_keeps_its_result(self):
+        # 36 days backtest on a 3-day holdout, but not on a 10-day one
+        rungs = [{'folds': 1, 'horizon': 3, 'period': 3}, {'folds': 1, 'horizon': 10, 'period': 10}]
+        best = tune_all([('Short', 'Confirmed', frame(36))], grid=GRID, rungs=rungs, n_jobs=1)
+        self.assertEqual(sorted(best), ['Short_Confirmed'])
+        self.assertTrue(np.isfinite(best['Short_Confirmed']['score']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+training_manifest.py
+Tracks what every saved model was trained on so the pipeline can skip unchanged
+series and warm-start series that only gained new rows at the tail. Series
+forecast by the baseline tier record their saved baseline state as model file;
+they are never warm-started.
+"""
+import json
+import os
+from datetime import datetime, timezone
+from .config import MANIFEST_PATH
+from .utils import hash_series
+
+SKIP = 'skip'
+WARM = 'warm'
+COLD = 'cold'
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    """Load the training manifest, returning an empty one if it does not exist yet."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH):
+    """Atomically write the training manifest next to the models."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def make_entry(df_model, params, model_path: str, model: str = 'prophet') -> dict:
+    """
+    Build the manifest record for a freshly trained series.
+
+    Args:
+        df_model (pd.DataFrame): Training frame with columns 'ds' and 'y'.
+        params (dict or None): Prophet parameters the model was trained with.
+        model_path (str): Path the model (or, for baselines, the baseline state) was saved to.
+        model (str): Model type that produced the forecast ('prophet' or a baseline name).
+
+    Returns:
+        dict: Manifest entry with the input hash, row count, params, model type and model file.
+    """
+    return {
+        'hash': hash_series(df_model),
+        'n_rows': len(df_model),
+        'last_ds': str(df_model['ds'].max()) if len(df_model) else None,
+        'params': params or {},
+        'model': model,
+        'model_file': os.path.basename(model_path),
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+def plan_series(entry, df_model, params, model_path: str) -> str:
+    """
+    Decide how a series should be (re)trained given its previous manifest entry.
+
+    Args:
+        entry (dict or None): Previous manifest entry for the series.
+        df_model (pd.DataFrame): Current training frame with columns 'ds' and 'y'.
+        params (dict or None): Prophet parameters the series would be trained with.
+        model_path (str): Path the series' Prophet model is saved to; a baseline state
+            is looked up under the entry's model file in the same directory.
+
+    Returns:
+        str: SKIP if the input and params are unchanged and the saved model exists,
+            WARM if rows were only appended at the tail of a saved Prophet model's
+            input, otherwise COLD.
+    """
+    if not entry or entry.get('params', {}) != (params or {}):
+        return COLD
+    prophet = entry.get('model', 'prophet') == 'prophet'
+    if prophet and entry.get('model_file') != os.path.basename(model_path):
+        return COLD
+    model_file = entry.get('model_file')
+    if not model_file or not os.path.exists(os.path.join(os.path.dirname(model_path), model_file)):
+        return COLD
+    n_rows = entry['n_rows']
+    if len(df_model) == n_rows and hash_series(df_model) == entry['hash']:
+        return SKIP
+    if not prophet:
+        # A baseline leaves no model to warm-start from
+        return COLD
+    if len(df_model) > n_rows and hash_series(df_model.iloc[:n_rows]) == entry['hash']:
+        return WARM
+    return COLD
@@ -0,0 +1,173 @@
+"""
+tuning.py
+Parallel Prophet hyperparameter search over PROPHET_PARAM_GRID.
+
+Candidates are pruned with successive halving: every candidate is scored on a
+cheap short-horizon holdout, and only the best fraction is promoted to the full
+multi-fold backtest. Winning parameters are written to Model_parameters/, where
+run_pipeline picks them up automatically.
+"""
+import argparse
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .config import (PROPHET_PARAM_GRID, PARAMS_DIR, TUNING_RUNGS, TUNING_KEEP_FRACTION,
+                     TUNING_MIN_TRAIN_DAYS, N_JOBS)
+from .modeling import train_prophet_model, predict
+from .utils import save_params, load_params, resolve_n_jobs
+from .logging_config import logger
+
+def param_grid(grid: dict = PROPHET_PARAM_GRID) -> list:
+    """Expand a parameter grid into a list of Prophet parameter dicts."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+def params_path_for(name, target, params_dir=PARAMS_DIR):
+    """Return the path tuned parameters for a (series, target) pair are saved to."""
+    return os.path.join(params_dir, f'{name}_{target}_model_params.json')
+
+def load_series_params(name, target, params_dir=PARAMS_DIR):
+    """Return the tuned parameters for a (series, target) pair, or None if it was never tuned."""
+    path = params_path_for(name, target, params_dir)
+    return load_params(path) if os.path.exists(path) else None
+
+def make_cutoffs(df_model: pd.DataFrame, folds: int, horizon: int, period: int) -> list:
+    """
+    Choose backtest cutoffs, the latest one leaving exactly `horizon` days of holdout.
+
+    Cutoffs that would leave fewer than TUNING_MIN_TRAIN_DAYS of training data are dropped.
+
+    Returns:
+        list: Cutoff timestamps in ascending order.
+    """
+    first, last = df_model['ds'].min(), df_model['ds'].max() - pd.Timedelta(days=horizon)
+    cutoffs = [last - pd.Timedelta(days=i * period) for i in range(folds)]
+    return sorted(c for c in cutoffs if (c - first).days >= TUNING_MIN_TRAIN_DAYS)
+
+def score_params(df_model: pd.DataFrame, params: dict, cutoffs: list, horizon: int) -> float:
+    """
+    Backtest one parameter set and return its mean RMSE over all cutoffs.
+
+    Models are fitted without uncertainty sampling since only the point forecast is scored.
+    """
+    errors = []
+    for cutoff in cutoffs:
+        train = df_model[df_model['ds'] <= cutoff]
+        test = df_model[(df_model['ds'] > cutoff) & (df_model['ds'] <= cutoff + pd.Timedelta(days=horizon))]
+        model = train_prophet_model(train, {**params, 'uncertainty_samples': 0})
+        forecast = predict(model, test[['ds']])
+        errors.append(np.sqrt(np.mean((test['y'].to_numpy() - forecast['yhat'].to_numpy()) ** 2)))
+    return float(np.mean(errors))
+
+def tune_all(tasks, grid: dict = PROPHET_PARAM_GRID, rungs: list = TUNING_RUNGS,
+             keep_fraction: float = TUNING_KEEP_FRACTION, n_jobs=None) -> dict:
+    """
+    Search the grid for every series with successive halving on one shared process pool.
+
+    All (series, candidate) evaluations of a rung are submitted together, so the pool
+    stays busy across series. A candidate that fails to fit scores infinity and is pruned.
+
+    Args:
+        tasks (list): Tuples of (name, target, df_model) as built by pipeline.build_tasks.
+        grid (dict): Parameter grid to search.
+        rungs (list): Dicts with 'folds', 'horizon' and 'period' (days), cheapest first.
+        keep_fraction (float): Fraction of candidates promoted from one rung to the next.
+        n_jobs (int, optional): Worker processes; -1 uses every core. Defaults to config.N_JOBS.
+
+    Returns:
+        dict: Maps '{name}_{target}' to {'params': best params, 'score': RMSE on the last
+            rung the series was long enough for}. Series too short for the first rung
+            or with no successful candidate are omitted.
+    """
+    n_jobs = resolve_n_jobs(n_jobs)
+    candidates = param_grid(grid)
+    series = {f'{name}_{target}': df_model for name, target, df_model in tasks}
+    survivors = {key: list(range(len(candidates))) for key in series}
+    scores, latest = {}, {}
+    executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+    try:
+        for level, rung in enumerate(rungs):
+            cutoffs = {key: make_cutoffs(df, rung['folds'], rung['horizon'], rung['period'])
+                       for key, df in series.items() if key in survivors}
+            for key in [k for k, c in cutoffs.items() if not c]:
+                if level == 0:
+                    logger.warning(f"Series {key} is too short to backtest; skipping tuning.")
+                else:
+                    logger.warning(f"Series {key} is too short for rung {level}; keeping its rung {level - 1} result.")
+                survivors.pop(key)
+            jobs = [(key, idx) for key, indices in survivors.items() for idx in indices]
+            logger.info(f"Tuning rung {level}: {len(jobs)} evaluations over {len(survivors)} series.")
+            scores = {key: {} for key in survivors}
+            if executor is None:
+                outcomes = ((job, _safe_score(series[job[0]], candidates[job[1]], cutoffs[job[0]], rung['horizon']))
+                            for job in jobs)
+            else:
+                futures = [executor.submit(_safe_score, series[key], candidates[idx], cutoffs[key], rung['horizon'])
+                           for key, idx in jobs]
+                outcomes = ((job, future.result()) for job, future in zip(jobs, futures))
+            for (key, idx), score in outcomes:
+                scores[key][idx] = score
+            latest.update(scores)
+            if level < len(rungs) - 1:
+                for key, ranked in scores.items():
+                    keep = max(1, math.ceil(len(ranked) * keep_fraction))
+                    survivors[key] = sorted(ranked, key=ranked.get)[:keep]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    best = {}
+    for key, ranked in latest.items():
+        idx = min(ranked, key=ranked.get)
+        if np.isfinite(ranked[idx]):
+            best[key] = {'params': candidates[idx], 'score': ranked[idx]}
+        else:
+            logger.warning(f"No parameter set could be fitted for {key}.")
+    return best
+
+def _safe_score(df_model, params, cutoffs, horizon):
+    try:
+        return score_params(df_model, params, cutoffs, horizon)
+    except Exception as e:
+        logger.error(f"Backtest failed for params {params}: {e}")
+        return float('inf')
+
+def run_tuning(n_jobs=None, names=None, params_dir=PARAMS_DIR) -> dict:
+    """
+    Tune every (series, target) pair of the pipeline and save the winning parameters.
+
+    Args:
+        n_jobs (int, optional): Worker processes; -1 uses every core. Defaults to config.N_JOBS.
+        names (list, optional): Restrict tuning to these series names.
+        params_dir (str): Directory the parameter JSON files are written to.
+
+    Returns:
+        dict: Results of tune_all.
+    """
+    from .data_acquisition import load_clean_covid_data
+    from .data_preprocessing import preprocess_all_levels
+    from .pipeline import build_tasks
+    global_data, region_data, country_data = preprocess_all_levels(load_clean_covid_data())
+    datasets = {'global': global_data, **region_data, **country_data}
+    if names:
+        datasets = {name: data for name, data in datasets.items() if name in names}
+    tasks = build_tasks(datasets)
+    best = tune_all(tasks, n_jobs=n_jobs)
+    for name, target, _ in tasks:
+        result = best.get(f'{name}_{target}')
+        if result:
+            save_params(result['params'], params_path_for(name, target, params_dir))
+    logger.info(f"Saved tuned parameters for {len(best)} of {len(tasks)} series.")
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune Prophet hyperparameters for every series.")
+    parser.add_argument('--n-jobs', type=int, default=N_JOBS,
+                        help="Worker processes (-1 for all cores).")
+    parser.add_argument('--series', nargs='*', default=None,
+                        help="Only tune these series names (e.g. global India).")
+    args = parser.parse_args()
+    run_tuning(n_jobs=args.n_jobs, names=args.series)
@@ -1,10 +1,36 @@
-import joblib
+import hashlib
 import json
+import os
+import tempfile
+import pandas as pd
+from .config import N_JOBS
 
 def save_model(model, path):
-    joblib.dump(model, path)
+    # .json paths use Prophet's own serialization; anything else is pickled with joblib.
+    # The model is written to a temporary file and renamed, so readers never see a partial file.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        if path.endswith('.json'):
+            from prophet.serialize import model_to_json
+            with os.fdopen(fd, 'w') as f:
+                f.write(model_to_json(model))
+        else:
+            import joblib
+            os.close(fd)
+            joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 def load_model(path):
+    if path.endswith('.json'):
+        from prophet.serialize import model_from_json
+        with open(path, 'r') as f:
+            return model_from_json(f.read())
+    import joblib
     return joblib.load(path)
 
 def save_params(params, path):
@@ -14,3 +40,26 @@ def save_params(params, path):
 def load_params(path):
     with open(path, 'r') as f:
         return json.load(f)
+
+def hash_series(df):
+    """Return a stable SHA-1 hex digest of a frame's 'ds' and 'y' columns."""
+    digest = hashlib.sha1()
+    digest.update(pd.to_datetime(df['ds']).to_numpy(dtype='datetime64[ns]').tobytes())
+    digest.update(df['y'].to_numpy(dtype='float64').tobytes())
+    return digest.hexdigest()
+
+def resolve_n_jobs(n_jobs):
+    """
+    Translate a worker count into a concrete number of processes.
+
+    Args:
+        n_jobs (int): Requested workers. -1 means one per CPU core; values below 1 fall back to 1.
+
+    Returns:
+        int: Number of worker processes to use.
+    """
+    if n_jobs is None:
+        n_jobs = N_JOBS
+    if n_jobs == -1:
+        return os.cpu_count() or 1
+    return max(1, int(n_jobs))
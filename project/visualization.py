@@ -1,5 +1,5 @@
-import plotly.express as px
-import plotly.graph_objects as go
+# plotly (and Prophet's plotting) is imported on first use, keeping importers such
+# as the dashboard quick to start
 
 def plot_forecast(model, forecast, title="Forecast"):
     from prophet.plot import plot_plotly
@@ -11,3 +11,49 @@ def plot_components(model, forecast):
     from prophet.plot import plot_components_plotly
     fig = plot_components_plotly(model, forecast)
     fig.show()
+
+def small_multiples(frame, columns=4, title=None, row_height=220, gap=0.04):
+    """
+    Draw the forecasts of many series as one figure with a panel per series.
+
+    Every panel is built directly as WebGL traces on its own axes, which is far
+    cheaper to build and to render in the browser than one figure per series or
+    a plotly.express faceted figure.
+
+    Args:
+        frame (pd.DataFrame): Long frame with 'series', 'ds', 'yhat', 'yhat_lower' and
+            'yhat_upper' (see ForecastIndex.frame); panels follow the series order.
+        columns (int): Panels per row.
+        title (str, optional): Figure title.
+        row_height (int): Height of a row of panels in pixels.
+        gap (float): Space between panels, as a fraction of the figure.
+
+    Returns:
+        go.Figure: The faceted figure.
+    """
+    import plotly.graph_objects as go
+    names = list(dict.fromkeys(frame['series']))
+    rows = max(1, -(-len(names) // columns))
+    width = (1 - gap * (columns - 1)) / columns
+    height = (1 - gap * (rows - 1)) / rows
+    traces, annotations, layout = [], [], {}
+    for i, (name, group) in enumerate(frame.groupby('series', sort=False)):
+        row, column = divmod(i, columns)
+        axis = '' if i == 0 else str(i + 1)
+        x0 = column * (width + gap)
+        y1 = 1 - row * (height + gap)
+        layout[f'xaxis{axis}'] = dict(domain=[x0, min(x0 + width, 1)], anchor=f'y{axis}', tickfont=dict(size=9))
+        layout[f'yaxis{axis}'] = dict(domain=[max(y1 - height, 0), y1], anchor=f'x{axis}', tickfont=dict(size=9))
+        axes = dict(xaxis=f'x{axis}', yaxis=f'y{axis}', showlegend=False, hoverinfo='x+y')
+        x = group['ds']
+        traces.append(go.Scattergl(x=x, y=group['yhat_upper'], mode='lines', line=dict(width=0), **axes))
+        traces.append(go.Scattergl(x=x, y=group['yhat_lower'], mode='lines', line=dict(width=0),
+                                   fill='tonexty', fillcolor='rgba(99, 110, 250, 0.2)', **axes))
+        traces.append(go.Scattergl(x=x, y=group['yhat'], mode='lines', line=dict(color='#636efa', width=1.5),
+                                   name=name, **axes))
+        annotations.append(dict(text=name, x=x0 + width / 2, y=y1, xref='paper', yref='paper',
+                                xanchor='center', yanchor='bottom', showarrow=False, font=dict(size=11)))
+    fig = go.Figure(data=traces)
+    fig.update_layout(title=title, height=rows * row_height + 80, margin=dict(l=40, r=20, t=60, b=30),
+                      annotations=annotations, **layout)
+    return fig
@@ -2,19 +2,36 @@
 web_search_agent.py
 A simple web search agent using DuckDuckGo via LangChain for fallback answers.
 """
-from langchain_community.tools.ddg_search import DuckDuckGoSearchRun
+from functools import lru_cache
 
-def web_search(query):
+@lru_cache(maxsize=1)
+def get_search_tool():
+    """Return the process-wide DuckDuckGo search tool."""
+    from langchain_community.tools.ddg_search import DuckDuckGoSearchRun
+    return DuckDuckGoSearchRun()
+
+def search_web(query):
     """
     Perform a web search using DuckDuckGoSearchRun from LangChain.
+    Args:
+        query (str): The user's question.
+    Returns:
+        str: The top web search result or a message if not available.
+    Raises:
+        Exception: If the search fails.
+    """
+    result = get_search_tool().run(query)
+    return result if result else "No relevant web search results found."
+
+def web_search(query):
+    """
+    Perform a web search, reporting failures in the returned text instead of raising.
     Args:
         query (str): The user's question.
     Returns:
         str: The top web search result or a message if not available.
     """
     try:
-        search = DuckDuckGoSearchRun()
-        result = search.run(query)
-        return result if result else "No relevant web search results found."
+        return search_web(query)
     except Exception as e:
         return f"Web search error: {e}"